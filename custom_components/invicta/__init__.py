@@ -4,28 +4,201 @@ Custom integration to integrate Invicta (Winet Control based) Pellet Stoves.
 For more details about this integration, please refer to
 https://github.com/docteurzoidberg/ha-invicta
 """
+from __future__ import annotations
+
 import asyncio
+import time
 
+import voluptuous as vol
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import Config, HomeAssistant
-from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.core import (
+    Config,
+    Event,
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
 
 from .coordinator import InvictaDataUpdateCoordinator
 from .api import InvictaApiClient
+from .longterm import InvictaHourlyStatistics
+from .metrics import async_register_metrics_view
+from .profiler import InvictaProfiler
+from .stats import DEFAULT_TANK_CAPACITY, InvictaOperatingStats
+from .winet.archive import WinetArchive
+from .winet.catalog import WinetRegisterCatalog
+from .winet.const import PELLET_RATE_BY_POWER, WinetProductModel, WinetRegister
+from .winet.profile import get_profile
 
 from .const import (
+    ARCHIVE_DIR,
+    CATALOG_SAVE_INTERVAL,
+    CONF_ARCHIVE,
+    CONF_BLOCKING_DETECTOR,
     CONF_HOST,
+    CONF_HOURLY_STATISTICS,
+    CONF_METRICS,
+    CONF_REGISTERS,
+    CONF_TANK_CAPACITY,
     LOGGER,
     DOMAIN,
+    DOMAIN_DATA,
+    DOMAIN_PROFILE,
     PLATFORMS,
+    SERVICE_ANALYZE,
+    SERVICE_HISTORY,
+    SERVICE_PROFILE,
+    SERVICE_REFILL,
     STARTUP_MESSAGE,
+    STATS_SAVE_INTERVAL,
+    STORAGE_VERSION,
 )
 
 
 async def async_setup(hass: HomeAssistant, config: Config):
     """Set up this integration using YAML is not supported."""
+
+    async def _async_profile(call: ServiceCall) -> None:
+        """Sample the event loop for a while, report in the diagnostics."""
+        profiler = InvictaProfiler(interval=call.data["interval"])
+        profiler.start()
+        try:
+            await asyncio.sleep(call.data["duration"])
+        finally:
+            await hass.async_add_executor_job(profiler.stop)
+        hass.data[DOMAIN_PROFILE] = profiler.as_dict()
+        LOGGER.info(
+            "Profiled for %.0fs: %d of %d samples in the integration",
+            profiler.duration,
+            hass.data[DOMAIN_PROFILE]["integration_samples"],
+            profiler.samples,
+        )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE,
+        _async_profile,
+        schema=vol.Schema(
+            {
+                vol.Optional("duration", default=60): vol.All(
+                    vol.Coerce(float), vol.Range(min=1, max=3600)
+                ),
+                vol.Optional("interval", default=0.005): vol.All(
+                    vol.Coerce(float), vol.Range(min=0.001, max=1)
+                ),
+            }
+        ),
+    )
+
+    @callback
+    def _async_history(call: ServiceCall) -> ServiceResponse:
+        """Recent register samples of the stoves, from memory."""
+        end = time.time()
+        start = end - call.data["duration"]
+        registers = call.data.get("registers")
+        stoves = {}
+        for coordinator in hass.data.get(DOMAIN, {}).values():
+            api: InvictaApiClient = coordinator.read_api
+            if call.data.get(CONF_HOST, api.stove_ip) != api.stove_ip:
+                continue
+            history = api.history
+            stoves[api.stove_ip] = {
+                _register_name(registerid): [
+                    list(sample)
+                    for sample in history.window(
+                        registerid, start, end, call.data.get("resolution")
+                    )
+                ]
+                for registerid in history.registers
+                if registers is None or _register_name(registerid) in registers
+            }
+        return {"start": start, "end": end, "stoves": stoves}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_HISTORY,
+        _async_history,
+        schema=vol.Schema(
+            {
+                vol.Optional(CONF_HOST): cv.string,
+                vol.Optional("registers"): vol.All(cv.ensure_list, [cv.string]),
+                vol.Optional("duration", default=3600): vol.All(
+                    vol.Coerce(float), vol.Range(min=1)
+                ),
+                vol.Optional("resolution"): vol.All(
+                    vol.Coerce(float), vol.Range(min=1)
+                ),
+            }
+        ),
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    async def _async_analyze(call: ServiceCall) -> ServiceResponse:
+        """Analytics of the archived polls of the stoves."""
+        try:
+            # numpy is only needed for the analytics
+            from .winet import analytics  # pylint: disable=import-outside-toplevel
+        except ImportError as exc:
+            raise HomeAssistantError("The analytics require numpy") from exc
+
+        def _summarize(path: str) -> dict:
+            return analytics.summarize(
+                analytics.load_archive(path), PELLET_RATE_BY_POWER
+            )
+
+        stoves = {}
+        for coordinator in hass.data.get(DOMAIN, {}).values():
+            api: InvictaApiClient = coordinator.read_api
+            if api.archive is None:
+                continue
+            if call.data.get(CONF_HOST, api.stove_ip) != api.stove_ip:
+                continue
+            write = api.flush_archive()
+            if write is not None:
+                await write
+            stoves[api.stove_ip] = await hass.async_add_executor_job(
+                _summarize, api.archive.path
+            )
+        return {"stoves": stoves}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_ANALYZE,
+        _async_analyze,
+        schema=vol.Schema({vol.Optional(CONF_HOST): cv.string}),
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    @callback
+    def _async_refill(call: ServiceCall) -> None:
+        """Pellets added to the tank: reset the estimated tank level."""
+        for coordinator in hass.data.get(DOMAIN, {}).values():
+            if call.data.get(CONF_HOST, coordinator.read_api.stove_ip) == (
+                coordinator.read_api.stove_ip
+            ):
+                coordinator.stats.refill(call.data.get("amount"))
+                coordinator.async_update_listeners()
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_REFILL,
+        _async_refill,
+        schema=vol.Schema(
+            {
+                vol.Optional(CONF_HOST): cv.string,
+                vol.Optional("amount"): vol.All(vol.Coerce(float), vol.Range(min=0)),
+            }
+        ),
+    )
     return True
 
 
@@ -35,40 +208,80 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         hass.data.setdefault(DOMAIN, {})
         LOGGER.info(STARTUP_MESSAGE)
 
+    start = time.monotonic()
+
+    # The entry unique id is the product model found by the config flow: it is
+    # all the entities need to be created, so the first poll can be deferred.
+    model = WinetProductModel.from_message(entry.unique_id)
+    profile = None
+    if model is not None and CONF_REGISTERS in entry.data:
+        profile = get_profile(model).restrict_to(entry.data[CONF_REGISTERS])
+
     host = entry.data.get(CONF_HOST)
     session = async_get_clientsession(hass)
-    api = InvictaApiClient(session, host)
+    api = InvictaApiClient(session, host, profile)
 
     coordinator = InvictaDataUpdateCoordinator(hass, api=api)
-    await coordinator.async_refresh()
+    await _async_setup_catalog(hass, entry, api)
+    await _async_setup_stats(hass, entry, coordinator)
 
-    if not coordinator.last_update_success:
-        raise ConfigEntryNotReady
+    seed = hass.data.get(DOMAIN_DATA, {}).pop(host, None)
+    if model is None:
+        await coordinator.async_config_entry_first_refresh()
+        _async_store_profile(hass, entry, coordinator)
+    else:
+        api.data.model = model
+        if profile is None:
+            api.data.profile = get_profile(model)
+        if seed is not None:
+            # entry just created by the config flow: reuse its probe answer
+            api.seed(seed)
+            coordinator.async_set_updated_data(api.data)
 
     hass.data[DOMAIN][entry.entry_id] = coordinator
 
-    for platform in PLATFORMS:
-        if entry.options.get(platform, True):
-            hass.async_add_job(
-                hass.config_entries.async_forward_entry_setup(entry, platform)
-            )
+    coordinator.platforms = _enabled_platforms(entry)
+    await hass.config_entries.async_forward_entry_setups(entry, coordinator.platforms)
 
+    if model is not None:
+        # cancelled with the entry (unloaded, or its setup failed)
+        entry.async_create_background_task(
+            hass,
+            _async_first_refresh(hass, entry, coordinator),
+            f"{DOMAIN} first refresh {entry.title}",
+        )
+
+    if entry.options.get(CONF_METRICS, False):
+        async_register_metrics_view(hass)
+    _async_update_blocking_detector(entry, api)
+    _async_update_hourly_statistics(entry, coordinator)
+    await _async_update_archive(hass, entry, api)
+
+    async def _async_flush_archive(_: Event) -> None:
+        """Write the archived rows still buffered, Home Assistant is stopping"""
+        write = api.flush_archive()
+        if write is not None:
+            await write
+
+    entry.async_on_unload(
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_flush_archive)
+    )
     entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+    LOGGER.debug("Setup of %s done in %.3fs", entry.title, time.monotonic() - start)
     return True
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Handle removal of an entry."""
-    coordinator = hass.data[DOMAIN][entry.entry_id]
-    unloaded = all(
-        await asyncio.gather(
-            *[
-                hass.config_entries.async_forward_entry_unload(entry, platform)
-                for platform in PLATFORMS
-            ]
-        )
+    coordinator: InvictaDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
+    unloaded = await hass.config_entries.async_unload_platforms(
+        entry, coordinator.platforms
     )
     if unloaded:
+        coordinator.read_api.stop_background_polling()
+        coordinator.read_api.blocking.stop()
+        coordinator.hourly = None
+        await _async_update_archive(hass, entry, coordinator.read_api, False)
         hass.data[DOMAIN].pop(entry.entry_id)
 
     return unloaded
@@ -76,5 +289,166 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Reload config entry."""
-    await async_unload_entry(hass, entry)
-    await async_setup_entry(hass, entry)
+    coordinator: InvictaDataUpdateCoordinator | None = hass.data[DOMAIN].get(
+        entry.entry_id
+    )
+    if coordinator is None or coordinator.read_api.stove_ip != entry.data.get(
+        CONF_HOST
+    ):
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+
+    # Only the options changed: keep the client, its connection and its data,
+    # and only add/remove the platforms that were toggled.
+    if entry.options.get(CONF_METRICS, False):
+        async_register_metrics_view(hass)
+    _async_update_blocking_detector(entry, coordinator.read_api)
+    _async_update_hourly_statistics(entry, coordinator)
+    await _async_update_archive(hass, entry, coordinator.read_api)
+    coordinator.stats.tank_capacity = entry.options.get(
+        CONF_TANK_CAPACITY, DEFAULT_TANK_CAPACITY
+    )
+
+    platforms = _enabled_platforms(entry)
+    removed = [p for p in coordinator.platforms if p not in platforms]
+    added = [p for p in platforms if p not in coordinator.platforms]
+    if removed:
+        await hass.config_entries.async_unload_platforms(entry, removed)
+    if added:
+        await hass.config_entries.async_forward_entry_setups(entry, added)
+    coordinator.platforms = platforms
+
+
+async def _async_first_refresh(
+    hass: HomeAssistant, entry: ConfigEntry, coordinator: InvictaDataUpdateCoordinator
+) -> None:
+    """Deferred first poll."""
+    await coordinator.async_refresh()
+    if coordinator.last_update_success:
+        _async_store_profile(hass, entry, coordinator)
+
+
+def _async_store_profile(
+    hass: HomeAssistant, entry: ConfigEntry, coordinator: InvictaDataUpdateCoordinator
+) -> None:
+    """Cache the registers detected on the first poll, for the next setups."""
+    if CONF_REGISTERS in entry.data:
+        return
+    hass.config_entries.async_update_entry(
+        entry,
+        data={**entry.data, CONF_REGISTERS: coordinator.read_api.profile.register_ids},
+    )
+
+
+async def _async_setup_catalog(
+    hass: HomeAssistant, entry: ConfigEntry, api: InvictaApiClient
+) -> None:
+    """Load the register catalog of the stove, or discover it in the background."""
+    store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.catalog")
+    stored = await store.async_load()
+    if stored is not None:
+        api.catalog = WinetRegisterCatalog.from_dict(stored)
+    else:
+        # cancelled with the entry (unloaded, or its setup failed)
+        entry.async_create_background_task(
+            hass,
+            _async_discover_catalog(api, store),
+            f"{DOMAIN} catalog discovery {entry.title}",
+        )
+
+    @callback
+    def _async_save_catalog(*_) -> None:
+        """Save the value ranges observed while polling."""
+        if api.catalog is not None and api.catalog.dirty:
+            api.catalog.dirty = False
+            store.async_delay_save(api.catalog.as_dict)
+
+    entry.async_on_unload(
+        async_track_time_interval(hass, _async_save_catalog, CATALOG_SAVE_INTERVAL)
+    )
+    entry.async_on_unload(_async_save_catalog)
+
+
+async def _async_discover_catalog(api: InvictaApiClient, store: Store) -> None:
+    """Sweep the categories once and save the catalog."""
+    catalog = await api.discover_catalog()
+    if catalog:
+        catalog.dirty = False
+        await store.async_save(catalog.as_dict())
+
+
+async def _async_setup_stats(
+    hass: HomeAssistant, entry: ConfigEntry, coordinator: InvictaDataUpdateCoordinator
+) -> None:
+    """Load the operating statistics accumulated so far, and save them."""
+    store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.stats")
+    stored = await store.async_load()
+    tank_capacity = entry.options.get(CONF_TANK_CAPACITY, DEFAULT_TANK_CAPACITY)
+    if stored is not None:
+        coordinator.stats = InvictaOperatingStats.from_dict(stored, tank_capacity)
+    else:
+        coordinator.stats.tank_capacity = tank_capacity
+
+    @callback
+    def _async_save_stats(*_) -> None:
+        """Save the accumulators, if they changed."""
+        if coordinator.stats.dirty:
+            coordinator.stats.dirty = False
+            store.async_delay_save(coordinator.stats.as_dict)
+
+    entry.async_on_unload(
+        async_track_time_interval(hass, _async_save_stats, STATS_SAVE_INTERVAL)
+    )
+    entry.async_on_unload(_async_save_stats)
+
+
+@callback
+def _async_update_blocking_detector(entry: ConfigEntry, api: InvictaApiClient) -> None:
+    """Start or stop the event loop blocking detector, per the entry options."""
+    if entry.options.get(CONF_BLOCKING_DETECTOR, False):
+        api.blocking.start()
+    else:
+        api.blocking.stop()
+
+
+async def _async_update_archive(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    api: InvictaApiClient,
+    enabled: bool | None = None,
+) -> None:
+    """Open or close the columnar archive, per the entry options."""
+    if enabled is None:
+        enabled = entry.options.get(CONF_ARCHIVE, False)
+    if not enabled:
+        pending = api.flush_archive()
+        api.archive = None
+        if pending is not None:
+            await pending
+    elif api.archive is None:
+        path = hass.config.path(ARCHIVE_DIR, api.stove_ip)
+        api.archive = await hass.async_add_executor_job(WinetArchive, path)
+
+
+@callback
+def _async_update_hourly_statistics(
+    entry: ConfigEntry, coordinator: InvictaDataUpdateCoordinator
+) -> None:
+    """Start or stop aggregating the hourly statistics, per the entry options."""
+    if not entry.options.get(CONF_HOURLY_STATISTICS, False):
+        coordinator.hourly = None
+    elif coordinator.hourly is None:
+        coordinator.hourly = InvictaHourlyStatistics(entry.entry_id, entry.title)
+
+
+def _register_name(registerid: int) -> str:
+    """Name of a known register (lower case), else its id"""
+    try:
+        return WinetRegister(registerid).name.lower()
+    except ValueError:
+        return str(registerid)
+
+
+def _enabled_platforms(entry: ConfigEntry) -> list:
+    """Platforms not disabled in the entry options."""
+    return [p for p in PLATFORMS if entry.options.get(p, True)]
@@ -1,21 +1,49 @@
 """API Client."""
+from __future__ import annotations
+
 import asyncio
 from asyncio import Task
+from collections import Counter
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
 from enum import Enum
 import time
+from typing import Union
 import aiohttp
-from aiohttp import ClientOSError
 
+from custom_components.invicta.winet.archive import WinetArchive
+from custom_components.invicta.winet.blocking import WinetBlockingDetector
+from custom_components.invicta.winet.catalog import (
+    WinetRegisterCatalog,
+    discover_catalog,
+)
+from custom_components.invicta.winet.exceptions import WinetError, WinetSchemaError
+from custom_components.invicta.winet.history import WinetHistory
 from custom_components.invicta.winet.model import WinetGetRegisterResult
+from custom_components.invicta.winet.trace import WinetTrace
+from custom_components.invicta.winet.transport import WinetTransport
+from custom_components.invicta.winet.watch import WinetDelta, WinetWatcher
+from custom_components.invicta.winet.profile import (
+    DEFAULT_PROFILE,
+    WinetModelProfile,
+    get_profile,
+)
 from custom_components.invicta.winet.winet import WinetAPILocal
 from custom_components.invicta.winet.const import (
+    FAILED_IGNITION_BIT,
     WinetRegister,
     WinetRegisterKey,
-    WinetRegisterCategory,
     WinetProductModel,
 )
 
-from .const import LOGGER
+from .const import (
+    LOGGER,
+    OFFLINE_AFTER,
+    POLL_PERMANENT_ERROR_DELAY,
+    POLL_RESULT_TTL,
+    POLL_RETRY_MAX_DELAY,
+    POLL_TIMEOUT_FLOOR,
+)
 
 
 def clamp(value, valuemin, valuemax):
@@ -68,7 +96,7 @@ class InvictaDeviceAlarm(Enum):  # type: ignore
     SMOKE_PROBE_FAILURE = 0
     SMOKE_OVERTEMPERATURE = 1
     EXTRACTOR_MALFUNCTION = 2
-    FAILED_IGNITION = 3
+    FAILED_IGNITION = FAILED_IGNITION_BIT
     NO_PELLETS = 4
     LACK_OF_PRESSURE = 5
     THERMAL_SAFETY = 6
@@ -95,12 +123,45 @@ class InvictaDeviceAlarm(Enum):  # type: ignore
         return "UNKNOWN"
 
 
+@dataclass
+class InvictaStatusTransition:
+    """The stove status changed (timestamp: wall time it was received)"""
+
+    status: InvictaDeviceStatus
+    previous: InvictaDeviceStatus
+    timestamp: float
+
+
+@dataclass
+class InvictaAlarmTransition:
+    """An alarm bit was raised or cleared (timestamp: wall time it was received)"""
+
+    alarm: InvictaDeviceAlarm
+    raised: bool
+    timestamp: float
+
+
+InvictaTransition = Union[InvictaStatusTransition, InvictaAlarmTransition]
+
+
 class InvictaApiData:
     """Usable api data for the home assistant integration"""
 
-    def __init__(self, host: str):
+    def __init__(
+        self,
+        host: str,
+        profile: WinetModelProfile = DEFAULT_PROFILE,
+        clock: Callable[[], float] = time.monotonic,
+        trace: WinetTrace | None = None,
+    ):
         """init unset data"""
         self._rawdata = WinetGetRegisterResult()
+        self._clock = clock
+        self.trace = trace if trace is not None else WinetTrace()
+        # when each register value was last received (clock time)
+        self._confirmed_at: dict[int, float] = {}
+        self.last_update: float | None = None
+        self.profile = profile
         self.signal = self._rawdata.signal
         self.name = self._rawdata.name
         self.host = host
@@ -123,10 +184,12 @@ class InvictaApiData:
             newparamsdict[key] = value
 
         # overwrite or add new key/values
+        now = self._clock()
         for newparam in newdata.params:
             key = newparam[0]
             value = newparam[1]
             newparamsdict[key] = value
+            self._confirmed_at[key] = now
 
         # convert back to list of int,int
         newparams = []
@@ -146,65 +209,110 @@ class InvictaApiData:
             self.signal = newdata.signal
             self.name = newdata.name
             self.model = WinetProductModel(newdata.model)
-            self._decode_status()
-            self._decode_alarms()
-            self._decode_temperature_read()
-            self._decode_temperature_set()
-            self._decode_power_set()
-            self._decode_fan_speed()
-
-    def _get_register_value(self, registerid: WinetRegister) -> int:
+            for register, decoder in self._decoders.items():
+                if register not in self.profile.registers:
+                    continue
+                value = self._get_register_value(register)
+                if value is None:
+                    self.trace.record("missing_register", register.value)
+                    continue
+                decoder(self, value)
+            self.last_update = now
+
+    def apply_delta(self, delta: WinetDelta) -> None:
+        """Update from a winet watch delta (changed registers only)"""
+        changed = [[key, value] for key, value in delta.changes.items()]
+        self.update(delta.info.copy(update={"params": changed}))
+        # unchanged registers were received too: they are still fresh
+        now = self._clock()
+        for key, received_at in delta.received_at.items():
+            self._confirmed_at[key] = now - (delta.timestamp - received_at)
+
+    def age(self, register: WinetRegister) -> float | None:
+        """Seconds since the register value was last received (None: never)"""
+        confirmed_at = self._confirmed_at.get(register.value)
+        if confirmed_at is None:
+            return None
+        return self._clock() - confirmed_at
+
+    def is_fresh(self, registers: Iterable[WinetRegister], max_age: float) -> bool:
+        """Were all these registers received less than max_age seconds ago ?"""
+        for register in registers:
+            age = self.age(register)
+            if age is None or age > max_age:
+                return False
+        return True
+
+    @property
+    def data_age(self) -> float | None:
+        """Seconds since the last decoded poll"""
+        if self.last_update is None:
+            return None
+        return self._clock() - self.last_update
+
+    @property
+    def register_ids(self) -> list[int]:
+        """Ids of the registers found in the polled data"""
+        return [param[0] for param in self._rawdata.params]
+
+    @property
+    def registers(self) -> dict[int, int]:
+        """Raw register values, by id"""
+        return {param[0]: param[1] for param in self._rawdata.params}
+
+    def _get_register_value(self, registerid: WinetRegister) -> int | None:
         """Parse all data (memory banks?) to find a register's value"""
         for param in self._rawdata.params:
             if param[0] == registerid.value:
                 return param[1]
-        LOGGER.error(f"RegisterId {registerid.value} not found in data")
-        LOGGER.debug(self._rawdata)
-        raise Exception("RegisterId not found in data")
+        return None
 
-    def _decode_status(self) -> None:
+    def _decode_status(self, status: int) -> None:
         """Decode status register"""
-        status = self._get_register_value(WinetRegister.STATUS)
         if status in (1, 2):
             self.status = InvictaDeviceStatus.WAIT_FOR_FLAME
         else:
             self.status = InvictaDeviceStatus(status)
 
-    def _decode_alarms(self) -> None:
+    def _decode_alarms(self, alarmsbyte: int) -> None:
         """Decode alarm register byte into individual alarms"""
-        alarmsbyte = self._get_register_value(WinetRegister.ALARMS_BITS)
-        LOGGER.debug(f"Alarm byte value is {alarmsbyte}")
+        self.trace.record("alarms", alarmsbyte)
         if alarmsbyte < 0:
             LOGGER.error("Cannot decode alarms")
             return
-        for i in range(8):
-            temp = alarmsbyte >> i
-            if temp & 1:
-                self.alarms.append(InvictaDeviceAlarm(i))
+        # the alarms set now (not appended: the list would grow on every poll)
+        self.alarms = [InvictaDeviceAlarm(i) for i in range(8) if alarmsbyte >> i & 1]
 
-    def _decode_temperature_read(self) -> None:
+    def _decode_temperature_read(self, param: int) -> None:
         """
         Decodes Temperature read register
         reg. value is two time the temperature in celsius
         """
-        param = self._get_register_value(WinetRegister.TEMPERATURE_READ)
         self.temperature_read = param / 2
 
-    def _decode_temperature_set(self) -> None:
+    def _decode_temperature_set(self, param: int) -> None:
         """
         Decodes Temperature set register
         reg. value is two time the temperature in celsius
         """
-        param = self._get_register_value(WinetRegister.TEMPERATURE_SET)
         self.temperature_set = param / 2
 
-    def _decode_power_set(self) -> None:
+    def _decode_power_set(self, param: int) -> None:
         """Power set"""
-        self.power_set = self._get_register_value(WinetRegister.POWER_SET)
+        self.power_set = param
 
-    def _decode_fan_speed(self) -> None:
+    def _decode_fan_speed(self, param: int) -> None:
         """Room vent fan speed"""
-        self.fan_speed = self._get_register_value(WinetRegister.FAN_SPEED)
+        self.fan_speed = param
+
+    _decoders = {
+        WinetRegister.STATUS: _decode_status,
+        WinetRegister.ALARMS_BITS: _decode_alarms,
+        WinetRegister.TEMPERATURE_READ: _decode_temperature_read,
+        WinetRegister.TEMPERATURE_SET: _decode_temperature_set,
+        WinetRegister.POWER_SET: _decode_power_set,
+        WinetRegister.FAN_SPEED: _decode_fan_speed,
+    }
 
     @property
     def is_on(self) -> bool:
@@ -222,9 +330,8 @@ class InvictaApiData:
 
     @property
     def error_offline(self) -> bool:
-        """Is offline ?"""
-        # TODO: another way to check if offline ???
-        return self.status == InvictaDeviceStatus.UNKNOWN
+        """Is offline ? (no fresh status for a while)"""
+        return not self.is_fresh((WinetRegister.STATUS,), OFFLINE_AFTER)
 
     @property
     def alarm_extractor_malfunction(self) -> bool:
@@ -270,24 +377,192 @@ class InvictaApiData:
 class InvictaApiClient:
     """Invicta api client. use winet control api polling as backend"""
 
-    failed_poll_attempts = 0
     is_sending = False
     is_polling_in_background = False
     stove_ip = ""
 
-    def __init__(self, session: aiohttp.ClientSession, host: str) -> None:
-        """init"""
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        host: str,
+        profile: WinetModelProfile | None = None,
+        transport: WinetTransport | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """init (transport: to replay a recorded session, HTTP if None)"""
         self._host = host
         self._session = session
-        self._data = InvictaApiData(host)
-        self._winetclient = WinetAPILocal(session, host)
+        self.trace = WinetTrace()
+        self.blocking = WinetBlockingDetector()
+        # raw register samples of the background polling
+        self.history = WinetHistory()
+        self._archive: WinetArchive | None = None
+        self._release_archive: Callable[[], None] | None = None
+        # last archive write (they run one after the other)
+        self._archive_write: asyncio.Task | None = None
+        self._data = InvictaApiData(host, profile or DEFAULT_PROFILE, clock, self.trace)
+        self._profile_detected = profile is not None
+        self._required_registers: Counter[WinetRegister] = Counter()
+        self.catalog: WinetRegisterCatalog | None = None
+        self._winetclient = WinetAPILocal(
+            session,
+            host,
+            timeout_floor=POLL_TIMEOUT_FLOOR,
+            transport=transport,
+            trace=self.trace,
+            blocking=self.blocking,
+            result_ttl=POLL_RESULT_TTL,
+        )
         self._should_poll_in_background = False
         self._bg_task: Task | None = None
+        self._watcher: WinetWatcher | None = None
+        # called with the status and alarm changes seen by the background polling
+        # (only while it runs: see subscribe)
+        self.on_transition: Callable[[InvictaTransition], None] | None = None
+        # demand driven polling: paused idle_linger seconds after the last
+        # subscriber (entity, coordinator listener) left, None: never paused
+        self.idle_linger: float | None = None
+        self.suspended = False
+        self._subscribers = 0
+        self._idle_handle: asyncio.TimerHandle | None = None
+        self._poll_interval = 5
 
         self.stove_ip = host
         self.is_polling_in_background = False
         self.is_sending = False
-        self.failed_poll_attempts = 0
+
+    @property
+    def failed_poll_attempts(self) -> int:
+        """Consecutive failed polls of the background polling"""
+        return self._watcher.failed_polls if self._watcher else 0
+
+    @property
+    def last_poll_error(self) -> WinetError | None:
+        """Error of the last background poll (None if it succeeded)"""
+        return self._watcher.last_error if self._watcher else None
+
+    @property
+    def winet(self) -> WinetAPILocal:
+        """Winet-Control client of the stove"""
+        return self._winetclient
+
+    @property
+    def watcher(self) -> WinetWatcher | None:
+        """Watcher of the background polling (None until it started)"""
+        return self._watcher
+
+    @property
+    def archive(self) -> WinetArchive | None:
+        """Columnar archive of every poll (None: not archived)"""
+        return self._archive
+
+    @archive.setter
+    def archive(self, archive: WinetArchive | None) -> None:
+        """Archive the polls: the polling runs meanwhile, even if idle"""
+        self._archive = archive
+        if archive is None and self._release_archive is not None:
+            self._release_archive()
+            self._release_archive = None
+        elif archive is not None and self._release_archive is None:
+            self._release_archive = self.subscribe()
+
+    @property
+    def profile(self) -> WinetModelProfile:
+        """Register profile of the polled model"""
+        return self._data.profile
+
+    def require_registers(
+        self, registers: Iterable[WinetRegister]
+    ) -> Callable[[], None]:
+        """Ask for registers to be polled. Returns a function to release them."""
+        registers = list(registers)
+        self._required_registers.update(registers)
+        unsubscribe = self.subscribe()
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if released:
+                return
+            released = True
+            self._required_registers.subtract(registers)
+            unsubscribe()
+
+        return release
+
+    def subscribe(self) -> Callable[[], None]:
+        """Need the polled data (resumes polling). Returns a function to release"""
+        self._subscribers += 1
+        self._cancel_idle()
+        if self.suspended:
+            self._resume()
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if released:
+                return
+            released = True
+            self._subscribers -= 1
+            if not self._subscribers:
+                self._schedule_idle()
+
+        return release
+
+    @property
+    def subscribers(self) -> int:
+        """Number of subscribers needing the polled data"""
+        return self._subscribers
+
+    def _schedule_idle(self) -> None:
+        """Pause the polling after a while, unless a subscriber comes back"""
+        self._cancel_idle()
+        if self.idle_linger is not None and self._should_poll_in_background:
+            self._idle_handle = asyncio.get_running_loop().call_later(
+                self.idle_linger, self._suspend_if_idle
+            )
+
+    def _cancel_idle(self) -> None:
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+
+    def _suspend_if_idle(self) -> None:
+        self._idle_handle = None
+        if not self._subscribers and self._should_poll_in_background:
+            LOGGER.debug("Nothing needs the data of %s: polling paused", self._host)
+            self.stop_background_polling()
+            self.suspended = True
+
+    def _resume(self) -> None:
+        """Restart the polling paused for lack of subscribers"""
+        LOGGER.debug("Polling of %s resumed", self._host)
+        self.suspended = False
+        self._start_polling(self._poll_interval)
+        if not self._subscribers:
+            # a command: poll its outcome, then pause again
+            self._schedule_idle()
+
+    async def discover_catalog(self) -> WinetRegisterCatalog:
+        """Sweep all the categories to find where each register lives."""
+        self.catalog = await discover_catalog(self._winetclient)
+        return self.catalog
+
+    def _poll_categories(self) -> tuple:
+        """Categories to poll: all from the profile or the minimum from catalog"""
+        if not self.catalog:
+            return self.profile.categories
+        registers = [r for r, count in self._required_registers.items() if count > 0]
+        if not registers:
+            registers = self.profile.registers
+        if any(r.value not in self.catalog for r in registers):
+            # not catalogued yet: poll them from the profile categories
+            return self.profile.categories
+        return self.catalog.plan(r.value for r in registers)
+
+    def seed(self, result: WinetGetRegisterResult) -> None:
+        """Use an already fetched answer (config flow probe) as first data."""
+        self._data.update(newdata=result)
 
     @property
     def data(self) -> InvictaApiData:
@@ -314,8 +589,13 @@ class InvictaApiClient:
             )
             return
 
+        self._start_polling(minimum_wait_in_seconds)
+
+    def _start_polling(self, minimum_wait_in_seconds: int) -> None:
         if not self._should_poll_in_background:
             self._should_poll_in_background = True
+            self._poll_interval = minimum_wait_in_seconds
+            self.suspended = False
             # asyncio.ensure_future(self.__background_poll(minimum_wait_in_seconds))
             LOGGER.info("!!  start_background_polling !!")
 
@@ -323,10 +603,13 @@ class InvictaApiClient:
                 self.__background_poll(minimum_wait_in_seconds),
                 name="background_polling",
             )
+            if not self._subscribers:
+                self._schedule_idle()
 
     def stop_background_polling(self) -> bool:
         """Stop background polling - return whether it had been polling."""
         self._should_poll_in_background = False
+        self._cancel_idle()
         was_running = False
         if self._bg_task:
             if not self._bg_task.cancelled():
@@ -337,69 +620,116 @@ class InvictaApiClient:
         return was_running
 
     async def __background_poll(self, minimum_wait_in_seconds: int = 5) -> None:
-        """Perform a polling loop."""
+        """Perform a polling loop (winet watch), applying the changes."""
         LOGGER.debug("__background_poll:: Function Called")
 
-        self.failed_poll_attempts = 0
-
+        self._watcher = self._winetclient.watch(
+            self._poll_categories,
+            minimum_wait_in_seconds,
+            heartbeat=True,
+            max_backoff=POLL_RETRY_MAX_DELAY,
+            permanent_error_delay=POLL_PERMANENT_ERROR_DELAY,
+            on_answer=self._observe_answer,
+        )
         self.is_polling_in_background = True
-        while self._should_poll_in_background:
-
-            start = time.time()
-            LOGGER.debug("__background_poll:: Loop start time %f", start)
-
-            try:
-                await self.poll()
-                self.failed_poll_attempts = 0
-                end = time.time()
-
-                duration: float = end - start
-                sleep_time: float = minimum_wait_in_seconds - duration
-
-                LOGGER.debug(
-                    "__background_poll:: [%f] Sleeping for [%fs]", duration, sleep_time
-                )
-
-                LOGGER.debug(
-                    "__background_poll:: duration: %f, %f, %.2fs",
-                    start,
-                    end,
-                    (end - start),
+        try:
+            async for delta in self._watcher:
+                if not self._should_poll_in_background:
+                    break
+                self.trace.record(
+                    "poll", len(delta.changes), delta.polls, self._watcher.lag
                 )
-                LOGGER.debug(
-                    "__background_poll:: Should Sleep For: %f",
-                    (minimum_wait_in_seconds - (end - start)),
+                with self.blocking.timed("api.apply_delta"):
+                    if self.on_transition is not None and (
+                        WinetRegister.STATUS.value in delta.changes
+                        or WinetRegister.ALARMS_BITS.value in delta.changes
+                    ):
+                        self._apply_transitions(delta)
+                    else:
+                        self._data.apply_delta(delta)
+                    self.history.record(delta.state)
+                    if self._archive is not None and self._archive.append(
+                        time.time(), delta.state
+                    ):
+                        self.flush_archive()
+        finally:
+            self.is_polling_in_background = False
+            LOGGER.info("__background_poll:: Background polling disabled.")
+
+    def flush_archive(self) -> asyncio.Task | None:
+        """Write the archived rows buffered so far, in an executor
+
+        The task returned (None if nothing was ever written) is done once all
+        the rows appended so far are written.
+        """
+        if self._archive is not None and self._archive.pending:
+            self._archive_write = asyncio.create_task(
+                _write_archive(
+                    self._archive, self._archive.detach(), self._archive_write
                 )
-
-                await asyncio.sleep(minimum_wait_in_seconds - (end - start))
-            except (ConnectionError, ClientOSError):
-                self.failed_poll_attempts += 1
-                LOGGER.info(
-                    "__background_poll:: Polling error [x%d]", self.failed_poll_attempts
+            )
+        return self._archive_write
+
+    def _apply_transitions(self, delta: WinetDelta) -> None:
+        """Apply a delta changing the status or alarms, report the transitions"""
+        data = self._data
+        initialized = data.last_update is not None
+        status, alarms = data.status, set(data.alarms)
+        data.apply_delta(delta)
+        if not initialized:
+            return  # first values: nothing changed
+
+        # wall time the registers were received (delta times are loop times)
+        now = time.time() - asyncio.get_running_loop().time()
+        received_at = delta.received_at
+        if data.status != status:
+            self.on_transition(
+                InvictaStatusTransition(
+                    data.status,
+                    status,
+                    now + received_at[WinetRegister.STATUS.value],
                 )
-
-        self.is_polling_in_background = False
-        LOGGER.info("__background_poll:: Background polling disabled.")
+            )
+        if set(data.alarms) != alarms:
+            timestamp = now + received_at[WinetRegister.ALARMS_BITS.value]
+            for alarm in data.alarms:
+                if alarm not in alarms:
+                    self.on_transition(InvictaAlarmTransition(alarm, True, timestamp))
+            for alarm in alarms.difference(data.alarms):
+                self.on_transition(InvictaAlarmTransition(alarm, False, timestamp))
+
+    def _observe_answer(self, category: int, result: WinetGetRegisterResult) -> None:
+        """Learn where the registers live from every polled category"""
+        if self.catalog is not None:
+            self.catalog.observe(category, result.params)
+
+    def _wake(self) -> None:
+        """A command is issued: poll its outcome, even if polling was paused"""
+        if self.suspended:
+            self._resume()
 
     async def set_fan_speed(self, value):
         """Set air room vent fan speed"""
         # ui min value is 0 (=50% fan) to 10 (=100fan)
         value = clamp(int(value), 0, 10)
-        LOGGER.debug(f"Set fan speed to {value}")
+        LOGGER.debug("Set fan speed to %d", value)
+        self._wake()
         await self._winetclient.set_register(WinetRegister.FAN_SPEED, value)
 
     async def set_power(self, value):
         """Send set register with key=002&memory=1&regId=51&value={value}"""
         # ui's min value is 2 and maximum is 5
         value = clamp(int(value), 2, 5)
-        LOGGER.debug(f"Set power to {value}")
+        LOGGER.debug("Set power to %d", value)
+        self._wake()
         await self._winetclient.set_register(WinetRegister.POWER_SET, value)
 
     async def set_temperature(self, value: float):
         """Send set register with key=002&memory=1&regId=50&value={value*2}"""
         # self defined min/max values
         value = clamp(float(value), 0.0, 25.0)
-        LOGGER.warning(f"Set temperature to {value}")
+        LOGGER.info("Set temperature to %.1f", value)
+        self._wake()
         await self._winetclient.set_register(
             WinetRegister.TEMPERATURE_SET, int(value * 2)
         )
@@ -409,6 +739,7 @@ class InvictaApiClient:
         if self.data.status != InvictaDeviceStatus.OFF:
             return
         LOGGER.debug("Turn stove on")
+        self._wake()
         await self._winetclient.get_registers(WinetRegisterKey.CHANGE_STATUS)
 
     async def turn_off(self):
@@ -416,15 +747,38 @@ class InvictaApiClient:
         if self.data.status == InvictaDeviceStatus.OFF:
             return
         LOGGER.debug("Turn stove off")
+        self._wake()
         await self._winetclient.get_registers(WinetRegisterKey.CHANGE_STATUS)
 
     async def poll(self) -> None:
         """Poll the Winet module locally."""
-        result = await self._winetclient.get_registers(
-            WinetRegisterKey.POLL_DATA, WinetRegisterCategory.POLL_CATEGORY_2
-        )
-        self._data.update(newdata=result, decode=False)
-        result = await self._winetclient.get_registers(
-            WinetRegisterKey.POLL_DATA, WinetRegisterCategory.POLL_CATEGORY_11
-        )
-        self._data.update(newdata=result)
+        categories = self._poll_categories()
+        for category in categories:
+            # an explicit poll reads the module, not the recent answers
+            result = await self._winetclient.get_registers(
+                WinetRegisterKey.POLL_DATA, category, fresh=True
+            )
+            if result is None:
+                raise WinetSchemaError(f"No registers in the answer for {category}")
+            self._observe_answer(getattr(category, "value", category), result)
+            self._data.update(newdata=result, decode=category == categories[-1])
+
+        if not self._profile_detected:
+            # first poll: use the model's profile, minus what the module lacks
+            self._profile_detected = True
+            self._data.profile = get_profile(self._data.model).restrict_to(
+                self._data.register_ids
+            )
+            LOGGER.debug("Detected register profile %s", self._data.profile)
+
+
+async def _write_archive(
+    archive: WinetArchive, batch: tuple, previous: asyncio.Task | None
+) -> None:
+    """Write detached rows once the previous write is done (same files)"""
+    if previous is not None:
+        await asyncio.wait((previous,))
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, archive.write, batch)
+    except OSError as exc:
+        LOGGER.warning("Cannot write the archive %s: %s", archive.path, exc)
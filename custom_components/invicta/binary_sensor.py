@@ -16,20 +16,23 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .coordinator import InvictaDataUpdateCoordinator
 from .const import DOMAIN
-from .entity import InvictaEntity
+from .entity import InvictaEntity, InvictaRegistersMixin
 from .api import InvictaApiData
+from .winet.const import WinetRegister
 
 
-@dataclass
+@dataclass(frozen=True, kw_only=True)
 class InvictaBinarySensorRequiredKeysMixin:
     """Mixin for required keys."""
 
     value_fn: Callable[[InvictaApiData], bool]
 
 
-@dataclass
+@dataclass(frozen=True, kw_only=True)
 class InvictaBinarySensorEntityDescription(
-    BinarySensorEntityDescription, InvictaBinarySensorRequiredKeysMixin
+    InvictaRegistersMixin,
+    BinarySensorEntityDescription,
+    InvictaBinarySensorRequiredKeysMixin,
 ):
     """Describes a binary sensor entity."""
 
@@ -40,18 +43,22 @@ INVICTA_BINARY_SENSORS: tuple[InvictaBinarySensorEntityDescription, ...] = (
         name="Power on",
         icon="mdi:power",
         value_fn=lambda data: data.is_on,
+        registers=(WinetRegister.STATUS,),
     ),
     InvictaBinarySensorEntityDescription(
         key="heating",
         name="Heating",
         icon="mdi:fire",
         value_fn=lambda data: data.is_heating,
+        registers=(WinetRegister.STATUS,),
     ),
     InvictaBinarySensorEntityDescription(
         key="error_offline",
         name="Offline Error",
         entity_category=EntityCategory.DIAGNOSTIC,
         value_fn=lambda data: data.error_offline,
+        registers=(WinetRegister.STATUS,),
+        max_age=None,
         device_class=BinarySensorDeviceClass.PROBLEM,
     ),
     InvictaBinarySensorEntityDescription(
@@ -59,6 +66,7 @@ INVICTA_BINARY_SENSORS: tuple[InvictaBinarySensorEntityDescription, ...] = (
         name="Extractor malfunction Alarm",
         entity_category=EntityCategory.DIAGNOSTIC,
         value_fn=lambda data: data.alarm_extractor_malfunction,
+        registers=(WinetRegister.ALARMS_BITS,),
         device_class=BinarySensorDeviceClass.PROBLEM,
     ),
     InvictaBinarySensorEntityDescription(
@@ -66,6 +74,7 @@ INVICTA_BINARY_SENSORS: tuple[InvictaBinarySensorEntityDescription, ...] = (
         name="Failed ignition Alarm",
         entity_category=EntityCategory.DIAGNOSTIC,
         value_fn=lambda data: data.alarm_failed_ignition,
+        registers=(WinetRegister.ALARMS_BITS,),
         device_class=BinarySensorDeviceClass.PROBLEM,
     ),
     InvictaBinarySensorEntityDescription(
@@ -73,6 +82,7 @@ INVICTA_BINARY_SENSORS: tuple[InvictaBinarySensorEntityDescription, ...] = (
         name="No pellets Alarm",
         entity_category=EntityCategory.DIAGNOSTIC,
         value_fn=lambda data: data.alarm_no_pellets,
+        registers=(WinetRegister.ALARMS_BITS,),
         device_class=BinarySensorDeviceClass.PROBLEM,
     ),
     InvictaBinarySensorEntityDescription(
@@ -80,6 +90,7 @@ INVICTA_BINARY_SENSORS: tuple[InvictaBinarySensorEntityDescription, ...] = (
         name="Open pellet compartment Alarm",
         entity_category=EntityCategory.DIAGNOSTIC,
         value_fn=lambda data: data.alarm_open_pellet_compartment,
+        registers=(WinetRegister.ALARMS_BITS,),
         device_class=BinarySensorDeviceClass.PROBLEM,
     ),
     InvictaBinarySensorEntityDescription(
@@ -87,6 +98,7 @@ INVICTA_BINARY_SENSORS: tuple[InvictaBinarySensorEntityDescription, ...] = (
         name="Thermal safety Alarm",
         entity_category=EntityCategory.DIAGNOSTIC,
         value_fn=lambda data: data.alarm_thermal_safety,
+        registers=(WinetRegister.ALARMS_BITS,),
         device_class=BinarySensorDeviceClass.PROBLEM,
     ),
     InvictaBinarySensorEntityDescription(
@@ -94,6 +106,7 @@ INVICTA_BINARY_SENSORS: tuple[InvictaBinarySensorEntityDescription, ...] = (
         name="Smoke over temperature Alarm",
         entity_category=EntityCategory.DIAGNOSTIC,
         value_fn=lambda data: data.alarm_smoke_overtemp,
+        registers=(WinetRegister.ALARMS_BITS,),
         device_class=BinarySensorDeviceClass.PROBLEM,
     ),
     InvictaBinarySensorEntityDescription(
@@ -101,6 +114,7 @@ INVICTA_BINARY_SENSORS: tuple[InvictaBinarySensorEntityDescription, ...] = (
         name="Smoke probe failure Alarm",
         entity_category=EntityCategory.DIAGNOSTIC,
         value_fn=lambda data: data.alarm_smoke_probe_failure,
+        registers=(WinetRegister.ALARMS_BITS,),
         device_class=BinarySensorDeviceClass.PROBLEM,
     ),
 )
@@ -117,6 +131,7 @@ async def async_setup_entry(
     async_add_entities(
         InvictaBinarySensor(coordinator=coordinator, description=description)
         for description in INVICTA_BINARY_SENSORS
+        if coordinator.read_api.profile.supports(*description.registers)
     )
 
 
@@ -1,6 +1,7 @@
 """Invicta Climate Entities."""
 from __future__ import annotations
 
+from dataclasses import dataclass
 from typing import Any
 
 from homeassistant.components.climate import (
@@ -23,11 +24,26 @@ from .const import (
     MAX_THERMOSTAT_TEMP,
     MIN_THERMOSTAT_TEMP,
 )
-from .entity import InvictaEntity
+from .entity import InvictaEntity, InvictaRegistersMixin
 from .api import InvictaDeviceStatus
+from .winet.const import WinetRegister
 
-INVICTA_CLIMATES: tuple[ClimateEntityDescription, ...] = (
-    ClimateEntityDescription(key="climate", name="Thermostat"),
+
+@dataclass(frozen=True, kw_only=True)
+class InvictaClimateEntityDescription(InvictaRegistersMixin, ClimateEntityDescription):
+    """Describes a climate entity."""
+
+
+INVICTA_CLIMATES: tuple[InvictaClimateEntityDescription, ...] = (
+    InvictaClimateEntityDescription(
+        key="climate",
+        name="Thermostat",
+        registers=(
+            WinetRegister.STATUS,
+            WinetRegister.TEMPERATURE_READ,
+            WinetRegister.TEMPERATURE_SET,
+        ),
+    ),
 )
 
 
@@ -44,13 +60,14 @@ async def async_setup_entry(
             description=description,
         )
         for description in INVICTA_CLIMATES
+        if coordinator.read_api.profile.supports(*description.registers)
     )
 
 
 class InvictaClimate(InvictaEntity, ClimateEntity):
     """Invicta climate entity."""
 
-    entity_description: ClimateEntityDescription
+    entity_description: InvictaClimateEntityDescription
 
     _attr_hvac_modes = [HVACMode.HEAT, HVACMode.OFF]
     _attr_min_temp = MIN_THERMOSTAT_TEMP
@@ -63,12 +80,12 @@ class InvictaClimate(InvictaEntity, ClimateEntity):
     def __init__(
         self,
         coordinator: InvictaDataUpdateCoordinator,
-        description: ClimateEntityDescription,
+        description: InvictaClimateEntityDescription,
     ) -> None:
         """Configure climate entry - and override last_temp if the thermostat is currently on."""
         super().__init__(coordinator, description)
 
-        self.last_temp = coordinator.data.temperature_set
+        self.last_temp = coordinator.read_api.data.temperature_set
 
     @property
     def hvac_mode(self) -> str:
@@ -2,28 +2,44 @@
 from __future__ import annotations
 from typing import Any
 import voluptuous as vol
-from aiohttp import ClientConnectionError
 
 from homeassistant import config_entries
+from homeassistant.components import network
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
-
-from .const import DOMAIN, LOGGER, CONF_HOST
-from .api import InvictaApiClient
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .const import (
+    DOMAIN,
+    DOMAIN_DATA,
+    LOGGER,
+    CONF_ARCHIVE,
+    CONF_BLOCKING_DETECTOR,
+    CONF_HOST,
+    CONF_HOURLY_STATISTICS,
+    CONF_METRICS,
+    CONF_TANK_CAPACITY,
+    PLATFORMS,
+)
+from .stats import DEFAULT_TANK_CAPACITY
+from .winet.const import WinetProductModel
+from .winet.discovery import discover_modules, network_hosts, probe
+from .winet.exceptions import WinetError, WinetHostUnreachableError
+from .winet.model import WinetGetRegisterResult
 
 STEP_USER_DATA_SCHEMA = vol.Schema({vol.Required(CONF_HOST): str})
 
 MANUAL_ENTRY_STRING = "IP Address"  # Simplified so it does not have to be translated
 
 
-async def validate_host_input(host: str) -> str:
+async def validate_host_input(hass: HomeAssistant, host: str) -> WinetGetRegisterResult:
     """Validate the user input allows us to connect."""
-    LOGGER.debug("Instantiating Invicta Winet-Control API with host: [%s]", host)
-    api = InvictaApiClient(session=None, host=host)
-    await api.poll()
-    productmodel = api.data.model.get_message()
-    LOGGER.debug("Found a stove: %s", productmodel)
-    # Return the serial number which will be used to calculate a unique ID for the device/sensors
-    return productmodel
+    LOGGER.debug("Probing Invicta Winet-Control module with host: [%s]", host)
+    result = await probe(async_get_clientsession(hass), host)
+    if result is None:
+        raise WinetHostUnreachableError(f"No Winet module answering at {host}")
+    LOGGER.debug("Found a stove: %s", WinetProductModel(result.model).get_message())
+    return result
 
 
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -35,18 +51,60 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         """Initialize the Config Flow Handler."""
         self._host: str = ""
         self._productmodel: str = ""
+        self._discovered: dict[str, WinetGetRegisterResult] = {}
 
     # ENTRYPOINT
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         """Start the user flow (config step entrypoint)"""
-
-        # TODO: Launch stove discovery
-        # await self._find_fireplaces()
         LOGGER.debug("STEP: user")
-        LOGGER.debug("Running Step: manual_device_entry")
-        return await self.async_step_manual_device_entry()
+        await self._async_find_stoves()
+        if not self._discovered:
+            LOGGER.debug("Running Step: manual_device_entry")
+            return await self.async_step_manual_device_entry()
+        LOGGER.debug("Running Step: pick_device")
+        return await self.async_step_pick_device()
+
+    async def _async_find_stoves(self) -> None:
+        """Probe the local networks for (not yet configured) Winet modules."""
+        configured = {
+            entry.data.get(CONF_HOST) for entry in self._async_current_entries()
+        }
+        hosts: dict[str, None] = {}
+        for adapter in await network.async_get_adapters(self.hass):
+            if not adapter["enabled"]:
+                continue
+            for ipv4 in adapter["ipv4"]:
+                for host in network_hosts(ipv4["address"], ipv4["network_prefix"]):
+                    if host not in configured:
+                        hosts[host] = None
+        self._discovered = await discover_modules(
+            async_get_clientsession(self.hass), hosts
+        )
+
+    async def async_step_pick_device(self, user_input=None) -> FlowResult:
+        """Pick one of the discovered stoves, or enter an IP address."""
+        LOGGER.debug("STEP: pick_device")
+        if user_input is not None:
+            host = user_input[CONF_HOST]
+            if host == MANUAL_ENTRY_STRING:
+                return await self.async_step_manual_device_entry()
+            return await self._async_create_stove_entry(host, self._discovered[host])
+
+        stoves = {
+            host: f"{result.name} ({host})" for host, result in self._discovered.items()
+        }
+        return self.async_show_form(
+            step_id="pick_device",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_HOST): vol.In(
+                        {**stoves, MANUAL_ENTRY_STRING: MANUAL_ENTRY_STRING}
+                    )
+                }
+            ),
+        )
 
     async def async_step_manual_device_entry(self, user_input=None) -> FlowResult:
         """Handle manual input of local IP configuration."""
@@ -56,7 +114,7 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if user_input is not None:
             try:
                 return await self._async_validate_ip_and_continue(self._host)
-            except (ConnectionError, ClientConnectionError):
+            except WinetError:
                 errors["base"] = "cannot_connect"
 
         return self.async_show_form(
@@ -68,11 +126,79 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     async def _async_validate_ip_and_continue(self, host: str) -> FlowResult:
         """Validate local config and continue."""
         self._async_abort_entries_match({CONF_HOST: host})
-        self._productmodel = await validate_host_input(host)
+        result = await validate_host_input(self.hass, host)
+        return await self._async_create_stove_entry(host, result)
+
+    async def _async_create_stove_entry(
+        self, host: str, result: WinetGetRegisterResult
+    ) -> FlowResult:
+        """Create the entry of a probed stove."""
+        self._productmodel = WinetProductModel(result.model).get_message()
         await self.async_set_unique_id(self._productmodel, raise_on_progress=False)
         self._abort_if_unique_id_configured(updates={CONF_HOST: host})
         # Store current data and jump to next stage
         self._host = host
 
+        # The probe answer is the first snapshot of the stove: no poll needed
+        self.hass.data.setdefault(DOMAIN_DATA, {})[host] = result
         return self.async_create_entry(title=self._host, data={CONF_HOST: host})
         # return self.async_show_form(step_id="api_config")
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> config_entries.OptionsFlow:
+        """Get the options flow for this handler."""
+        return OptionsFlowHandler(config_entry)
+
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle the platforms options for Invicta."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize options flow."""
+        self.config_entry = config_entry
+        self.options = dict(config_entry.options)
+
+    async def async_step_init(self, user_input=None) -> FlowResult:
+        """Manage the options."""
+        if user_input is not None:
+            self.options.update(user_input)
+            return self.async_create_entry(
+                title=self.config_entry.title, data=self.options
+            )
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    **{
+                        vol.Required(
+                            platform, default=self.options.get(platform, True)
+                        ): bool
+                        for platform in sorted(PLATFORMS)
+                    },
+                    vol.Required(
+                        CONF_METRICS, default=self.options.get(CONF_METRICS, False)
+                    ): bool,
+                    vol.Required(
+                        CONF_HOURLY_STATISTICS,
+                        default=self.options.get(CONF_HOURLY_STATISTICS, False),
+                    ): bool,
+                    vol.Required(
+                        CONF_ARCHIVE, default=self.options.get(CONF_ARCHIVE, False)
+                    ): bool,
+                    vol.Required(
+                        CONF_TANK_CAPACITY,
+                        default=self.options.get(
+                            CONF_TANK_CAPACITY, DEFAULT_TANK_CAPACITY
+                        ),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=1, max=500)),
+                    vol.Required(
+                        CONF_BLOCKING_DETECTOR,
+                        default=self.options.get(CONF_BLOCKING_DETECTOR, False),
+                    ): bool,
+                }
+            ),
+        )
@@ -1,5 +1,6 @@
 """Constants for the Invicta integration."""
 from __future__ import annotations
+from datetime import timedelta
 import logging
 from homeassistant.const import (
     Platform,
@@ -9,6 +10,7 @@ from homeassistant.const import (
 NAME = "Invicta Integration"
 DOMAIN = "invicta"
 DOMAIN_DATA = f"{DOMAIN}_data"
+DOMAIN_PROFILE = f"{DOMAIN}_profile"
 VERSION = "1.0.0"
 ISSUE_URL = "https://github.com/docteurzoidberg/ha-invicta/issues"
 
@@ -30,9 +32,48 @@ PLATFORMS = [
     Platform.FAN,
 ]
 
+# Background polling retries (seconds)
+POLL_RETRY_MAX_DELAY = 30
+POLL_PERMANENT_ERROR_DELAY = 300
+# A poll answer is reused this long (seconds) by the same poll of the
+# background polling (poll() always reads the module)
+POLL_RESULT_TTL = 1.0
+# Requests never time out faster than this (seconds): the module stalls for a
+# second or more now and then (wifi retries, busy module)
+POLL_TIMEOUT_FLOOR = 2.0
+# Polling goes on this long (seconds) once nothing needs the data, then pauses
+POLL_IDLE_LINGER = 30
+
+# Data freshness (seconds): cached values are served while they are younger
+DEFAULT_MAX_AGE = 120
+OFFLINE_AFTER = 60
+
+# Events fired on the status and alarm transitions
+EVENT_STATUS_CHANGED = f"{DOMAIN}_status_changed"
+EVENT_ALARM_RAISED = f"{DOMAIN}_alarm_raised"
+EVENT_ALARM_CLEARED = f"{DOMAIN}_alarm_cleared"
+
+# Services
+SERVICE_ANALYZE = "analyze"
+SERVICE_HISTORY = "history"
+SERVICE_PROFILE = "profile"
+SERVICE_REFILL = "refill"
+
+# Storage
+STORAGE_VERSION = 1
+ARCHIVE_DIR = f"{DOMAIN}_archive"
+CATALOG_SAVE_INTERVAL = timedelta(minutes=15)
+STATS_SAVE_INTERVAL = timedelta(minutes=5)
+
 # Configuration and options
+CONF_ARCHIVE = "archive"
+CONF_BLOCKING_DETECTOR = "blocking_detector"
 CONF_ENABLED = "enabled"
 CONF_HOST = "host"
+CONF_HOURLY_STATISTICS = "hourly_statistics"
+CONF_METRICS = "metrics"
+CONF_REGISTERS = "registers"
+CONF_TANK_CAPACITY = "tank_capacity"
 
 # Defaults
 DEFAULT_NAME = DOMAIN
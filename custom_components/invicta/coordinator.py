@@ -1,17 +1,35 @@
 """The Invicta integration."""
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Callable
 from datetime import timedelta
+from typing import Any
 
-from aiohttp import ClientConnectionError
-from async_timeout import timeout
-
-from homeassistant.core import HomeAssistant
+from homeassistant.const import CONF_HOST
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN, LOGGER
-from .api import InvictaApiData, InvictaApiClient
+from .const import (
+    DOMAIN,
+    EVENT_ALARM_CLEARED,
+    EVENT_ALARM_RAISED,
+    EVENT_STATUS_CHANGED,
+    LOGGER,
+    POLL_IDLE_LINGER,
+)
+from .api import (
+    InvictaApiData,
+    InvictaApiClient,
+    InvictaStatusTransition,
+    InvictaTransition,
+)
+from .longterm import InvictaHourlyStatistics, async_import_hourly_statistics
+from .stats import InvictaOperatingStats
+from .winet.exceptions import WinetError
 
 
 class InvictaDataUpdateCoordinator(DataUpdateCoordinator[InvictaApiData]):
@@ -30,26 +48,102 @@ class InvictaDataUpdateCoordinator(DataUpdateCoordinator[InvictaApiData]):
             update_interval=timedelta(seconds=2),
         )
         self._api = api
+        self.platforms: list = []
+        self.stats = InvictaOperatingStats()
+        self._stats_at: float | None = None
+        self._hourly: InvictaHourlyStatistics | None = None
+        self._remove_hourly_listener: CALLBACK_TYPE | None = None
+        # fired while the background polling runs: the entities, the archive
+        # or the hourly statistics need it
+        api.on_transition = self._async_fire_transition
+        # pause the polling when no entity needs the data
+        api.idle_linger = POLL_IDLE_LINGER
 
     async def _async_update_data(self) -> InvictaApiData:
-
         if not self._api.is_polling_in_background:
             LOGGER.info("Starting Invicta Background Polling Loop")
             await self._api.start_background_polling()
 
             # Don't return uninitialized poll data
-            async with timeout(15):
+            async with asyncio.timeout(15):
                 try:
                     await self._api.poll()
-                except (ConnectionError, ClientConnectionError) as exception:
-                    raise UpdateFailed from exception
+                except WinetError as exception:
+                    raise UpdateFailed(exception) from exception
+
+            if self.data is None:
+                self._async_update_device_name()
+
+        error = self._api.last_poll_error
+        if error is not None and not error.transient:
+            # don't wait for the failure count: retrying won't fix it
+            raise UpdateFailed(f"Polling error: {error}")
 
+        # Transient errors: keep serving the cached values, entities go
+        # unavailable when their own registers are too old (see InvictaEntity)
         LOGGER.debug("Failure Count %d", self._api.failed_poll_attempts)
-        if self._api.failed_poll_attempts > 10:
-            LOGGER.debug("Too many polling errors - raising exception")
-            raise UpdateFailed
+        data = self._api.data
+        if data.last_update is not None and data.last_update != self._stats_at:
+            self._stats_at = data.last_update
+            self.stats.update(data, data.last_update)
+            if self.hourly is not None:
+                rows = self.hourly.add(data, self.stats, dt_util.utcnow())
+                async_import_hourly_statistics(self.hass, rows)
+        return data
+
+    @callback
+    def _async_fire_transition(self, transition: InvictaTransition) -> None:
+        """Fire the bus event of a status or alarm transition."""
+        # the time the change was polled, not the (later) time it is fired
+        time_fired = dt_util.utc_from_timestamp(transition.timestamp)
+        event_data = {CONF_HOST: self._api.stove_ip, "name": self._api.data.name}
+        if isinstance(transition, InvictaStatusTransition):
+            event_type = EVENT_STATUS_CHANGED
+            event_data["status"] = transition.status.name.lower()
+            event_data["previous_status"] = transition.previous.name.lower()
+        else:
+            event_type = (
+                EVENT_ALARM_RAISED if transition.raised else EVENT_ALARM_CLEARED
+            )
+            event_data["alarm"] = transition.alarm.name.lower()
+        event_data["timestamp"] = time_fired.isoformat()
+        self.hass.bus.async_fire(event_type, event_data)
+
+    @callback
+    def async_add_listener(
+        self, update_callback: CALLBACK_TYPE, context: Any = None
+    ) -> Callable[[], None]:
+        """Listen for data updates, the polling runs while there are listeners."""
+        remove_listener = super().async_add_listener(update_callback, context)
+        unsubscribe = self._api.subscribe()
+
+        @callback
+        def remove() -> None:
+            remove_listener()
+            unsubscribe()
 
-        return self._api.data
+        return remove
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update all registered listeners (timed, when the detector is on)."""
+        with self._api.blocking.timed("coordinator.listeners"):
+            super().async_update_listeners()
+
+    @property
+    def hourly(self) -> InvictaHourlyStatistics | None:
+        """Hourly long-term statistics import (None: option disabled)"""
+        return self._hourly
+
+    @hourly.setter
+    def hourly(self, hourly: InvictaHourlyStatistics | None) -> None:
+        """Import the hourly statistics: the updates run meanwhile, even if idle"""
+        self._hourly = hourly
+        if hourly is None and self._remove_hourly_listener is not None:
+            self._remove_hourly_listener()
+            self._remove_hourly_listener = None
+        elif hourly is not None and self._remove_hourly_listener is None:
+            self._remove_hourly_listener = self.async_add_listener(_async_no_op)
 
     @property
     def read_api(self) -> InvictaApiClient:
@@ -65,11 +159,26 @@ class InvictaDataUpdateCoordinator(DataUpdateCoordinator[InvictaApiData]):
     def device_info(self) -> DeviceInfo:
         # DRZOID: how to get the sw version?
         """Return the device info."""
-        return DeviceInfo(
+        device_info = DeviceInfo(
             manufacturer="Invicta",
             model="Fontica 8",
-            name=self.read_api.data.name,
             identifiers={("Invicta", f"{self.read_api.data.model}]")},
             sw_version="1.0",
             configuration_url=f"http://{self._api.stove_ip}/",
         )
+        # Entities may be set up before the first poll: don't name the device "unset"
+        if self.read_api.data.name != "unset":
+            device_info["name"] = self.read_api.data.name
+        return device_info
+
+    def _async_update_device_name(self) -> None:
+        """Name the device once the first (deferred) poll returned its name."""
+        registry = dr.async_get(self.hass)
+        device = registry.async_get_device(self.device_info["identifiers"])
+        if device is not None and device.name != self.read_api.data.name:
+            registry.async_update_device(device.id, name=self.read_api.data.name)
+
+
+@callback
+def _async_no_op() -> None:
+    """Listener keeping the updates running, for the hourly statistics"""
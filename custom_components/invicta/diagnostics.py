@@ -0,0 +1,59 @@
+"""Diagnostics support for Invicta."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import REDACTED, async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, DOMAIN_PROFILE
+from .coordinator import InvictaDataUpdateCoordinator
+
+TO_REDACT = {CONF_HOST}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry: values, polling and wire trace."""
+    coordinator: InvictaDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
+    api = coordinator.read_api
+    data = api.data
+    watcher = api.watcher
+
+    return {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "data": {
+            "name": data.name,
+            "model": str(data.model),
+            "signal": data.signal,
+            "status": data.status.name,
+            "alarms": [alarm.name for alarm in data.alarms],
+            "temperature_read": data.temperature_read,
+            "temperature_set": data.temperature_set,
+            "power_set": data.power_set,
+            "fan_speed": data.fan_speed,
+            "data_age": data.data_age,
+            "registers": data.registers,
+        },
+        "polling": {
+            "in_background": api.is_polling_in_background,
+            "polls": watcher.polls if watcher else 0,
+            "errors": watcher.errors if watcher else 0,
+            "failed_polls": api.failed_poll_attempts,
+            # the error messages name the module url
+            "last_error": repr(api.last_poll_error).replace(
+                entry.data[CONF_HOST], REDACTED
+            ),
+            "lag": watcher.lag if watcher else None,
+        },
+        "trace": api.trace.dump(),
+        "blocking": api.blocking.report(),
+        # last invicta.profile service call (shared event loop: all the entries)
+        "profile": hass.data.get(DOMAIN_PROFILE),
+    }
@@ -1,10 +1,24 @@
 """Platform for shared base classes for sensors."""
 from __future__ import annotations
 
+from dataclasses import dataclass
+
+from homeassistant.core import callback
 from homeassistant.helpers.entity import EntityDescription
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
+from .const import DEFAULT_MAX_AGE
 from .coordinator import InvictaDataUpdateCoordinator
+from .winet.const import WinetRegister
+
+
+@dataclass(frozen=True, kw_only=True)
+class InvictaRegistersMixin:
+    """Mixin for the registers an entity is decoded from."""
+
+    registers: tuple[WinetRegister, ...] = ()
+    # staleness budget of the registers values, in seconds (None: no limit)
+    max_age: float | None = DEFAULT_MAX_AGE
 
 
 class InvictaEntity(CoordinatorEntity[InvictaDataUpdateCoordinator]):
@@ -27,3 +41,31 @@ class InvictaEntity(CoordinatorEntity[InvictaDataUpdateCoordinator]):
         self._attr_unique_id = f"{description.key}_{coordinator.read_api.data.model}"
         # Configure the Device Info
         self._attr_device_info = self.coordinator.device_info
+        self._blocking_section = f"entity.{description.key}"
+
+    async def async_added_to_hass(self) -> None:
+        """Have the registers of this entity polled while it is enabled."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.read_api.require_registers(
+                getattr(self.entity_description, "registers", ())
+            )
+        )
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the new state (timed with its properties, when the detector is on)."""
+        with self.coordinator.read_api.blocking.timed(self._blocking_section):
+            super()._handle_coordinator_update()
+
+    @property
+    def available(self) -> bool:
+        """Available from the first poll, as long as the values are fresh enough."""
+        if not super().available or self.coordinator.data is None:
+            return False
+        max_age = getattr(self.entity_description, "max_age", None)
+        if max_age is None:
+            return True
+        return self.coordinator.read_api.data.is_fresh(
+            self.entity_description.registers, max_age
+        )
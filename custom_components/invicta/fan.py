@@ -22,11 +22,12 @@ from homeassistant.util.percentage import (
 
 from .const import DOMAIN, LOGGER, MIN_FAN_SPEED, MAX_FAN_SPEED
 from .coordinator import InvictaDataUpdateCoordinator
-from .entity import InvictaEntity
+from .entity import InvictaEntity, InvictaRegistersMixin
 from .api import InvictaApiData, InvictaApiClient
+from .winet.const import WinetRegister
 
 
-@dataclass
+@dataclass(frozen=True, kw_only=True)
 class InvictaFanRequiredKeysMixin:
     """Required keys for fan entity."""
 
@@ -35,8 +36,10 @@ class InvictaFanRequiredKeysMixin:
     speed_range: tuple[int, int]
 
 
-@dataclass
-class InvictaFanEntityDescription(FanEntityDescription, InvictaFanRequiredKeysMixin):
+@dataclass(frozen=True, kw_only=True)
+class InvictaFanEntityDescription(
+    InvictaRegistersMixin, FanEntityDescription, InvictaFanRequiredKeysMixin
+):
     """Describes a fan entity."""
 
 
@@ -48,6 +51,7 @@ INVICTA_FANS: tuple[InvictaFanEntityDescription, ...] = (
         set_fn=lambda control_api, speed: control_api.set_fan_speed(value=speed),
         value_fn=lambda data: True,
         speed_range=(MIN_FAN_SPEED, MAX_FAN_SPEED),
+        registers=(WinetRegister.FAN_SPEED,),
     ),
 )
 
@@ -63,6 +67,7 @@ async def async_setup_entry(
     async_add_entities(
         InvictaFan(coordinator=coordinator, description=description)
         for description in INVICTA_FANS
+        if coordinator.read_api.profile.supports(*description.registers)
     )
 
 
@@ -0,0 +1,146 @@
+"""Hourly long-term statistics, aggregated in memory and imported in bulk."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+
+from homeassistant.const import UnitOfEnergy, UnitOfMass, UnitOfTemperature
+from homeassistant.core import HomeAssistant
+from homeassistant.util import slugify
+
+from .api import InvictaApiData
+from .const import DOMAIN, LOGGER
+from .stats import InvictaOperatingStats
+
+
+@dataclass
+class InvictaHourlyMetric:
+    """A value aggregated per hour (mean/min/max, or a total for sums)"""
+
+    key: str
+    name: str
+    unit: str | None
+    value_fn: Callable[[InvictaApiData, InvictaOperatingStats], float]
+    has_sum: bool = False
+
+
+HOURLY_METRICS: tuple[InvictaHourlyMetric, ...] = (
+    InvictaHourlyMetric(
+        "temperature_read",
+        "Read Temperature",
+        UnitOfTemperature.CELSIUS,
+        lambda data, stats: data.temperature_read,
+    ),
+    InvictaHourlyMetric(
+        "temperature_set",
+        "Set Temperature",
+        UnitOfTemperature.CELSIUS,
+        lambda data, stats: data.temperature_set,
+    ),
+    InvictaHourlyMetric("power_set", "Power", None, lambda data, stats: data.power_set),
+    InvictaHourlyMetric(
+        "fan_speed", "Fan speed", None, lambda data, stats: data.fan_speed
+    ),
+    InvictaHourlyMetric(
+        "pellet_energy",
+        "Pellet energy",
+        UnitOfEnergy.KILO_WATT_HOUR,
+        lambda data, stats: stats.energy,
+        has_sum=True,
+    ),
+    InvictaHourlyMetric(
+        "pellet_consumption",
+        "Pellet consumption",
+        UnitOfMass.KILOGRAMS,
+        lambda data, stats: stats.pellets,
+        has_sum=True,
+    ),
+)
+
+# Sensors whose state history is replaced by the imported statistics
+HOURLY_SENSORS = frozenset(("temperature_read", "temperature_set", "power_set"))
+
+
+class InvictaHourlyStatistics:
+    """Mean, min and max (or last total) of each metric in the current hour
+
+    add() costs a few additions per metric; when the hour changes it returns
+    the rows of the hour just closed, ready for the recorder import.
+    """
+
+    def __init__(self, entry_id: str, name: str) -> None:
+        """entry_id: of the stove's config entry (stable, unlike its address)"""
+        self._prefix = f"{DOMAIN}:{slugify(entry_id)}"
+        self._name = name
+        self._hour: datetime | None = None
+        # key: [sum, samples, min, max, last]
+        self._values: dict[str, list[float]] = {}
+
+    def statistic_id(self, metric: InvictaHourlyMetric) -> str:
+        """Id of the external statistic of a metric"""
+        return f"{self._prefix}_{metric.key}"
+
+    def add(
+        self, data: InvictaApiData, stats: InvictaOperatingStats, now: datetime
+    ) -> list[tuple[dict, dict]]:
+        """Account a sample, return the (metadata, row) of a closed hour"""
+        hour = now.replace(minute=0, second=0, microsecond=0)
+        closed = []
+        if self._hour is not None and hour != self._hour:
+            closed = self._rows()
+            self._values = {}
+        self._hour = hour
+        for metric in HOURLY_METRICS:
+            value = float(metric.value_fn(data, stats))
+            values = self._values.get(metric.key)
+            if values is None:
+                self._values[metric.key] = [value, 1, value, value, value]
+                continue
+            values[0] += value
+            values[1] += 1
+            values[2] = min(values[2], value)
+            values[3] = max(values[3], value)
+            values[4] = value
+        return closed
+
+    def _rows(self) -> list[tuple[dict, dict]]:
+        rows = []
+        for metric in HOURLY_METRICS:
+            values = self._values.get(metric.key)
+            if values is None:
+                continue
+            metadata = {
+                "has_mean": not metric.has_sum,
+                "has_sum": metric.has_sum,
+                "name": f"{self._name} {metric.name}",
+                "source": DOMAIN,
+                "statistic_id": self.statistic_id(metric),
+                "unit_of_measurement": metric.unit,
+            }
+            if metric.has_sum:
+                row = {"start": self._hour, "state": values[4], "sum": values[4]}
+            else:
+                row = {
+                    "start": self._hour,
+                    "mean": values[0] / values[1],
+                    "min": values[2],
+                    "max": values[3],
+                }
+            rows.append((metadata, row))
+        return rows
+
+
+def async_import_hourly_statistics(
+    hass: HomeAssistant, rows: list[tuple[dict, dict]]
+) -> None:
+    """Import the rows of a closed hour (recorder loaded after us: lazy import)"""
+    if not rows or "recorder" not in hass.config.components:
+        return
+    from homeassistant.components.recorder.statistics import (
+        async_add_external_statistics,
+    )
+
+    for metadata, row in rows:
+        async_add_external_statistics(hass, metadata, [row])
+    LOGGER.debug("Imported the %s hourly statistics", rows[0][1]["start"])
@@ -0,0 +1,63 @@
+"""OpenMetrics exporter of the stoves, served by Home Assistant."""
+from __future__ import annotations
+
+from aiohttp import web
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import HomeAssistant, callback
+
+from .const import CONF_METRICS, DOMAIN
+from .coordinator import InvictaDataUpdateCoordinator
+from .winet.exporter import CONTENT_TYPE, WinetExporter
+
+METRICS_VIEW = f"{DOMAIN}_metrics"
+
+
+class InvictaMetricsView(HomeAssistantView):
+    """Metrics of the entries with the exporter option enabled."""
+
+    url = "/api/invicta/metrics"
+    name = "api:invicta:metrics"
+    requires_auth = True
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """One exporter for all the entries"""
+        self.hass = hass
+        self.exporter = WinetExporter()
+
+    @callback
+    def _async_update_targets(self) -> None:
+        """Follow the entries loaded, and their option"""
+        exported = set()
+        for entry_id, coordinator in self.hass.data.get(DOMAIN, {}).items():
+            entry = self.hass.config_entries.async_get_entry(entry_id)
+            if entry is None or not entry.options.get(CONF_METRICS, False):
+                continue
+            coordinator: InvictaDataUpdateCoordinator
+            api = coordinator.read_api
+            exported.add(api.stove_ip)
+            target = self.exporter.targets.get(api.stove_ip)
+            if target is None or target.api is not api.winet:
+                self.exporter.add_target(
+                    api.stove_ip, api.winet, lambda a=api: a.watcher
+                )
+        for host in [host for host in self.exporter.targets if host not in exported]:
+            self.exporter.remove_target(host)
+
+    async def get(self, request: web.Request) -> web.Response:
+        """Render the metrics (no poll: the values of the last background poll)"""
+        self._async_update_targets()
+        if not self.exporter.targets:
+            return web.Response(status=404)
+        return web.Response(
+            body=self.exporter.render(self.hass.loop.time()).encode(),
+            headers={"Content-Type": CONTENT_TYPE},
+        )
+
+
+@callback
+def async_register_metrics_view(hass: HomeAssistant) -> None:
+    """Register the view once (views can't be removed: it checks the options)"""
+    if hass.data.get(METRICS_VIEW):
+        return
+    hass.data[METRICS_VIEW] = True
+    hass.http.register_view(InvictaMetricsView(hass))
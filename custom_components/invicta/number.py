@@ -14,7 +14,13 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .const import DOMAIN, LOGGER, MAX_POWER, MIN_POWER
 from .coordinator import InvictaDataUpdateCoordinator
-from .entity import InvictaEntity
+from .entity import InvictaEntity, InvictaRegistersMixin
+from .winet.const import WinetRegister
+
+
+@dataclass(frozen=True, kw_only=True)
+class InvictaNumberEntityDescription(InvictaRegistersMixin, NumberEntityDescription):
+    """Describes a number entity."""
 
 
 async def async_setup_entry(
@@ -25,11 +31,14 @@ async def async_setup_entry(
     """Set up power"""
     coordinator: InvictaDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
 
-    description = NumberEntityDescription(
+    description = InvictaNumberEntityDescription(
         key="power",
         name="Power Control",
         icon="mdi:arrow-expand-vertical",
+        registers=(WinetRegister.POWER_SET,),
     )
+    if not coordinator.read_api.profile.supports(*description.registers):
+        return
 
     async_add_entities(
         [InvictaPowerControlEntity(coordinator=coordinator, description=description)]
@@ -48,7 +57,7 @@ class InvictaPowerControlEntity(InvictaEntity, NumberEntity):
     def __init__(
         self,
         coordinator: InvictaDataUpdateCoordinator,
-        description: NumberEntityDescription,
+        description: InvictaNumberEntityDescription,
     ) -> None:
         """Initialize Power Sensor."""
         super().__init__(coordinator, description)
@@ -0,0 +1,123 @@
+"""Sampling profiler of the integration code running in the event loop."""
+from __future__ import annotations
+
+from collections import Counter
+import os
+import sys
+import threading
+import time
+
+DEFAULT_INTERVAL = 0.005
+DEFAULT_TOP = 25
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class InvictaProfiler:
+    """Sample the stack of a thread (the event loop) from another thread
+
+    Only the samples with a frame of the integration are kept, from its
+    outermost frame down to the running function (including the libraries it
+    calls). The sampled thread is never traced nor paused, so it costs nothing
+    but the sampler's share of the GIL.
+    """
+
+    def __init__(
+        self,
+        thread_id: int | None = None,
+        interval: float = DEFAULT_INTERVAL,
+        root: str = PACKAGE_DIR,
+    ) -> None:
+        """Sample thread_id (this thread if None) every interval seconds"""
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.root = root
+        self.samples = 0
+        self._stacks: Counter[tuple[str, ...]] = Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._started = 0.0
+        self.duration = 0.0
+
+    def start(self) -> None:
+        """Start sampling in a daemon thread"""
+        self._stop.clear()
+        self._started = time.monotonic()
+        self._thread = threading.Thread(
+            target=self._run, name="invicta_profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling (blocks until the sampler thread exits)"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.duration = time.monotonic() - self._started
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            self.samples += 1
+            stack = self._stack(frame)
+            if stack:
+                self._stacks[stack] += 1
+            del frame
+
+    def _stack(self, frame) -> tuple[str, ...]:
+        """Function names, from the outermost integration frame to the leaf"""
+        names = []
+        outermost = 0
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{_module(code.co_filename)}:{code.co_name}")
+            if code.co_filename.startswith(self.root):
+                outermost = len(names)
+            frame = frame.f_back
+        return tuple(reversed(names[:outermost]))
+
+    def top(self, limit: int = DEFAULT_TOP) -> list[dict]:
+        """Functions seen the most (total: on the stack, self: running)"""
+        total: Counter[str] = Counter()
+        own: Counter[str] = Counter()
+        for stack, count in self._stacks.items():
+            own[stack[-1]] += count
+            for name in set(stack):
+                total[name] += count
+        return [
+            {"function": name, "total": count, "self": own[name]}
+            for name, count in total.most_common(limit)
+        ]
+
+    def tree(self) -> dict:
+        """Call tree of the samples: {function: {"samples", "calls"}}"""
+        tree: dict = {}
+        for stack, count in self._stacks.items():
+            level = tree
+            for name in stack:
+                node = level.setdefault(name, {"samples": 0, "calls": {}})
+                node["samples"] += count
+                level = node["calls"]
+        return tree
+
+    def as_dict(self, limit: int = DEFAULT_TOP) -> dict:
+        """Report of the profiling session"""
+        return {
+            "duration": round(self.duration, 3),
+            "interval": self.interval,
+            "samples": self.samples,
+            "integration_samples": sum(self._stacks.values()),
+            "top": self.top(limit),
+            "tree": self.tree(),
+        }
+
+
+def _module(filename: str) -> str:
+    """Short name of a source file, relative to the integration if inside"""
+    if filename.startswith(PACKAGE_DIR):
+        filename = os.path.relpath(filename, PACKAGE_DIR)
+    else:
+        filename = os.path.basename(filename)
+    return filename.removesuffix(".py").replace(os.sep, ".")
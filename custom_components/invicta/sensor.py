@@ -3,7 +3,7 @@ from __future__ import annotations
 
 from collections.abc import Callable
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from homeassistant.components.sensor import (
     SensorDeviceClass,
@@ -12,26 +12,37 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import TEMP_CELSIUS
+from homeassistant.const import (
+    PERCENTAGE,
+    UnitOfEnergy,
+    UnitOfMass,
+    UnitOfTemperature,
+    UnitOfTime,
+)
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN
+from .const import DOMAIN, MAX_POWER, MIN_POWER
 from .coordinator import InvictaDataUpdateCoordinator
-from .entity import InvictaEntity
+from .entity import InvictaEntity, InvictaRegistersMixin
 from .api import InvictaApiData
+from .longterm import HOURLY_SENSORS
+from .stats import InvictaOperatingStats
+from .winet.const import WinetRegister
 
 
-@dataclass
+@dataclass(frozen=True, kw_only=True)
 class InvictaSensorRequiredKeysMixin:
     """Mixin for required keys."""
 
     value_fn: Callable[[InvictaApiData], float | int | str | datetime | None]
 
 
-@dataclass
+@dataclass(frozen=True, kw_only=True)
 class InvictaSensorEntityDescription(
+    InvictaRegistersMixin,
     SensorEntityDescription,
     InvictaSensorRequiredKeysMixin,
 ):
@@ -45,32 +56,48 @@ Invicta_SENSORS: tuple[InvictaSensorEntityDescription, ...] = (
         name="Power",
         state_class=SensorStateClass.MEASUREMENT,
         value_fn=lambda data: data.power_set,
+        registers=(WinetRegister.POWER_SET,),
     ),
     InvictaSensorEntityDescription(
         key="temperature_set",
         name="Set Temperature",
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
-        native_unit_of_measurement=TEMP_CELSIUS,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
         value_fn=lambda data: data.temperature_set,
+        registers=(WinetRegister.TEMPERATURE_SET,),
     ),
     InvictaSensorEntityDescription(
         key="temperature_read",
         name="Read Temperature",
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
-        native_unit_of_measurement=TEMP_CELSIUS,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
         value_fn=lambda data: data.temperature_read,
+        registers=(WinetRegister.TEMPERATURE_READ,),
     ),
     InvictaSensorEntityDescription(
         key="status",
         name="Status",
         value_fn=lambda data: data.status.get_message(),
+        registers=(WinetRegister.STATUS,),
     ),
     InvictaSensorEntityDescription(
         key="alarms",
         name="Alarms",
         value_fn=lambda data: "TODO",
+        registers=(WinetRegister.ALARMS_BITS,),
+    ),
+    InvictaSensorEntityDescription(
+        key="data_age",
+        name="Data age",
+        icon="mdi:clock-outline",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda data: None if data.data_age is None else round(data.data_age),
+        entity_registry_enabled_default=False,
+        max_age=None,
     ),
     InvictaSensorEntityDescription(
         key="name",
@@ -102,15 +129,155 @@ Invicta_SENSORS: tuple[InvictaSensorEntityDescription, ...] = (
 )
 
 
+@dataclass(frozen=True, kw_only=True)
+class InvictaStatsSensorRequiredKeysMixin:
+    """Mixin for required keys."""
+
+    stats_fn: Callable[[InvictaOperatingStats], float | int | datetime | None]
+
+
+@dataclass(frozen=True, kw_only=True)
+class InvictaStatsSensorEntityDescription(
+    InvictaRegistersMixin,
+    SensorEntityDescription,
+    InvictaStatsSensorRequiredKeysMixin,
+):
+    """Describes an operating statistics sensor entity."""
+
+
+def _tank_empty(stats: InvictaOperatingStats) -> datetime | None:
+    """When the tank will be empty, if heating at the current power"""
+    hours = stats.tank_hours_left
+    if hours is None:
+        return None
+    empty = dt_util.utcnow() + timedelta(hours=hours)
+    return empty.replace(second=0, microsecond=0)
+
+
+INVICTA_STATS_SENSORS: tuple[InvictaStatsSensorEntityDescription, ...] = (
+    InvictaStatsSensorEntityDescription(
+        key="burn_time",
+        name="Burn time",
+        icon="mdi:timer-outline",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.HOURS,
+        stats_fn=lambda stats: round(stats.burn_hours, 3),
+        registers=(WinetRegister.STATUS,),
+        max_age=None,
+    ),
+    *(
+        InvictaStatsSensorEntityDescription(
+            key=f"burn_time_power_{power}",
+            name=f"Burn time at power {power}",
+            icon="mdi:timer-outline",
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            device_class=SensorDeviceClass.DURATION,
+            native_unit_of_measurement=UnitOfTime.HOURS,
+            stats_fn=lambda stats, power=power: round(
+                stats.power_seconds[power] / 3600, 3
+            ),
+            registers=(WinetRegister.STATUS, WinetRegister.POWER_SET),
+            entity_registry_enabled_default=False,
+            max_age=None,
+        )
+        for power in range(MIN_POWER, MAX_POWER + 1)
+    ),
+    InvictaStatsSensorEntityDescription(
+        key="ignitions",
+        name="Ignitions",
+        icon="mdi:fire",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        stats_fn=lambda stats: stats.ignitions,
+        registers=(WinetRegister.STATUS,),
+        max_age=None,
+    ),
+    InvictaStatsSensorEntityDescription(
+        key="failed_ignition_rate",
+        name="Failed ignition rate",
+        icon="mdi:fire-alert",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=PERCENTAGE,
+        stats_fn=lambda stats: None
+        if stats.failed_ignition_rate is None
+        else round(stats.failed_ignition_rate, 1),
+        registers=(WinetRegister.STATUS, WinetRegister.ALARMS_BITS),
+        max_age=None,
+    ),
+    InvictaStatsSensorEntityDescription(
+        key="fan_duty",
+        name="Fan duty",
+        icon="mdi:fan",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=PERCENTAGE,
+        stats_fn=lambda stats: None
+        if stats.fan_duty is None
+        else round(stats.fan_duty, 1),
+        registers=(WinetRegister.STATUS, WinetRegister.FAN_SPEED),
+        max_age=None,
+    ),
+    InvictaStatsSensorEntityDescription(
+        key="pellet_consumption",
+        name="Pellet consumption",
+        icon="mdi:grain",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        device_class=SensorDeviceClass.WEIGHT,
+        native_unit_of_measurement=UnitOfMass.KILOGRAMS,
+        stats_fn=lambda stats: round(stats.pellets, 3),
+        registers=(WinetRegister.STATUS, WinetRegister.POWER_SET),
+        max_age=None,
+    ),
+    InvictaStatsSensorEntityDescription(
+        key="pellet_energy",
+        name="Pellet energy",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        device_class=SensorDeviceClass.ENERGY,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        stats_fn=lambda stats: round(stats.energy, 3),
+        registers=(WinetRegister.STATUS, WinetRegister.POWER_SET),
+        max_age=None,
+    ),
+    InvictaStatsSensorEntityDescription(
+        key="tank_level",
+        name="Tank level",
+        icon="mdi:storage-tank",
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.WEIGHT,
+        native_unit_of_measurement=UnitOfMass.KILOGRAMS,
+        stats_fn=lambda stats: round(stats.tank_level, 1),
+        registers=(WinetRegister.STATUS, WinetRegister.POWER_SET),
+        max_age=None,
+    ),
+    InvictaStatsSensorEntityDescription(
+        key="tank_empty",
+        name="Tank empty",
+        icon="mdi:storage-tank-outline",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        stats_fn=_tank_empty,
+        registers=(WinetRegister.STATUS, WinetRegister.POWER_SET),
+        max_age=None,
+    ),
+)
+
+
 async def async_setup_entry(
     hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
 ) -> None:
     """Define setup entry call."""
 
     coordinator: InvictaDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
+    profile = coordinator.read_api.profile
     async_add_entities(
-        InvictaSensor(coordinator=coordinator, description=description)
-        for description in Invicta_SENSORS
+        [
+            InvictaSensor(coordinator=coordinator, description=description)
+            for description in Invicta_SENSORS
+            if profile.supports(*description.registers)
+        ]
+        + [
+            InvictaStatsSensor(coordinator=coordinator, description=description)
+            for description in INVICTA_STATS_SENSORS
+            if profile.supports(*description.registers)
+        ]
     )
 
 
@@ -119,7 +286,28 @@ class InvictaSensor(InvictaEntity, SensorEntity):
 
     entity_description: InvictaSensorEntityDescription
 
+    @property
+    def state_class(self) -> SensorStateClass | str | None:
+        """No state class when the hourly statistics are imported instead."""
+        if (
+            self.coordinator.hourly is not None
+            and self.entity_description.key in HOURLY_SENSORS
+        ):
+            return None
+        return super().state_class
+
     @property
     def native_value(self) -> int | str | datetime | None:
         """Return the state."""
         return self.entity_description.value_fn(self.coordinator.read_api.data)
+
+
+class InvictaStatsSensor(InvictaEntity, SensorEntity):
+    """Sensor of the operating statistics accumulated by the coordinator."""
+
+    entity_description: InvictaStatsSensorEntityDescription
+
+    @property
+    def native_value(self) -> float | int | datetime | None:
+        """Return the state."""
+        return self.entity_description.stats_fn(self.coordinator.stats)
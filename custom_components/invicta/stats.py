@@ -0,0 +1,144 @@
+"""Operating statistics of the stove, accumulated from the polled data."""
+from __future__ import annotations
+
+from .api import InvictaApiData, InvictaDeviceAlarm, InvictaDeviceStatus
+from .const import MAX_POWER, MIN_POWER
+from .winet.const import PELLET_RATE_BY_POWER
+
+# Energy of the pellets (kWh/kg, EN plus A1)
+PELLET_ENERGY = 4.8
+DEFAULT_TANK_CAPACITY = 15.0
+# Longer gaps between two updates (seconds) are not accounted (stove offline)
+MAX_GAP = 600.0
+
+IGNITION_STATUSES = (InvictaDeviceStatus.WAIT_FOR_FLAME, InvictaDeviceStatus.POWER_ON)
+
+
+class InvictaOperatingStats:
+    """Burn time, ignitions, power and fan usage, pellets burnt
+
+    Each update accounts the time elapsed since the previous one to the
+    state seen then, and counts the status and alarm transitions: constant
+    work per poll, no history needed.
+    """
+
+    def __init__(self, tank_capacity: float = DEFAULT_TANK_CAPACITY) -> None:
+        """Empty accumulators"""
+        self.tank_capacity = tank_capacity
+        self.burn_seconds = 0.0
+        self.ignitions = 0
+        self.failed_ignitions = 0
+        self.power_seconds = {power: 0.0 for power in range(MIN_POWER, MAX_POWER + 1)}
+        # fan speed (0-10) * seconds, while burning
+        self.fan_seconds = 0.0
+        self.pellets = 0.0
+        self.pellets_since_refill = 0.0
+        self.dirty = False
+        # previous update (not saved: the clock may not survive a restart)
+        self._last: float | None = None
+        self._status = InvictaDeviceStatus.UNKNOWN
+        self._failed_ignition = False
+        self._power = MIN_POWER
+        self._fan_speed = 0
+
+    def update(self, data: InvictaApiData, now: float) -> None:
+        """Account the time since the last update, and the transitions"""
+        if self._last is not None and self._status == InvictaDeviceStatus.WORK:
+            elapsed = now - self._last
+            if 0 < elapsed <= MAX_GAP:
+                self.burn_seconds += elapsed
+                if self._power in self.power_seconds:
+                    self.power_seconds[self._power] += elapsed
+                self.fan_seconds += self._fan_speed * elapsed
+                burnt = PELLET_RATE_BY_POWER.get(self._power, 0.0) * elapsed / 3600
+                self.pellets += burnt
+                self.pellets_since_refill += burnt
+                self.dirty = True
+
+        if data.status in IGNITION_STATUSES and self._status not in IGNITION_STATUSES:
+            if self._status != InvictaDeviceStatus.UNKNOWN:
+                self.ignitions += 1
+                self.dirty = True
+        failed_ignition = InvictaDeviceAlarm.FAILED_IGNITION in data.alarms
+        if failed_ignition and not self._failed_ignition:
+            self.failed_ignitions += 1
+            self.dirty = True
+
+        self._last = now
+        self._status = data.status
+        self._failed_ignition = failed_ignition
+        self._power = data.power_set
+        self._fan_speed = data.fan_speed
+
+    def refill(self, amount: float | None = None) -> None:
+        """Pellets added to the tank (kg, None: filled up)"""
+        if amount is None:
+            self.pellets_since_refill = 0.0
+        else:
+            self.pellets_since_refill = max(self.pellets_since_refill - amount, 0.0)
+        self.dirty = True
+
+    @property
+    def burn_hours(self) -> float:
+        """Time spent heating (WORK status), in hours"""
+        return self.burn_seconds / 3600
+
+    @property
+    def failed_ignition_rate(self) -> float | None:
+        """Failed ignitions, in % of the ignitions (None: no ignition yet)"""
+        if not self.ignitions:
+            return None
+        return min(100 * self.failed_ignitions / self.ignitions, 100.0)
+
+    @property
+    def fan_duty(self) -> float | None:
+        """Mean fan speed while heating, in % of the maximum"""
+        if not self.burn_seconds:
+            return None
+        return 10 * self.fan_seconds / self.burn_seconds
+
+    @property
+    def energy(self) -> float:
+        """Energy of the pellets burnt, in kWh"""
+        return self.pellets * PELLET_ENERGY
+
+    @property
+    def tank_level(self) -> float:
+        """Estimated pellets left in the tank, in kg"""
+        return max(self.tank_capacity - self.pellets_since_refill, 0.0)
+
+    @property
+    def tank_hours_left(self) -> float | None:
+        """Hours of heating left at the current power (None: not heating)"""
+        rate = PELLET_RATE_BY_POWER.get(self._power)
+        if self._status != InvictaDeviceStatus.WORK or not rate:
+            return None
+        return self.tank_level / rate
+
+    def as_dict(self) -> dict:
+        """Json serializable accumulators"""
+        return {
+            "burn_seconds": self.burn_seconds,
+            "ignitions": self.ignitions,
+            "failed_ignitions": self.failed_ignitions,
+            "power_seconds": {str(k): v for k, v in self.power_seconds.items()},
+            "fan_seconds": self.fan_seconds,
+            "pellets": self.pellets,
+            "pellets_since_refill": self.pellets_since_refill,
+        }
+
+    @classmethod
+    def from_dict(
+        cls, data: dict, tank_capacity: float = DEFAULT_TANK_CAPACITY
+    ) -> InvictaOperatingStats:
+        """Load accumulators saved with as_dict()"""
+        stats = cls(tank_capacity)
+        stats.burn_seconds = data.get("burn_seconds", 0.0)
+        stats.ignitions = data.get("ignitions", 0)
+        stats.failed_ignitions = data.get("failed_ignitions", 0)
+        for power, seconds in data.get("power_seconds", {}).items():
+            stats.power_seconds[int(power)] = seconds
+        stats.fan_seconds = data.get("fan_seconds", 0.0)
+        stats.pellets = data.get("pellets", 0.0)
+        stats.pellets_since_refill = data.get("pellets_since_refill", 0.0)
+        return stats
@@ -12,11 +12,12 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .const import DOMAIN
 from .coordinator import InvictaDataUpdateCoordinator
-from .entity import InvictaEntity
+from .entity import InvictaEntity, InvictaRegistersMixin
 from .api import InvictaApiClient, InvictaApiData
+from .winet.const import WinetRegister
 
 
-@dataclass()
+@dataclass(frozen=True, kw_only=True)
 class InvictaSwitchRequiredKeysMixin:
     """Mixin for required keys."""
 
@@ -25,9 +26,9 @@ class InvictaSwitchRequiredKeysMixin:
     value_fn: Callable[[InvictaApiData], bool]
 
 
-@dataclass
+@dataclass(frozen=True, kw_only=True)
 class InvictaSwitchEntityDescription(
-    SwitchEntityDescription, InvictaSwitchRequiredKeysMixin
+    InvictaRegistersMixin, SwitchEntityDescription, InvictaSwitchRequiredKeysMixin
 ):
     """Describes a switch entity."""
 
@@ -39,6 +40,7 @@ INVICTA_SWITCHES: tuple[InvictaSwitchEntityDescription, ...] = (
         on_fn=lambda control_api: control_api.turn_on(),
         off_fn=lambda control_api: control_api.turn_off(),
         value_fn=lambda data: data.is_on,
+        registers=(WinetRegister.STATUS,),
     ),
 )
 
@@ -54,6 +56,7 @@ async def async_setup_entry(
     async_add_entities(
         InvictaSwitch(coordinator=coordinator, description=description)
         for description in INVICTA_SWITCHES
+        if coordinator.read_api.profile.supports(*description.registers)
     )
 
 
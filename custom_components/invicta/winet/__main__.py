@@ -0,0 +1,6 @@
+"""python -m winet"""
+import sys
+
+from .cli import main
+
+sys.exit(main())
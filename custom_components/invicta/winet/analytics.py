@@ -0,0 +1,161 @@
+"""Vectorized analytics of a columnar archive (requires numpy).
+
+    columns = load_archive("stove")
+    summarize(columns)
+"""
+from __future__ import annotations
+
+from collections.abc import Mapping
+import json
+import os
+
+import numpy as np
+
+from .archive import META_FILE, MISSING, TIME_COLUMN, column_file
+from .const import FAILED_IGNITION_BIT, PELLET_RATE_BY_POWER, WinetRegister
+
+# Raw status values (see InvictaDeviceStatus)
+IGNITION_STATUSES = (1, 2, 3)
+WORK_STATUS = 4
+# Longer gaps between two rows (seconds) are not accounted (not polled)
+DEFAULT_MAX_GAP = 600.0
+
+
+def load_archive(path: str) -> dict[int | str, np.ndarray]:
+    """Memory-map the columns: {"time": float64 array, registerid: int32 array}"""
+    with open(os.path.join(path, META_FILE), encoding="utf-8") as meta_file:
+        meta = json.load(meta_file)
+    order = "<" if meta.get("byteorder", "little") == "little" else ">"
+    names = {"time": TIME_COLUMN}
+    for registerid in meta["registers"]:
+        names[registerid] = column_file(registerid)
+    dtypes = {"time": np.dtype(f"{order}f8")}
+    sizes = {
+        key: os.path.getsize(os.path.join(path, name)) for key, name in names.items()
+    }
+    rows = min(sizes[key] // dtypes.get(key, np.dtype("i4")).itemsize for key in names)
+    columns = {}
+    for key, name in names.items():
+        dtype = dtypes.get(key, np.dtype(f"{order}i4"))
+        if rows == 0:
+            columns[key] = np.empty(0, dtype)
+        else:
+            columns[key] = np.memmap(
+                os.path.join(path, name), dtype=dtype, mode="r", shape=(rows,)
+            )
+    return columns
+
+
+def _intervals(columns: Mapping, max_gap: float) -> tuple[np.ndarray, np.ndarray]:
+    """Duration of each row (until the next one, 0 past max_gap) and status"""
+    times = np.asarray(columns["time"])
+    durations = np.diff(times, append=times[-1:]) if len(times) else times
+    durations = np.where((durations > 0) & (durations <= max_gap), durations, 0.0)
+    return durations, np.asarray(columns[WinetRegister.STATUS.value])
+
+
+def heating_rates(
+    columns: Mapping, max_gap: float = DEFAULT_MAX_GAP
+) -> dict[int, float]:
+    """Mean room temperature change (°C/h) while working, per POWER_SET level"""
+    durations, status = _intervals(columns, max_gap)
+    power = np.asarray(columns[WinetRegister.POWER_SET.value])
+    temperature = np.asarray(columns[WinetRegister.TEMPERATURE_READ.value])
+    if len(durations) < 2:
+        return {}
+    # steps between two working rows at the same power, both temperatures read
+    steps = (
+        (status[:-1] == WORK_STATUS)
+        & (status[1:] == WORK_STATUS)
+        & (power[:-1] == power[1:])
+        & (power[:-1] >= 0)
+        & (temperature[:-1] != MISSING)
+        & (temperature[1:] != MISSING)
+        & (durations[:-1] > 0)
+    )
+    levels = power[:-1][steps]
+    # the register is twice the temperature in °C
+    rises = np.diff(temperature.astype(np.float64))[steps] / 2
+    seconds = durations[:-1][steps]
+    if not len(levels):
+        return {}
+    rise_sums = np.bincount(levels, weights=rises)
+    second_sums = np.bincount(levels, weights=seconds)
+    return {
+        int(level): float(rise_sums[level] / second_sums[level] * 3600)
+        for level in np.flatnonzero(second_sums)
+    }
+
+
+def ignition_statistics(columns: Mapping) -> dict[str, float | int | None]:
+    """Ignitions, successful ones (flame established) and failures"""
+    status = np.asarray(columns[WinetRegister.STATUS.value])
+    alarms = np.asarray(columns[WinetRegister.ALARMS_BITS.value])
+    igniting = np.isin(status, IGNITION_STATUSES)
+    started = int(np.count_nonzero(igniting[1:] & ~igniting[:-1]))
+    succeeded = int(np.count_nonzero(igniting[:-1] & (status[1:] == WORK_STATUS)))
+    failed_bit = (alarms != MISSING) & ((alarms >> FAILED_IGNITION_BIT) & 1 == 1)
+    failed = int(np.count_nonzero(failed_bit[1:] & ~failed_bit[:-1]))
+    return {
+        "ignitions": started,
+        "succeeded": succeeded,
+        "failed": failed,
+        "success_rate": succeeded / started if started else None,
+    }
+
+
+def duty_cycles(
+    columns: Mapping, max_gap: float = DEFAULT_MAX_GAP
+) -> dict[str, float | None]:
+    """Share of the polled time spent working, and mean fan speed (%) then"""
+    durations, status = _intervals(columns, max_gap)
+    fan_speed = np.asarray(columns[WinetRegister.FAN_SPEED.value])
+    total = float(durations.sum())
+    working = status == WORK_STATUS
+    work_seconds = float(durations[working].sum())
+    fan_speed = np.where(fan_speed == MISSING, 0, fan_speed)
+    fan_seconds = float((durations * fan_speed)[working].sum())
+    return {
+        "polled_hours": total / 3600,
+        "work_hours": work_seconds / 3600,
+        "work_share": work_seconds / total if total else None,
+        "fan_duty": 10 * fan_seconds / work_seconds if work_seconds else None,
+    }
+
+
+def consumption(
+    columns: Mapping,
+    rates: Mapping[int, float] = PELLET_RATE_BY_POWER,
+    max_gap: float = DEFAULT_MAX_GAP,
+) -> dict[str, float]:
+    """Estimated pellets burnt (kg), in total and per POWER_SET level"""
+    durations, status = _intervals(columns, max_gap)
+    power = np.asarray(columns[WinetRegister.POWER_SET.value])
+    table = np.zeros(max(rates) + 1)
+    for level, rate in rates.items():
+        table[level] = rate / 3600
+    known = (status == WORK_STATUS) & (power >= 0) & (power < len(table))
+    burnt = durations[known] * table[power[known]]
+    per_level = np.bincount(power[known], weights=burnt, minlength=len(table))
+    return {
+        "total": float(burnt.sum()),
+        **{f"power_{level}": float(per_level[level]) for level in sorted(rates)},
+    }
+
+
+def summarize(
+    columns: Mapping,
+    rates: Mapping[int, float] = PELLET_RATE_BY_POWER,
+    max_gap: float = DEFAULT_MAX_GAP,
+) -> dict:
+    """All the analytics of an archive, json serializable"""
+    times = columns["time"]
+    return {
+        "rows": len(times),
+        "start": float(times[0]) if len(times) else None,
+        "end": float(times[-1]) if len(times) else None,
+        "heating_rates": heating_rates(columns, max_gap),
+        "ignitions": ignition_statistics(columns),
+        "duty_cycles": duty_cycles(columns, max_gap),
+        "pellets": consumption(columns, rates, max_gap),
+    }
@@ -0,0 +1,148 @@
+"""Append-only columnar archive of the register values.
+
+An archive is a directory with one fixed-width column file per register,
+aligned on a shared time column (a row per poll):
+
+    meta.json   {"version": 1, "registers": [0, 2, ...], "byteorder": "little"}
+    time.f8     wall time of each row (float64)
+    r<id>.i4    value of the register <id> in each row (int32, MISSING if absent)
+
+The columns can be memory-mapped as is (see analytics.load_archive), and
+are written without numpy: rows are buffered, and appended by flush(), or
+detach() in the event loop then write() in an executor.
+"""
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterable, Mapping
+import json
+import os
+import sys
+
+from .const import WinetRegister
+
+ARCHIVE_VERSION = 1
+MISSING = -(2**31)
+DEFAULT_FLUSH_ROWS = 120
+
+TIME_COLUMN = "time.f8"
+META_FILE = "meta.json"
+
+
+def column_file(registerid: int) -> str:
+    """File name of the column of a register"""
+    return f"r{registerid}.i4"
+
+
+class WinetArchive:
+    """Writer of a columnar archive (created, or appended to if it exists)"""
+
+    def __init__(
+        self,
+        path: str,
+        registers: Iterable[int] | None = None,
+        flush_rows: int = DEFAULT_FLUSH_ROWS,
+    ) -> None:
+        """registers: columns of a new archive (all the known registers if None)"""
+        self.path = path
+        self.flush_rows = flush_rows
+        meta_path = os.path.join(path, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as meta_file:
+                meta = json.load(meta_file)
+            if meta.get("byteorder", sys.byteorder) != sys.byteorder:
+                raise ValueError(f"{path} was written with another byte order")
+            self.registers = list(meta["registers"])
+        else:
+            self.registers = sorted(
+                registers
+                if registers is not None
+                else (register.value for register in WinetRegister)
+            )
+            os.makedirs(path, exist_ok=True)
+            with open(meta_path, "w", encoding="utf-8") as meta_file:
+                json.dump(
+                    {
+                        "version": ARCHIVE_VERSION,
+                        "registers": self.registers,
+                        "byteorder": sys.byteorder,
+                    },
+                    meta_file,
+                )
+        self.rows = self._repair()
+        # a write failed and the columns could not be cut back yet
+        self._misaligned = False
+        self._times = array("d")
+        self._columns = {registerid: array("i") for registerid in self.registers}
+
+    def _repair(self) -> int:
+        """Cut the columns to the rows fully written (after a crash), count them"""
+        files = [TIME_COLUMN] + [column_file(r) for r in self.registers]
+        sizes = [8] + [4] * len(self.registers)
+        rows = min(
+            (
+                os.path.getsize(os.path.join(self.path, name)) // size
+                if os.path.exists(os.path.join(self.path, name))
+                else 0
+            )
+            for name, size in zip(files, sizes)
+        )
+        for name, size in zip(files, sizes):
+            with open(os.path.join(self.path, name), "ab") as column:
+                if column.tell() != rows * size:
+                    column.truncate(rows * size)
+        return rows
+
+    @property
+    def pending(self) -> int:
+        """Rows buffered, not written yet"""
+        return len(self._times)
+
+    def append(self, timestamp: float, values: Mapping[int, int]) -> bool:
+        """Buffer a row, return True when it is time to flush()"""
+        self._times.append(timestamp)
+        for registerid, column in self._columns.items():
+            column.append(values.get(registerid, MISSING))
+        return len(self._times) >= self.flush_rows
+
+    def detach(self) -> tuple[array, dict[int, array]]:
+        """Take the buffered rows, to write() them from another thread"""
+        batch = (self._times, self._columns)
+        self._times = array("d")
+        self._columns = {registerid: array("i") for registerid in self.registers}
+        return batch
+
+    def write(self, batch: tuple[array, dict[int, array]]) -> None:
+        """Append detached rows to the column files (blocking I/O)
+
+        On an error, the columns are cut back to the rows fully written (now,
+        or before the next write), so the next rows stay aligned.
+        """
+        times, columns = batch
+        if not times:
+            return
+        if self._misaligned:
+            self.rows = self._repair()
+            self._misaligned = False
+        try:
+            for registerid, column in columns.items():
+                with open(
+                    os.path.join(self.path, column_file(registerid)), "ab"
+                ) as file:
+                    column.tofile(file)
+            # time last: a row counts once all its values are written
+            with open(os.path.join(self.path, TIME_COLUMN), "ab") as file:
+                times.tofile(file)
+        except OSError:
+            self._misaligned = True
+            try:
+                self.rows = self._repair()
+                self._misaligned = False
+            except OSError:
+                pass
+            raise
+        self.rows += len(times)
+
+    def flush(self) -> None:
+        """Write the buffered rows (blocking I/O)"""
+        self.write(self.detach())
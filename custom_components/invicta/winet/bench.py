@@ -0,0 +1,101 @@
+"""CPU cost per request of the transports, against a local fake module.
+
+    python -m winet bench --requests 5000
+
+The fake module runs in the same process: its share of the CPU time is the
+same for every transport, the difference is the client's.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+
+import aiohttp
+
+from .const import WinetRegisterCategory, WinetRegisterKey
+from .transport import WinetStreamTransport
+from .winet import WinetAPILocal
+
+DEFAULT_REQUESTS = 2000
+WARMUP_REQUESTS = 50
+
+# A category 2 poll answer, of the usual size
+POLL_ANSWER = json.dumps(
+    {
+        "params": [[registerid, 40 + registerid] for registerid in range(40)],
+        "cat": 2,
+        "signal": -60,
+        "bk": 0,
+        "authLevel": 0,
+        "model": 1,
+        "name": "Stove",
+    },
+    separators=(",", ":"),
+).encode()
+ANSWER = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: application/json\r\n"
+    b"Content-Length: " + str(len(POLL_ANSWER)).encode() + b"\r\n\r\n" + POLL_ANSWER
+)
+
+
+async def _serve_module(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    """Answer every request of a kept-alive connection with POLL_ANSWER"""
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            for line in head.split(b"\r\n"):
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length":
+                    await reader.readexactly(int(value))
+            writer.write(ANSWER)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _measure(api: WinetAPILocal, requests: int) -> dict:
+    """CPU and wall time of sequential polls"""
+    category = WinetRegisterCategory.POLL_CATEGORY_2
+    for _ in range(WARMUP_REQUESTS):
+        await api.get_registers(WinetRegisterKey.POLL_DATA, category)
+    loop = asyncio.get_running_loop()
+    cpu, wall = time.process_time(), loop.time()
+    for _ in range(requests):
+        await api.get_registers(WinetRegisterKey.POLL_DATA, category)
+    cpu, wall = time.process_time() - cpu, loop.time() - wall
+    return {
+        "requests": requests,
+        "cpu_us_per_request": round(cpu / requests * 1e6, 1),
+        "requests_per_second": round(requests / wall, 1) if wall else None,
+    }
+
+
+async def benchmark_transports(requests: int = DEFAULT_REQUESTS) -> dict:
+    """Measure the aiohttp transport and the stream transport"""
+    server = await asyncio.start_server(_serve_module, "127.0.0.1", 0)
+    host = "127.0.0.1:%d" % server.sockets[0].getsockname()[1]
+    results = {}
+    try:
+        async with aiohttp.ClientSession() as session:
+            results["aiohttp"] = await _measure(WinetAPILocal(session, host), requests)
+        stream = WinetStreamTransport()
+        try:
+            results["stream"] = await _measure(
+                WinetAPILocal(None, host, transport=stream), requests
+            )
+        finally:
+            await stream.close()
+    finally:
+        server.close()
+        await server.wait_closed()
+    results["cpu_ratio"] = round(
+        results["stream"]["cpu_us_per_request"]
+        / results["aiohttp"]["cpu_us_per_request"],
+        3,
+    )
+    return results
@@ -0,0 +1,159 @@
+"""Detection of the code blocking the event loop."""
+from __future__ import annotations
+
+from collections import Counter
+from contextlib import nullcontext
+import logging
+import sys
+import threading
+import time
+import traceback
+
+LOGGER = logging.getLogger(__package__)
+
+# A step of the event loop longer than this (seconds) makes the UI stutter
+DEFAULT_BLOCKING_THRESHOLD = 0.05
+# Distinct stacks kept per offender
+MAX_STACKS = 5
+# Innermost frames kept per stack
+STACK_DEPTH = 12
+
+_NOT_TIMED = nullcontext()
+
+
+class _Section:
+    """Timed section of code, run by the event loop thread"""
+
+    __slots__ = ("_detector", "_name", "_start")
+
+    def __init__(self, detector: WinetBlockingDetector, name: str) -> None:
+        self._detector = detector
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+        self._detector._enter(self._name, self._start)
+
+    def __exit__(self, *exc) -> None:
+        self._detector._exit(self._name, time.perf_counter() - self._start)
+
+
+class WinetBlockingDetector:
+    """Watchdog of the sections of code run by the event loop (opt-in)
+
+    with detector.timed("decode"):
+        ...
+
+    Once started, each timed section longer than the threshold is counted,
+    and a watchdog thread samples the stack of the sections still running
+    past the threshold, to show where they block. Stopped, timed() returns a
+    shared no-op context manager.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_BLOCKING_THRESHOLD) -> None:
+        """Report the sections longer than threshold seconds"""
+        self.threshold = threshold
+        self.enabled = False
+        self.offenders: dict[str, dict] = {}
+        self._stacks: dict[str, Counter[tuple[str, ...]]] = {}
+        self._running: list[tuple[str, float]] = []
+        # innermost running section: read by the watchdog thread
+        self._current: tuple[str, float] | None = None
+        self._thread_id = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start watching the sections run by this thread (the event loop)"""
+        if self.enabled:
+            return
+        self.enabled = True
+        self._thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._watch, name="winet_blocking_detector", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching (the offenders found are kept)"""
+        self.enabled = False
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._running.clear()
+        self._current = None
+
+    def timed(self, name: str):
+        """Context manager timing a section of code"""
+        if not self.enabled:
+            return _NOT_TIMED
+        return _Section(self, name)
+
+    def _enter(self, name: str, start: float) -> None:
+        self._running.append((name, start))
+        self._current = self._running[-1]
+
+    def _exit(self, name: str, elapsed: float) -> None:
+        if self._running:
+            self._running.pop()
+        self._current = self._running[-1] if self._running else None
+        if elapsed < self.threshold:
+            return
+        offender = self.offenders.get(name)
+        if offender is None:
+            LOGGER.warning(
+                "%s blocked the event loop for %.3fs (threshold %.3fs)",
+                name,
+                elapsed,
+                self.threshold,
+            )
+            offender = self.offenders[name] = {"count": 0, "max": 0.0, "total": 0.0}
+        offender["count"] += 1
+        offender["max"] = max(offender["max"], elapsed)
+        offender["total"] += elapsed
+
+    def _watch(self) -> None:
+        """Sample the stack of each section running past the threshold, once"""
+        sampled = None
+        while not self._stop.wait(self.threshold / 2):
+            current = self._current
+            if current is None or current is sampled:
+                continue
+            name, start = current
+            if time.perf_counter() - start < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                return
+            stack = tuple(
+                line.strip() for line in traceback.format_stack(frame, STACK_DEPTH)
+            )
+            del frame
+            sampled = current
+            stacks = self._stacks.setdefault(name, Counter())
+            if stack in stacks or len(stacks) < MAX_STACKS:
+                stacks[stack] += 1
+
+    def report(self) -> dict:
+        """Offenders, the worst first, with their stack samples"""
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "offenders": {
+                name: {
+                    **offender,
+                    "stacks": [
+                        {"count": count, "stack": list(stack)}
+                        for stack, count in self._stacks.get(
+                            name, Counter()
+                        ).most_common()
+                    ],
+                }
+                for name, offender in sorted(
+                    self.offenders.items(), key=lambda item: -item[1]["total"]
+                )
+            },
+        }
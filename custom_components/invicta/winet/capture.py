@@ -0,0 +1,223 @@
+"""Capture and replay of the raw traffic with a module.
+
+Recordings are gzip NDJSON files, one record per request:
+
+    {"ts": 1666000000.123, "host": "192.168.1.20", "url": "/ajax/get-registers",
+     "data": {"key": "020", "category": "2"}, "rtt": 0.084, "body": "{...}"}
+
+with "error", "message" (and "status") instead of "body" for a failed one.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Iterable, Iterator
+import gzip
+import json
+import logging
+import os
+import time
+from urllib.parse import urlsplit
+
+from . import exceptions
+from .exceptions import WinetError, WinetHTTPStatusError, WinetReplayExhaustedError
+from .transport import WinetTransport
+
+LOGGER = logging.getLogger(__package__)
+
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUPS = 3
+
+
+class WinetRecorder:
+    """Append-only gzip NDJSON file, rotated when it reaches max_bytes.
+
+    The records are buffered, and written in an executor (one write at a
+    time): the event loop never waits for the disk. A failed write is logged,
+    its records are lost.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backups: int = DEFAULT_BACKUPS,
+    ) -> None:
+        """Rotated files are path.1 (newest) to path.<backups> (oldest)"""
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._raw = None
+        self._file: gzip.GzipFile | None = None
+        self._encoder = json.JSONEncoder(separators=(",", ":"))
+        self._lines: list[str] = []
+        self._writing: asyncio.Future | None = None
+
+    def _open(self) -> gzip.GzipFile:
+        # a new gzip member is appended to an existing file
+        self._raw = open(self.path, "ab")  # pylint: disable=consider-using-with
+        self._file = gzip.GzipFile(fileobj=self._raw, mode="ab")
+        return self._file
+
+    def _rotate(self) -> None:
+        self._close_file()
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{index}"):
+                os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def _write_lines(self, lines: list[str]) -> None:
+        """Append encoded records (blocking I/O)"""
+        file = self._file or self._open()
+        file.write("".join(lines).encode())
+        # compressed size, as flushed by the compressor
+        if self._raw.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _write_pending(self) -> None:
+        """Write the buffered records in an executor, unless a write runs"""
+        if self._writing is None and self._lines:
+            lines, self._lines = self._lines, []
+            self._writing = asyncio.get_running_loop().run_in_executor(
+                None, self._write_lines, lines
+            )
+            self._writing.add_done_callback(self._written)
+
+    def _written(self, future: asyncio.Future) -> None:
+        self._writing = None
+        if not future.cancelled() and future.exception() is not None:
+            LOGGER.warning(
+                "Cannot write the recording %s: %s", self.path, future.exception()
+            )
+        # the records buffered meanwhile
+        self._write_pending()
+
+    def write(self, record: dict) -> None:
+        """Append a record (buffered, written in an executor)"""
+        self._lines.append(self._encoder.encode(record) + "\n")
+        self._write_pending()
+
+    async def flush(self) -> None:
+        """Wait until the records appended so far are written"""
+        while self._writing is not None:
+            # its done callback starts the next write, if any
+            await asyncio.wait((self._writing,))
+
+    def close(self) -> None:
+        """Write the buffered records, close the file (blocking I/O: flush first)"""
+        if self._lines:
+            lines, self._lines = self._lines, []
+            try:
+                self._write_lines(lines)
+            except OSError as exc:
+                LOGGER.warning("Cannot write the recording %s: %s", self.path, exc)
+        self._close_file()
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._raw.close()
+            self._file = self._raw = None
+
+
+class WinetRecordingTransport(WinetTransport):
+    """Forward to a transport, recording every request and its answer."""
+
+    def __init__(self, transport: WinetTransport, recorder: WinetRecorder) -> None:
+        """Record the exchanges of transport"""
+        self.transport = transport
+        self.recorder = recorder
+
+    async def post(self, url: str, data: dict[str, str], timeout: float) -> bytes:
+        """Forward, then record the answer or the error"""
+        loop = asyncio.get_running_loop()
+        parts = urlsplit(url)
+        record = {
+            "ts": round(time.time(), 3),
+            "host": parts.netloc,
+            "url": parts.path,
+            "data": data,
+        }
+        start = loop.time()
+        try:
+            body = await self.transport.post(url, data, timeout)
+        except WinetError as exc:
+            record["rtt"] = round(loop.time() - start, 4)
+            record["error"] = type(exc).__name__
+            record["message"] = str(exc)
+            if isinstance(exc, WinetHTTPStatusError):
+                record["status"] = exc.status
+            self.recorder.write(record)
+            raise
+        record["rtt"] = round(loop.time() - start, 4)
+        record["body"] = body.decode("utf-8", "replace")
+        self.recorder.write(record)
+        return body
+
+
+def read_records(*paths: str) -> Iterator[dict]:
+    """Records of recording files (oldest first: path.3, path.2, path.1, path)"""
+    for path in paths:
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _recorded_error(record: dict, url: str) -> WinetError:
+    error_class = getattr(exceptions, record["error"], None)
+    if not isinstance(error_class, type) or not issubclass(error_class, WinetError):
+        error_class = exceptions.WinetConnectionError
+    if issubclass(error_class, WinetHTTPStatusError):
+        return error_class(url, record.get("status", 0))
+    return error_class(record.get("message", ""))
+
+
+class WinetReplayTransport(WinetTransport):
+    """Answer the requests with the recorded answers of the same requests.
+
+    speed: None answers immediately (benchmarks), 1.0 waits the recorded
+    round trip times (real speed), 2.0 half of them... With cycle, the
+    recorded answers are served again once all were.
+    """
+
+    def __init__(
+        self, records: Iterable[dict], speed: float | None = None, cycle: bool = False
+    ) -> None:
+        """Index the records by request"""
+        self.speed = speed
+        self.cycle = cycle
+        self.replayed = 0
+        self._answers: dict[tuple, deque[dict]] = {}
+        for record in records:
+            key = self._key(record["url"], record["data"])
+            self._answers.setdefault(key, deque()).append(record)
+
+    @classmethod
+    def from_files(
+        cls, *paths: str, speed: float | None = None, cycle: bool = False
+    ) -> WinetReplayTransport:
+        """Replay recording files"""
+        return cls(read_records(*paths), speed, cycle)
+
+    @staticmethod
+    def _key(url: str, data: dict[str, str]) -> tuple:
+        return urlsplit(url).path, tuple(sorted(data.items()))
+
+    async def post(self, url: str, data: dict[str, str], timeout: float) -> bytes:
+        """Next recorded answer of this request"""
+        answers = self._answers.get(self._key(url, data))
+        if not answers:
+            raise WinetReplayExhaustedError(f"No recorded answer left for {data}")
+        record = answers.popleft()
+        if self.cycle:
+            answers.append(record)
+        if self.speed:
+            await asyncio.sleep(record.get("rtt", 0) / self.speed)
+        self.replayed += 1
+        if "error" in record:
+            raise _recorded_error(record, url)
+        return record["body"].encode()
@@ -0,0 +1,124 @@
+"""Register catalog: which registers live in which category."""
+from __future__ import annotations
+
+from collections.abc import Iterable
+from itertools import combinations
+import logging
+
+from .const import WinetRegisterKey
+from .exceptions import WinetError
+from .winet import WinetAPILocal
+
+LOGGER = logging.getLogger(__package__)
+
+# Categories swept by the discovery (the web-ui only uses 2, 6 and 11)
+CATALOG_CATEGORIES = range(0, 16)
+
+# Only read keys are swept: CHANGE_STATUS toggles the stove on/off !
+CATALOG_KEYS = (WinetRegisterKey.POLL_DATA,)
+
+
+class WinetRegisterCatalog:
+    """Register id -> category and observed value range"""
+
+    def __init__(self, registers: dict[int, dict[int, list[int]]] | None = None):
+        """registers: {register id: {category: [min, max]}}"""
+        self._registers = registers or {}
+        self._plans: dict[frozenset[int], tuple[int, ...]] = {}
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self._registers)
+
+    def __contains__(self, registerid: int) -> bool:
+        return registerid in self._registers
+
+    def categories_of(self, registerid: int) -> list[int]:
+        """Categories returning this register"""
+        return sorted(self._registers.get(registerid, {}))
+
+    def value_range(self, registerid: int) -> tuple[int, int] | None:
+        """Min and max values seen for this register, in any category"""
+        ranges = self._registers.get(registerid)
+        if not ranges:
+            return None
+        return (
+            min(low for low, _ in ranges.values()),
+            max(high for _, high in ranges.values()),
+        )
+
+    def observe(self, category: int, params: Iterable[list[int]]) -> None:
+        """Record the registers (and values) returned for a category."""
+        for registerid, value in params:
+            ranges = self._registers.setdefault(registerid, {})
+            bounds = ranges.get(category)
+            if bounds is None:
+                ranges[category] = [value, value]
+                self._plans.clear()
+            elif bounds[0] <= value <= bounds[1]:
+                continue
+            else:
+                bounds[0] = min(bounds[0], value)
+                bounds[1] = max(bounds[1], value)
+            self.dirty = True
+
+    def plan(self, register_ids: Iterable[int]) -> tuple[int, ...]:
+        """Smallest set of categories to poll to get all these registers."""
+        needed = frozenset(r for r in register_ids if r in self._registers)
+        if needed not in self._plans:
+            self._plans[needed] = self._plan(needed)
+        return self._plans[needed]
+
+    def _plan(self, needed: frozenset[int]) -> tuple[int, ...]:
+        """Exact set cover: there are only a handful of categories."""
+        candidates = sorted({c for r in needed for c in self._registers[r]})
+        for size in range(1, len(candidates) + 1):
+            for categories in combinations(candidates, size):
+                covered = set()
+                for category in categories:
+                    covered.update(r for r in needed if category in self._registers[r])
+                if covered == needed:
+                    return categories
+        return ()
+
+    def as_dict(self) -> dict:
+        """Json serializable catalog"""
+        return {
+            str(registerid): {
+                str(category): list(bounds) for category, bounds in ranges.items()
+            }
+            for registerid, ranges in self._registers.items()
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> WinetRegisterCatalog:
+        """Load a catalog saved with as_dict()"""
+        return cls(
+            {
+                int(registerid): {
+                    int(category): list(bounds) for category, bounds in ranges.items()
+                }
+                for registerid, ranges in data.items()
+            }
+        )
+
+
+async def discover_catalog(
+    api: WinetAPILocal,
+    categories: Iterable[int] = CATALOG_CATEGORIES,
+    keys: Iterable[WinetRegisterKey] = CATALOG_KEYS,
+) -> WinetRegisterCatalog:
+    """Sweep every key/category combination once and catalog the registers"""
+    catalog = WinetRegisterCatalog()
+    for key in keys:
+        for category in categories:
+            try:
+                result = await api.get_registers(key, category)
+            except WinetError:
+                LOGGER.debug("Catalog: no answer for key %s category %d", key, category)
+                continue
+            if result is None or not result.params:
+                continue
+            catalog.observe(category, result.params)
+    LOGGER.debug("Catalog: found %d registers", len(catalog))
+    return catalog
@@ -0,0 +1,503 @@
+"""Command line tools for Winet modules, outside of Home Assistant.
+
+    python -m winet poll 192.168.1.20 192.168.1.21 --interval 10 --changes-only
+    python -m winet poll --hosts-file stoves.txt --category 2 --category 11
+    python -m winet proxy 192.168.1.20=8081 192.168.1.21=8082
+    python -m winet export 192.168.1.20 192.168.1.21 --port 9090
+    python -m winet poll 192.168.1.20 --record stove.ndjson.gz
+    python -m winet replay stove.ndjson.gz --polls 10000
+    python -m winet poll 192.168.1.20 --archive archives/
+    python -m winet analyze archives/192.168.1.20
+    python -m winet poll 192.168.1.20 --lean
+    python -m winet bench --requests 5000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Iterable, Mapping
+import json
+import logging
+import os
+import sys
+import time
+from typing import TextIO
+
+import aiohttp
+
+from .archive import WinetArchive
+from .bench import DEFAULT_REQUESTS, benchmark_transports
+from .capture import DEFAULT_MAX_BYTES, WinetRecorder, WinetReplayTransport
+from .const import WinetRegister, WinetRegisterCategory, WinetRegisterKey
+from .exceptions import WinetError
+from .exporter import serve as serve_exporter
+from .model import WinetGetRegisterResult
+from .proxy import DEFAULT_PROXY_INTERVAL, serve
+from .transport import WinetStreamTransport
+from .watch import WinetDelta, WinetWatcher
+from .winet import WinetAPILocal
+
+LOGGER = logging.getLogger(__package__)
+
+DEFAULT_CATEGORIES = (
+    WinetRegisterCategory.POLL_CATEGORY_2.value,
+    WinetRegisterCategory.POLL_CATEGORY_11.value,
+)
+DEFAULT_INTERVAL = 5.0
+DEFAULT_CONCURRENCY = 64
+
+REGISTER_NAMES = {register.value: register.name.lower() for register in WinetRegister}
+
+
+def decode_registers(registers: Mapping[int, int]) -> dict[str, int]:
+    """Name the known registers, keep the id of the others"""
+    return {
+        REGISTER_NAMES.get(key, str(key)): value for key, value in registers.items()
+    }
+
+
+class NdjsonWriter:
+    """Write records as json lines, one per record, flushed in batches."""
+
+    def __init__(self, stream: TextIO) -> None:
+        """Write to stream (stdout)"""
+        self._stream = stream
+        self._flush_scheduled = False
+        self._encoder = json.JSONEncoder(separators=(",", ":"))
+
+    def write(self, record: dict) -> None:
+        """Queue a record, flushed after the records of the same loop iteration"""
+        self._stream.write(self._encoder.encode(record) + "\n")
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush)
+
+    def _flush(self) -> None:
+        self._flush_scheduled = False
+        self._stream.flush()
+
+
+class LimitedWinetAPI:
+    """WinetAPILocal sharing a concurrency limit with the other hosts."""
+
+    def __init__(self, api: WinetAPILocal, semaphore: asyncio.Semaphore) -> None:
+        """Requests wait for a slot of semaphore"""
+        self.api = api
+        self._semaphore = semaphore
+
+    async def get_registers(
+        self, key: WinetRegisterKey, category: int
+    ) -> WinetGetRegisterResult | None:
+        """Poll registers, when a slot is available"""
+        async with self._semaphore:
+            return await self.api.get_registers(key, category)
+
+
+def _error_record(host: str, error: WinetError) -> dict:
+    return {
+        "host": host,
+        "ts": round(time.time(), 3),
+        "error": type(error).__name__,
+        "message": str(error),
+        "transient": error.transient,
+    }
+
+
+def _delta_record(host: str, delta: WinetDelta, changes_only: bool) -> dict:
+    record = {
+        "host": host,
+        "ts": round(time.time(), 3),
+        "name": delta.info.name,
+        "model": delta.info.model,
+        "signal": delta.info.signal,
+    }
+    if changes_only:
+        record["changes"] = decode_registers(delta.changes)
+    else:
+        record["registers"] = decode_registers(delta.state)
+    return record
+
+
+async def watch_host(
+    api: LimitedWinetAPI,
+    host: str,
+    categories: Iterable[int],
+    interval: float,
+    changes_only: bool,
+    output: NdjsonWriter,
+    archive: WinetArchive | None = None,
+) -> None:
+    """Stream the records of a host until cancelled (archived if given)"""
+    watcher = WinetWatcher(
+        api,
+        list(categories),
+        interval,
+        # the archive needs a row per poll
+        heartbeat=not changes_only or archive is not None,
+        on_error=lambda error: output.write(_error_record(host, error)),
+    )
+    try:
+        async for delta in watcher:
+            if archive is not None and archive.append(time.time(), delta.state):
+                archive.flush()
+            if delta.changes or not changes_only:
+                output.write(_delta_record(host, delta, changes_only))
+    finally:
+        if archive is not None:
+            archive.flush()
+
+
+async def poll_once(
+    api: LimitedWinetAPI,
+    host: str,
+    categories: Iterable[int],
+    output: NdjsonWriter,
+) -> bool:
+    """Poll a host once, write its snapshot (or error). True if it answered"""
+    registers = {}
+    result = WinetGetRegisterResult()
+    try:
+        for category in categories:
+            result = await api.get_registers(WinetRegisterKey.POLL_DATA, category)
+            if result is None:
+                continue
+            registers.update(result.params)
+    except WinetError as error:
+        output.write(_error_record(host, error))
+        return False
+    output.write(
+        {
+            "host": host,
+            "ts": round(time.time(), 3),
+            "name": result.name,
+            "model": result.model,
+            "signal": result.signal,
+            "registers": decode_registers(registers),
+        }
+    )
+    return True
+
+
+async def poll_hosts(
+    hosts: list[str],
+    categories: Iterable[int] = DEFAULT_CATEGORIES,
+    interval: float = DEFAULT_INTERVAL,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    changes_only: bool = False,
+    once: bool = False,
+    stream: TextIO = sys.stdout,
+    recorder: WinetRecorder | None = None,
+    archive_dir: str | None = None,
+    lean: bool = False,
+) -> int:
+    """Poll every host, streaming NDJSON records. Returns an exit code
+
+    lean: use the stream transport (WinetStreamTransport) instead of aiohttp
+    """
+    output = NdjsonWriter(stream)
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    transport = WinetStreamTransport() if lean else None
+    async with aiohttp.ClientSession(connector=connector) as session:
+        apis = {}
+        for host in hosts:
+            api = WinetAPILocal(session, host, transport=transport)
+            if recorder is not None:
+                api.record(recorder)
+            apis[host] = LimitedWinetAPI(api, semaphore)
+        try:
+            if once:
+                results = await asyncio.gather(
+                    *(
+                        poll_once(api, host, categories, output)
+                        for host, api in apis.items()
+                    )
+                )
+                return 0 if all(results) else 1
+            await asyncio.gather(
+                *(
+                    watch_host(
+                        api,
+                        host,
+                        categories,
+                        interval,
+                        changes_only,
+                        output,
+                        WinetArchive(os.path.join(archive_dir, host))
+                        if archive_dir
+                        else None,
+                    )
+                    for host, api in apis.items()
+                )
+            )
+        finally:
+            if transport is not None:
+                await transport.close()
+    return 0
+
+
+def _read_hosts(args: argparse.Namespace) -> list[str]:
+    hosts = list(args.hosts)
+    if args.hosts_file:
+        with open(args.hosts_file, encoding="utf-8") as hosts_file:
+            for line in hosts_file:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    hosts.append(line)
+    # keep the order, drop the duplicates
+    return list(dict.fromkeys(hosts))
+
+
+def _cmd_poll(args: argparse.Namespace) -> int:
+    hosts = _read_hosts(args)
+    if not hosts:
+        LOGGER.error("No host to poll")
+        return 2
+    recorder = (
+        WinetRecorder(args.record, args.record_max_bytes) if args.record else None
+    )
+    try:
+        return asyncio.run(
+            poll_hosts(
+                hosts,
+                args.category or DEFAULT_CATEGORIES,
+                args.interval,
+                args.concurrency,
+                args.changes_only,
+                args.once,
+                recorder=recorder,
+                archive_dir=args.archive,
+                lean=args.lean,
+            )
+        )
+    finally:
+        if recorder is not None:
+            recorder.close()
+
+
+async def replay(
+    paths: list[str],
+    categories: Iterable[int],
+    polls: int,
+    speed: float | None,
+) -> dict:
+    """Poll a recorded session polls times, return the throughput"""
+    transport = WinetReplayTransport.from_files(*paths, speed=speed, cycle=True)
+    watcher = WinetAPILocal(None, "replay", transport=transport).watch(list(categories))
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    errors = 0
+    for _ in range(polls):
+        try:
+            await watcher.poll_once()
+        except WinetError:
+            errors += 1
+    duration = loop.time() - start
+    return {
+        "polls": polls,
+        "requests": transport.replayed,
+        "errors": errors,
+        "seconds": round(duration, 3),
+        "polls_per_second": round(polls / duration, 1) if duration else None,
+    }
+
+
+def _cmd_replay(args: argparse.Namespace) -> int:
+    result = asyncio.run(
+        replay(args.files, args.category or DEFAULT_CATEGORIES, args.polls, args.speed)
+    )
+    print(json.dumps(result))
+    return 0
+
+
+def _cmd_bench(args: argparse.Namespace) -> int:
+    print(json.dumps(asyncio.run(benchmark_transports(args.requests))))
+    return 0
+
+
+def _cmd_analyze(args: argparse.Namespace) -> int:
+    try:
+        from .analytics import load_archive, summarize
+    except ImportError:
+        LOGGER.error("The analytics require numpy (pip install numpy)")
+        return 2
+    for path in args.archives:
+        print(json.dumps({"archive": path, **summarize(load_archive(path))}))
+    return 0
+
+
+def _cmd_proxy(args: argparse.Namespace) -> int:
+    stoves = {}
+    for index, stove in enumerate(args.stoves):
+        host, _, port = stove.partition("=")
+        stoves[host] = int(port) if port else args.base_port + index
+    asyncio.run(serve(stoves, args.bind, args.interval, args.max_age))
+    return 0
+
+
+def _cmd_export(args: argparse.Namespace) -> int:
+    hosts = _read_hosts(args)
+    if not hosts:
+        LOGGER.error("No host to export")
+        return 2
+    asyncio.run(
+        serve_exporter(
+            hosts,
+            args.category or DEFAULT_CATEGORIES,
+            args.interval,
+            args.bind,
+            args.port,
+        )
+    )
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Command line arguments"""
+    parser = argparse.ArgumentParser(prog="winet", description=__doc__.split("\n")[0])
+    parser.add_argument("-v", "--verbose", action="store_true", help="debug logs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    poll = commands.add_parser(
+        "poll", help="poll stoves, stream NDJSON records to stdout"
+    )
+    poll.add_argument("hosts", nargs="*", help="Winet module addresses")
+    poll.add_argument("-f", "--hosts-file", help="file with one host per line")
+    poll.add_argument(
+        "-c",
+        "--category",
+        type=int,
+        action="append",
+        help="register category to poll (repeatable, default: 2 and 11)",
+    )
+    poll.add_argument(
+        "-i", "--interval", type=float, default=DEFAULT_INTERVAL, help="seconds"
+    )
+    poll.add_argument(
+        "-j",
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="maximum requests in flight, all hosts together",
+    )
+    poll.add_argument(
+        "--changes-only",
+        action="store_true",
+        help="only write the registers that changed",
+    )
+    poll.add_argument(
+        "--once", action="store_true", help="poll every host once, then exit"
+    )
+    poll.add_argument(
+        "--record", metavar="FILE", help="record the traffic (gzip NDJSON)"
+    )
+    poll.add_argument(
+        "--record-max-bytes",
+        type=int,
+        default=DEFAULT_MAX_BYTES,
+        help="rotate the recording file at this size",
+    )
+    poll.add_argument(
+        "--archive",
+        metavar="DIR",
+        help="append the registers of each poll to DIR/<host> (columnar archive)",
+    )
+    poll.add_argument(
+        "--lean",
+        action="store_true",
+        help="lean HTTP transport (asyncio streams, preformatted requests)",
+    )
+    poll.set_defaults(func=_cmd_poll)
+
+    bench = commands.add_parser(
+        "bench", help="compare the CPU cost per request of the transports"
+    )
+    bench.add_argument(
+        "-n", "--requests", type=int, default=DEFAULT_REQUESTS, help="per transport"
+    )
+    bench.set_defaults(func=_cmd_bench)
+
+    analyze = commands.add_parser(
+        "analyze", help="print the analytics of archives (requires numpy)"
+    )
+    analyze.add_argument("archives", nargs="+", help="archive directories")
+    analyze.set_defaults(func=_cmd_analyze)
+
+    replay_parser = commands.add_parser(
+        "replay", help="poll a recorded session, print the throughput"
+    )
+    replay_parser.add_argument("files", nargs="+", help="recording files, oldest first")
+    replay_parser.add_argument(
+        "-c",
+        "--category",
+        type=int,
+        action="append",
+        help="register category to poll (repeatable, default: 2 and 11)",
+    )
+    replay_parser.add_argument(
+        "-n", "--polls", type=int, default=1000, help="number of polls"
+    )
+    replay_parser.add_argument(
+        "--speed",
+        type=float,
+        help="1: wait the recorded round trip times (default: no wait)",
+    )
+    replay_parser.set_defaults(func=_cmd_replay)
+
+    proxy = commands.add_parser(
+        "proxy", help="serve cached polls of stoves to many clients"
+    )
+    proxy.add_argument(
+        "stoves",
+        nargs="+",
+        help="HOST or HOST=PORT (default port: base port + position)",
+    )
+    proxy.add_argument("--bind", default="0.0.0.0", help="listening address")
+    proxy.add_argument("--base-port", type=int, default=8080)
+    proxy.add_argument(
+        "-i",
+        "--interval",
+        type=float,
+        default=DEFAULT_PROXY_INTERVAL,
+        help="seconds between polls of a stove",
+    )
+    proxy.add_argument(
+        "--max-age",
+        type=float,
+        help="oldest answer served, in seconds (default: 3 intervals)",
+    )
+    proxy.set_defaults(func=_cmd_proxy)
+
+    export = commands.add_parser(
+        "export", help="serve the stoves values as OpenMetrics (Prometheus)"
+    )
+    export.add_argument("hosts", nargs="*", help="Winet module addresses")
+    export.add_argument("-f", "--hosts-file", help="file with one host per line")
+    export.add_argument(
+        "-c",
+        "--category",
+        type=int,
+        action="append",
+        help="register category to poll (repeatable, default: 2 and 11)",
+    )
+    export.add_argument(
+        "-i", "--interval", type=float, default=DEFAULT_INTERVAL, help="seconds"
+    )
+    export.add_argument("--bind", default="0.0.0.0", help="listening address")
+    export.add_argument("--port", type=int, default=9090)
+    export.set_defaults(func=_cmd_export)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command line entry point"""
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.WARNING,
+        stream=sys.stderr,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    try:
+        return args.func(args)
+    except KeyboardInterrupt:
+        return 0
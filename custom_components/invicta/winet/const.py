@@ -1,4 +1,6 @@
 """Constants and Globals."""
+from __future__ import annotations
+
 from enum import Enum
 
 
@@ -28,6 +30,14 @@ class WinetProductModel(Enum):  # type: ignore
             return "U047"
         return "UNKNOWN"
 
+    @classmethod
+    def from_message(cls, message: str | None) -> WinetProductModel | None:
+        """Get the model matching a get_message() string (config entry unique id)."""
+        for model in cls:
+            if model.get_message() == message:
+                return model
+        return None
+
 
 class WinetRegister(Enum):
     """Winet raw registers ids from web ui"""
@@ -54,3 +64,9 @@ class WinetRegisterCategory(Enum):
     POLL_CATEGORY_2 = 2
     POLL_CATEGORY_6 = 6
     POLL_CATEGORY_11 = 11
+
+
+# ALARMS_BITS bit of a failed ignition (see InvictaDeviceAlarm)
+FAILED_IGNITION_BIT = 3
+# Estimated pellet consumption (kg/h) at each POWER_SET level
+PELLET_RATE_BY_POWER = {2: 0.8, 3: 1.1, 4: 1.4, 5: 1.8}
@@ -0,0 +1,70 @@
+"""Local network discovery of Winet modules."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterable
+import ipaddress
+import logging
+
+import aiohttp
+
+from .const import WinetRegisterKey, WinetRegisterCategory
+from .exceptions import WinetError
+from .model import WinetGetRegisterResult
+from .winet import WinetAPILocal
+
+LOGGER = logging.getLogger(__package__)
+
+DISCOVERY_CONCURRENCY = 64
+DISCOVERY_TIMEOUT = 1.0
+
+# Largest network swept: bigger ones are reduced to the /24 around our address
+DISCOVERY_MIN_PREFIX = 24
+
+
+async def probe(
+    session: aiohttp.ClientSession | None,
+    host: str,
+    timeout: float = DISCOVERY_TIMEOUT,
+) -> WinetGetRegisterResult | None:
+    """Fingerprint a host with a single get-registers call (None if not a Winet).
+
+    The result holds the model, name and the registers of category 2: it is
+    reused as the first snapshot of the stove.
+    """
+    # the request itself times out: nothing left in flight past the timeout
+    api = WinetAPILocal(session, host, timeout_floor=timeout, timeout_ceiling=timeout)
+    try:
+        return await api.get_registers(
+            WinetRegisterKey.POLL_DATA, WinetRegisterCategory.POLL_CATEGORY_2
+        )
+    except WinetError:
+        return None
+
+
+async def discover_modules(
+    session: aiohttp.ClientSession | None,
+    hosts: Iterable[str],
+    concurrency: int = DISCOVERY_CONCURRENCY,
+    timeout: float = DISCOVERY_TIMEOUT,
+) -> dict[str, WinetGetRegisterResult]:
+    """Probe hosts concurrently, return the Winet modules found by host"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _probe(host: str) -> tuple[str, WinetGetRegisterResult | None]:
+        async with semaphore:
+            return host, await probe(session, host, timeout)
+
+    results = await asyncio.gather(*(_probe(host) for host in hosts))
+    found = {host: result for host, result in results if result is not None}
+    LOGGER.debug("Discovery: found %d Winet module(s)", len(found))
+    return found
+
+
+def network_hosts(address: str, prefix: int) -> list[str]:
+    """Hosts of the network of an interface address, but our own"""
+    if ipaddress.ip_address(address).is_loopback:
+        return []
+    prefix = max(prefix, DISCOVERY_MIN_PREFIX)
+    network = ipaddress.ip_network(f"{address}/{prefix}", strict=False)
+    return [str(host) for host in network.hosts() if str(host) != address]
@@ -0,0 +1,59 @@
+"""Winet-Control API exceptions."""
+from __future__ import annotations
+
+
+class WinetError(Exception):
+    """Base class of the Winet-Control API errors."""
+
+    # Can retrying the same request succeed ?
+    transient = True
+
+
+class WinetConnectionError(WinetError, ConnectionError):
+    """The exchange with the module failed."""
+
+
+class WinetHostUnreachableError(WinetConnectionError):
+    """The module could not be connected to."""
+
+
+class WinetTimeoutError(WinetConnectionError):
+    """The module did not answer in time."""
+
+
+class WinetHTTPStatusError(WinetConnectionError):
+    """The module answered with an unexpected HTTP status."""
+
+    def __init__(self, url: str, status: int) -> None:
+        """Keep the status, server errors are worth a retry"""
+        super().__init__(f"Error accessing {url} - {status}")
+        self.status = status
+
+    @property
+    def transient(self) -> bool:
+        """4xx: wrong endpoint (not a Winet module ?), won't change on retry"""
+        return self.status >= 500
+
+
+class WinetReplayExhaustedError(WinetConnectionError):
+    """No recorded answer left for the request (replay transport)."""
+
+    transient = False
+
+
+class WinetResponseError(WinetError):
+    """The module answered, but the answer can't be used."""
+
+    transient = False
+
+
+class WinetMalformedResponseError(WinetResponseError):
+    """The answer is not JSON."""
+
+
+class WinetResultFalseError(WinetResponseError):
+    """The module refused the request ({"result": false})."""
+
+
+class WinetSchemaError(WinetResponseError):
+    """The JSON answer does not have the expected fields."""
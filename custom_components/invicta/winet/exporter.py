@@ -0,0 +1,272 @@
+"""OpenMetrics (Prometheus) exporter of the watched registers.
+
+Values are read from the watchers' register state at scrape time: a scrape
+never polls a module. Each series keeps its label string, built once, and
+its rendered line, formatted again only when its value changed.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+import logging
+from typing import Union
+
+import aiohttp
+from aiohttp import web
+
+from .const import WinetRegister
+from .watch import WinetWatcher
+from .winet import WinetAPILocal
+
+LOGGER = logging.getLogger(__package__)
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Names of the ALARMS_BITS register bits, from bit 0
+ALARM_BITS = (
+    "smoke_probe_failure",
+    "smoke_overtemperature",
+    "extractor_malfunction",
+    "failed_ignition",
+    "no_pellets",
+    "lack_of_pressure",
+    "thermal_safety",
+    "open_pellet_compartment",
+)
+
+# Registers exported with their own metric: (name, help, scale)
+DECODED_REGISTERS = {
+    WinetRegister.TEMPERATURE_READ.value: (
+        "winet_temperature_read_celsius",
+        "Room temperature",
+        0.5,
+    ),
+    WinetRegister.TEMPERATURE_SET.value: (
+        "winet_temperature_set_celsius",
+        "Thermostat target temperature",
+        0.5,
+    ),
+    WinetRegister.POWER_SET.value: ("winet_power_set", "Power level set", 1),
+    WinetRegister.FAN_SPEED.value: ("winet_fan_speed", "Room fan speed set", 1),
+    WinetRegister.STATUS.value: ("winet_status", "Stove status code", 1),
+}
+
+Number = Union[int, float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: Number) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Series:
+    """A sample line, rendered again only when its value changes"""
+
+    __slots__ = ("prefix", "value", "line")
+
+    def __init__(self, prefix: str) -> None:
+        self.prefix = prefix
+        self.value: Number | None = None
+        self.line = ""
+
+    def set(self, value: Number) -> None:
+        if value != self.value or not self.line:
+            self.value = value
+            self.line = f"{self.prefix} {_format(value)}\n"
+
+
+class WinetMetricFamily:
+    """Metadata and series of a metric"""
+
+    def __init__(self, name: str, kind: str, documentation: str) -> None:
+        """kind: gauge or counter (counter samples get the _total suffix)"""
+        self.name = name
+        self.header = f"# TYPE {name} {kind}\n# HELP {name} {documentation}\n"
+        self._sample_name = f"{name}_total" if kind == "counter" else name
+        self._series: dict[tuple, _Series] = {}
+
+    def labels(self, *labels: tuple[str, str]) -> _Series:
+        """Series of these (name, value) labels, created on first use"""
+        series = self._series.get(labels)
+        if series is None:
+            rendered = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+            series = self._series[labels] = _Series(
+                f"{self._sample_name}{{{rendered}}}"
+            )
+        return series
+
+    def remove(self, host: str) -> None:
+        """Drop the series of a host"""
+        for labels in [labels for labels in self._series if labels[0][1] == host]:
+            del self._series[labels]
+
+    def render(self) -> Iterable[str]:
+        """Header and lines of the series having a value"""
+        if not self._series:
+            return
+        yield self.header
+        for series in self._series.values():
+            if series.line:
+                yield series.line
+
+
+@dataclass
+class WinetExporterTarget:
+    """A watched module: its client (latency) and its watcher (registers)"""
+
+    host: str
+    api: WinetAPILocal
+    watcher: WinetWatcher | Callable[[], WinetWatcher | None] | None
+
+
+class WinetExporter:
+    """Render the watched modules as OpenMetrics text."""
+
+    def __init__(self) -> None:
+        """Families are created once, series on first value"""
+        self.targets: dict[str, WinetExporterTarget] = {}
+        self._decoded = {
+            registerid: WinetMetricFamily(name, "gauge", documentation)
+            for registerid, (name, documentation, _) in DECODED_REGISTERS.items()
+        }
+        self._alarm = WinetMetricFamily("winet_alarm", "gauge", "Alarm bit set")
+        self._register = WinetMetricFamily(
+            "winet_register", "gauge", "Raw register value"
+        )
+        self._up = WinetMetricFamily("winet_up", "gauge", "Last poll succeeded")
+        self._polls = WinetMetricFamily("winet_polls", "counter", "Successful polls")
+        self._errors = WinetMetricFamily("winet_poll_errors", "counter", "Failed polls")
+        self._failures = WinetMetricFamily(
+            "winet_poll_consecutive_failures", "gauge", "Failed polls in a row"
+        )
+        self._lag = WinetMetricFamily(
+            "winet_poll_lag_seconds", "gauge", "Delay of the last poll on schedule"
+        )
+        self._age = WinetMetricFamily(
+            "winet_data_age_seconds", "gauge", "Time since the last value received"
+        )
+        self._rtt = WinetMetricFamily(
+            "winet_request_rtt_seconds", "gauge", "Smoothed request round trip time"
+        )
+        self._timeout = WinetMetricFamily(
+            "winet_request_timeout_seconds", "gauge", "Current request timeout"
+        )
+        self._families = [
+            *self._decoded.values(),
+            self._alarm,
+            self._register,
+            self._up,
+            self._polls,
+            self._errors,
+            self._failures,
+            self._lag,
+            self._age,
+            self._rtt,
+            self._timeout,
+        ]
+
+    def add_target(
+        self,
+        host: str,
+        api: WinetAPILocal,
+        watcher: WinetWatcher | Callable[[], WinetWatcher | None] | None,
+    ) -> None:
+        """Export a module (watcher may be a callable, if it can be replaced)"""
+        self.targets[host] = WinetExporterTarget(host, api, watcher)
+
+    def remove_target(self, host: str) -> None:
+        """Stop exporting a module"""
+        if self.targets.pop(host, None) is not None:
+            for family in self._families:
+                family.remove(host)
+
+    def _collect(self, target: WinetExporterTarget, now: float) -> None:
+        host = ("host", target.host)
+        for url, estimator in target.api.rtt.items():
+            endpoint = ("endpoint", url.rsplit("/", 1)[-1])
+            if estimator.srtt is not None:
+                self._rtt.labels(host, endpoint).set(estimator.srtt)
+            self._timeout.labels(host, endpoint).set(estimator.timeout)
+
+        watcher = target.watcher() if callable(target.watcher) else target.watcher
+        if watcher is None:
+            return
+        self._up.labels(host).set(
+            1 if watcher.polls and not watcher.failed_polls else 0
+        )
+        self._polls.labels(host).set(watcher.polls)
+        self._errors.labels(host).set(watcher.errors)
+        self._failures.labels(host).set(watcher.failed_polls)
+        self._lag.labels(host).set(round(watcher.lag, 3))
+        if watcher.received_at:
+            last = max(watcher.received_at.values())
+            self._age.labels(host).set(round(now - last, 1))
+
+        for registerid, value in watcher.state.items():
+            self._register.labels(host, ("register", str(registerid))).set(value)
+            decoded = DECODED_REGISTERS.get(registerid)
+            if decoded is not None:
+                self._decoded[registerid].labels(host).set(value * decoded[2])
+            if registerid == WinetRegister.ALARMS_BITS.value and value >= 0:
+                for bit, alarm in enumerate(ALARM_BITS):
+                    self._alarm.labels(host, ("alarm", alarm)).set(value >> bit & 1)
+
+    def render(self, now: float) -> str:
+        """Current values of all the targets (now: the watchers' loop time)"""
+        for target in self.targets.values():
+            self._collect(target, now)
+        lines = [line for family in self._families for line in family.render()]
+        lines.append("# EOF\n")
+        return "".join(lines)
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        """/metrics"""
+        now = asyncio.get_running_loop().time()
+        return web.Response(
+            body=self.render(now).encode(), headers={"Content-Type": CONTENT_TYPE}
+        )
+
+    def make_app(self) -> web.Application:
+        """Web application serving /metrics"""
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        return app
+
+
+async def serve(
+    hosts: Iterable[str],
+    categories: Iterable[int],
+    interval: float,
+    bind: str = "0.0.0.0",
+    port: int = 9090,
+) -> None:
+    """Watch the modules and serve their metrics until cancelled"""
+    exporter = WinetExporter()
+    tasks = []
+
+    async def _consume(watcher: WinetWatcher) -> None:
+        async for _ in watcher:
+            pass
+
+    async with aiohttp.ClientSession() as session:
+        for host in hosts:
+            api = WinetAPILocal(session, host)
+            watcher = api.watch(list(categories), interval)
+            exporter.add_target(host, api, watcher)
+            tasks.append(asyncio.create_task(_consume(watcher)))
+        runner = web.AppRunner(exporter.make_app())
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, bind, port).start()
+            LOGGER.warning("Serving metrics on http://%s:%d/metrics", bind, port)
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await runner.cleanup()
@@ -0,0 +1,177 @@
+"""Fixed-memory history of the register values, downsampled in tiers."""
+from __future__ import annotations
+
+from array import array
+from collections.abc import Callable, Mapping
+import time
+
+# (resolution in seconds, number of buckets kept): 10 minutes by the
+# second, a day by the minute and a month by the hour
+DEFAULT_TIERS = ((1, 600), (60, 1440), (3600, 720))
+
+
+class _Tier:
+    """Ring buffer of the (mean, min, max) of a register per time bucket"""
+
+    __slots__ = (
+        "resolution",
+        "capacity",
+        "times",
+        "means",
+        "lows",
+        "highs",
+        "head",
+        "count",
+        "_start",
+        "_sum",
+        "_samples",
+        "_low",
+        "_high",
+    )
+
+    def __init__(self, resolution: float, capacity: int) -> None:
+        self.resolution = resolution
+        self.capacity = capacity
+        # allocated once: the memory used never grows
+        self.times = array("d", bytes(8 * capacity))
+        self.means = array("f", bytes(4 * capacity))
+        self.lows = array("f", bytes(4 * capacity))
+        self.highs = array("f", bytes(4 * capacity))
+        self.head = 0
+        self.count = 0
+        # bucket being filled
+        self._start: float | None = None
+        self._sum = 0.0
+        self._samples = 0
+        self._low = 0.0
+        self._high = 0.0
+
+    def add(
+        self, timestamp: float, mean: float, low: float, high: float
+    ) -> tuple[float, float, float, float] | None:
+        """Add a sample, return the bucket it closed (if any)"""
+        start = timestamp - timestamp % self.resolution
+        closed = None
+        if self._start is not None and start != self._start:
+            closed = self._flush()
+        if self._samples == 0:
+            self._start = start
+            self._low, self._high = low, high
+        else:
+            self._low = min(self._low, low)
+            self._high = max(self._high, high)
+        self._sum += mean
+        self._samples += 1
+        return closed
+
+    def _flush(self) -> tuple[float, float, float, float]:
+        bucket = (self._start, self._sum / self._samples, self._low, self._high)
+        index = self.head
+        self.times[index] = self._start
+        self.means[index] = bucket[1]
+        self.lows[index] = self._low
+        self.highs[index] = self._high
+        self.head = (index + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self._sum = 0.0
+        self._samples = 0
+        return bucket
+
+    def _index(self, position: int) -> int:
+        """Array index of the position-th oldest bucket"""
+        return (self.head - self.count + position) % self.capacity
+
+    def covers(self, start: float) -> bool:
+        """Whether all the samples since start are still in this tier"""
+        if self.count < self.capacity:
+            return True  # nothing dropped yet
+        return self.times[self._index(0)] <= start
+
+    def window(self, start: float, end: float) -> list[tuple]:
+        """Buckets (time, mean, min, max) starting in [start, end]"""
+        low, high = 0, self.count
+        while low < high:  # first bucket at or after start
+            middle = (low + high) // 2
+            if self.times[self._index(middle)] < start:
+                low = middle + 1
+            else:
+                high = middle
+        rows = []
+        for position in range(low, self.count):
+            index = self._index(position)
+            if self.times[index] > end:
+                break
+            rows.append(
+                (
+                    self.times[index],
+                    self.means[index],
+                    self.lows[index],
+                    self.highs[index],
+                )
+            )
+        if self._samples and start <= self._start <= end:
+            # the bucket being filled
+            rows.append((self._start, self._sum / self._samples, self._low, self._high))
+        return rows
+
+
+class WinetHistory:
+    """Recent values of each register, in fixed-size tiers
+
+    Each sample goes in the finest tier; each closed bucket of a tier is a
+    sample of the next, coarser, one. A register takes about
+    20 bytes * (sum of the tier capacities), allocated on its first sample.
+    """
+
+    def __init__(
+        self,
+        tiers: tuple[tuple[float, int], ...] = DEFAULT_TIERS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """tiers: (resolution in seconds, buckets), finest first"""
+        self.tiers = tiers
+        self._clock = clock
+        self._registers: dict[int, list[_Tier]] = {}
+
+    def record(self, values: Mapping[int, int], timestamp: float | None = None):
+        """Record a sample of each register value (at clock time if None)"""
+        if timestamp is None:
+            timestamp = self._clock()
+        for registerid, value in values.items():
+            tiers = self._registers.get(registerid)
+            if tiers is None:
+                tiers = self._registers[registerid] = [
+                    _Tier(resolution, capacity) for resolution, capacity in self.tiers
+                ]
+            sample = (timestamp, value, value, value)
+            for tier in tiers:
+                sample = tier.add(*sample)
+                if sample is None:
+                    break
+
+    @property
+    def registers(self) -> list[int]:
+        """Ids of the registers with a history"""
+        return list(self._registers)
+
+    def window(
+        self,
+        registerid: int,
+        start: float,
+        end: float | None = None,
+        resolution: float | None = None,
+    ) -> list[tuple]:
+        """Samples (time, mean, min, max) of a register between start and end
+
+        Without a resolution, from the finest tier still holding start.
+        """
+        tiers = self._registers.get(registerid)
+        if tiers is None:
+            return []
+        if end is None:
+            end = self._clock()
+        if resolution is not None:
+            tier = next((t for t in tiers if t.resolution >= resolution), tiers[-1])
+        else:
+            tier = next((t for t in tiers if t.covers(start)), tiers[-1])
+        return tier.window(start, end)
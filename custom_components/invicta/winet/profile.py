@@ -0,0 +1,65 @@
+"""Per-model register profiles."""
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from .const import (
+    WinetProductModel,
+    WinetRegister,
+    WinetRegisterCategory,
+)
+
+
+@dataclass(frozen=True)
+class WinetModelProfile:
+    """Categories to poll and registers to decode for a product model."""
+
+    model: WinetProductModel
+    categories: tuple[WinetRegisterCategory, ...]
+    registers: frozenset[WinetRegister]
+
+    def supports(self, *registers: WinetRegister) -> bool:
+        """Are all these registers available on this model ?"""
+        return self.registers.issuperset(registers)
+
+    def restrict_to(self, register_ids: Iterable[int]) -> WinetModelProfile:
+        """Copy of the profile keeping only the registers the module returned."""
+        register_ids = set(register_ids)
+        return WinetModelProfile(
+            model=self.model,
+            categories=self.categories,
+            registers=frozenset(r for r in self.registers if r.value in register_ids),
+        )
+
+    @property
+    def register_ids(self) -> list[int]:
+        """Sorted raw register ids (json serializable, for the config entry)."""
+        return sorted(register.value for register in self.registers)
+
+
+DEFAULT_PROFILE = WinetModelProfile(
+    model=WinetProductModel.UNSET,
+    categories=(
+        WinetRegisterCategory.POLL_CATEGORY_2,
+        WinetRegisterCategory.POLL_CATEGORY_11,
+    ),
+    registers=frozenset(WinetRegister),
+)
+
+# All models known so far share the registers mapped from the web-ui: register
+# overrides for a model go here, the module response narrows them further.
+PROFILES: dict[WinetProductModel, WinetModelProfile] = {
+    model: WinetModelProfile(
+        model=model,
+        categories=DEFAULT_PROFILE.categories,
+        registers=DEFAULT_PROFILE.registers,
+    )
+    for model in WinetProductModel
+    if model != WinetProductModel.UNSET
+}
+
+
+def get_profile(model: WinetProductModel) -> WinetModelProfile:
+    """Get the register profile of a product model."""
+    return PROFILES.get(model, DEFAULT_PROFILE)
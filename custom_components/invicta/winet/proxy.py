@@ -0,0 +1,298 @@
+"""Caching proxy: many clients, a single poll of each Winet module.
+
+Each stove is served on its own port with the module's endpoints
+(/ajax/get-registers, /ajax/set-register): clients use "proxy:port" as the
+stove address. Reads are answered from the answers of the proxy's own
+polling, writes are forwarded one at a time.
+"""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import asdict, dataclass
+import json
+import logging
+from urllib.parse import parse_qsl
+
+import aiohttp
+from aiohttp import web
+
+from .const import WinetRegisterCategory, WinetRegisterKey
+from .exceptions import WinetError, WinetResultFalseError
+from .model import WinetGetRegisterResult
+from .watch import DEFAULT_PERMANENT_ERROR_DELAY, WinetWatcher
+from .winet import WinetAPILocal
+
+LOGGER = logging.getLogger(__package__)
+
+DEFAULT_PROXY_INTERVAL = 5.0
+# Polling intervals a category is kept polled after the last client read
+DEFAULT_FORGET_INTERVALS = 12
+
+RESULT_TRUE = b'{"result":true}'
+RESULT_FALSE = b'{"result":false}'
+
+
+@dataclass
+class WinetProxyStats:
+    """Request counters of a proxied stove"""
+
+    reads: int = 0
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    upstream_requests: int = 0
+    upstream_errors: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Part of the reads answered from the cache"""
+        return self.hits / self.reads if self.reads else 0.0
+
+    @property
+    def saved_requests(self) -> int:
+        """Module requests avoided: downstream requests minus upstream ones"""
+        return self.reads + self.writes - self.upstream_requests
+
+    def as_dict(self) -> dict:
+        """Counters and ratios, for the stats endpoint"""
+        return {
+            **asdict(self),
+            "hit_rate": round(self.hit_rate, 4),
+            "saved_requests": self.saved_requests,
+        }
+
+
+async def _read_form(request: web.Request) -> dict[str, str]:
+    """Form fields of a request (the web ui says json, but sends a form)"""
+    return dict(parse_qsl(await request.text()))
+
+
+class WinetStoveProxy:
+    """Cache of the answers of a module, refreshed by a single watcher.
+
+    The watcher polls the categories the clients read recently. A category
+    failing with a permanent error (unknown to the module?) is rejected for a
+    while, so it doesn't pause the polling of the others.
+    """
+
+    def __init__(
+        self,
+        api: WinetAPILocal,
+        interval: float = DEFAULT_PROXY_INTERVAL,
+        max_age: float | None = None,
+        reject_delay: float = DEFAULT_PERMANENT_ERROR_DELAY,
+    ) -> None:
+        """Answers older than max_age (default: 3 intervals) are fetched again"""
+        self._api = api
+        self.interval = interval
+        self.max_age = max_age if max_age is not None else 3 * interval
+        self.forget_after = DEFAULT_FORGET_INTERVALS * interval
+        self.reject_delay = reject_delay
+        self.stats = WinetProxyStats()
+        # category -> (loop time, encoded answer)
+        self._answers: dict[int, tuple[float, bytes]] = {}
+        # category -> loop time of the last read
+        self._categories: dict[int, float] = {}
+        # category -> (loop time until which it is rejected, its error)
+        self._rejected: dict[int, tuple[float, WinetError]] = {}
+        self._inflight: dict[int, asyncio.Future] = {}
+        self._write_lock = asyncio.Lock()
+        self._watcher: WinetWatcher | None = None
+        self._watch_task: asyncio.Task | None = None
+
+    def _store(self, category: int, result: WinetGetRegisterResult) -> bytes:
+        body = json.dumps(result.dict(), separators=(",", ":")).encode()
+        self._answers[category] = (asyncio.get_running_loop().time(), body)
+        return body
+
+    def _on_answer(self, category: int, result: WinetGetRegisterResult) -> None:
+        self.stats.upstream_requests += 1
+        self._store(category, result)
+
+    def _on_error(self, error: WinetError) -> None:
+        self.stats.upstream_requests += 1
+        self.stats.upstream_errors += 1
+        if self._watcher is not None and self._watcher.failed_category is not None:
+            self._check(self._watcher.failed_category, error)
+
+    def _check(self, category: int, error: WinetError) -> None:
+        """Stop polling a category failing with a permanent error, for a while"""
+        if not error.transient:
+            LOGGER.warning("Category %d rejected: %s", category, error)
+            until = asyncio.get_running_loop().time() + self.reject_delay
+            self._rejected[category] = (until, error)
+            self._categories.pop(category, None)
+            self._answers.pop(category, None)
+
+    def _polled_categories(self) -> list[int]:
+        """Categories read recently, the others are forgotten"""
+        now = asyncio.get_running_loop().time()
+        for category, read_at in list(self._categories.items()):
+            if now - read_at > self.forget_after:
+                del self._categories[category]
+                self._answers.pop(category, None)
+        return sorted(self._categories)
+
+    async def _watch(self) -> None:
+        self._watcher = WinetWatcher(
+            self._api,
+            self._polled_categories,
+            self.interval,
+            # a failing category is rejected: poll the others at the usual rate
+            permanent_error_delay=self.interval,
+            on_answer=self._on_answer,
+            on_error=self._on_error,
+        )
+        async for _ in self._watcher:
+            pass
+
+    def start(self) -> None:
+        """Start polling the categories asked for by the clients"""
+        if self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch(), name="winet_proxy")
+
+    async def stop(self) -> None:
+        """Stop polling"""
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            await asyncio.gather(self._watch_task, return_exceptions=True)
+            self._watch_task = None
+
+    async def _fetch(self, category: int) -> bytes:
+        """Poll a category now, concurrent misses share the same request"""
+        if category in self._inflight:
+            return await asyncio.shield(self._inflight[category])
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[category] = future
+        try:
+            self.stats.upstream_requests += 1
+            result = await self._api.get_registers(WinetRegisterKey.POLL_DATA, category)
+            body = self._store(category, result) if result else RESULT_TRUE
+            future.set_result(body)
+            return body
+        except WinetError as exc:
+            self.stats.upstream_errors += 1
+            self._check(category, exc)
+            future.set_exception(exc)
+            # the waiters retrieve it, don't warn about it
+            future.exception()
+            raise
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        finally:
+            del self._inflight[category]
+
+    async def read(self, category: int) -> bytes:
+        """Answer of a category poll, from the cache if fresh enough"""
+        self.stats.reads += 1
+        now = asyncio.get_running_loop().time()
+        rejected = self._rejected.get(category)
+        if rejected is not None:
+            if now < rejected[0]:
+                raise rejected[1]
+            del self._rejected[category]
+        self._categories[category] = now
+        cached = self._answers.get(category)
+        if cached is not None:
+            received_at, body = cached
+            if now - received_at <= self.max_age:
+                self.stats.hits += 1
+                return body
+        self.stats.misses += 1
+        return await self._fetch(category)
+
+    async def write(self, coro_factory) -> bytes:
+        """Forward a write, one at a time, and drop the cached answers"""
+        self.stats.writes += 1
+        async with self._write_lock:
+            self.stats.upstream_requests += 1
+            try:
+                await coro_factory()
+            except WinetResultFalseError:
+                return RESULT_FALSE
+            except WinetError:
+                self.stats.upstream_errors += 1
+                raise
+            finally:
+                # the written register (or the status) changed: read it again
+                self._answers.clear()
+        return RESULT_TRUE
+
+    async def handle_get_registers(self, request: web.Request) -> web.Response:
+        """/ajax/get-registers"""
+        form = await _read_form(request)
+        try:
+            key = WinetRegisterKey(form.get("key"))
+            category = int(form.get("category", WinetRegisterCategory.NONE.value))
+        except ValueError:
+            raise web.HTTPBadRequest() from None
+
+        try:
+            if key == WinetRegisterKey.POLL_DATA:
+                body = await self.read(category)
+            else:
+                # actions (CHANGE_STATUS) toggle the stove: never cached
+                body = await self.write(lambda: self._api.get_registers(key, category))
+        except WinetError as error:
+            raise web.HTTPBadGateway(text=str(error)) from None
+        return web.Response(body=body, content_type="application/json")
+
+    async def handle_set_register(self, request: web.Request) -> web.Response:
+        """/ajax/set-register"""
+        form = await _read_form(request)
+        try:
+            registerid = int(form["regId"])
+            value = int(form["value"])
+            memory = int(form.get("memory", 1))
+            key = form.get("key", "002")
+        except (KeyError, ValueError):
+            raise web.HTTPBadRequest() from None
+
+        try:
+            body = await self.write(
+                lambda: self._api.set_register(registerid, value, key, memory)
+            )
+        except WinetError as error:
+            raise web.HTTPBadGateway(text=str(error)) from None
+        return web.Response(body=body, content_type="application/json")
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        """/proxy/stats"""
+        return web.json_response(self.stats.as_dict())
+
+    def make_app(self) -> web.Application:
+        """Web application of this stove"""
+        app = web.Application()
+        app.router.add_post("/ajax/get-registers", self.handle_get_registers)
+        app.router.add_post("/ajax/set-register", self.handle_set_register)
+        app.router.add_get("/proxy/stats", self.handle_stats)
+        return app
+
+
+async def serve(
+    stoves: dict[str, int],
+    bind: str = "0.0.0.0",
+    interval: float = DEFAULT_PROXY_INTERVAL,
+    max_age: float | None = None,
+) -> None:
+    """Proxy each stove (host -> port) until cancelled"""
+    runners = []
+    proxies = []
+    async with aiohttp.ClientSession() as session:
+        try:
+            for host, port in stoves.items():
+                proxy = WinetStoveProxy(WinetAPILocal(session, host), interval, max_age)
+                runner = web.AppRunner(proxy.make_app())
+                await runner.setup()
+                await web.TCPSite(runner, bind, port).start()
+                proxy.start()
+                runners.append(runner)
+                proxies.append(proxy)
+                LOGGER.warning("Proxying %s on %s:%d", host, bind, port)
+            await asyncio.Event().wait()
+        finally:
+            for proxy in proxies:
+                await proxy.stop()
+            for runner in runners:
+                await runner.cleanup()
@@ -0,0 +1,51 @@
+"""Adaptive request timeouts, from the module round trip times."""
+from __future__ import annotations
+
+# Defaults, in seconds: a fast module answers in ~100ms, a dead one is seen
+# in about a second, a slow (busy) one is tolerated up to the ceiling.
+DEFAULT_TIMEOUT_FLOOR = 1.0
+DEFAULT_TIMEOUT_CEILING = 8.0
+DEFAULT_TIMEOUT_INITIAL = 1.0
+
+
+class WinetRttEstimator:
+    """Smoothed round trip time and variance of an endpoint (RFC 6298)
+
+    The timeout is computed like the TCP retransmission timeout:
+    srtt + 4 * rttvar, clamped between floor and ceiling, and doubled after
+    each timeout until an answer comes back.
+    """
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    K = 4
+
+    def __init__(
+        self,
+        floor: float = DEFAULT_TIMEOUT_FLOOR,
+        ceiling: float = DEFAULT_TIMEOUT_CEILING,
+        initial: float = DEFAULT_TIMEOUT_INITIAL,
+    ) -> None:
+        """Start with the initial timeout until the first sample"""
+        self.floor = floor
+        self.ceiling = ceiling
+        self.srtt: float | None = None
+        self.rttvar: float | None = None
+        self.timeout = self._clamp(initial)
+
+    def _clamp(self, value: float) -> float:
+        return min(max(value, self.floor), self.ceiling)
+
+    def sample(self, rtt: float) -> None:
+        """Update the estimation with the round trip time of an answer"""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar += self.BETA * (abs(self.srtt - rtt) - self.rttvar)
+            self.srtt += self.ALPHA * (rtt - self.srtt)
+        self.timeout = self._clamp(self.srtt + self.K * self.rttvar)
+
+    def backoff(self) -> None:
+        """No answer in time: double the timeout (no sample, as per Karn)"""
+        self.timeout = self._clamp(self.timeout * 2)
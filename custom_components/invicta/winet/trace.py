@@ -0,0 +1,46 @@
+"""In-memory trace of the wire activity, for diagnostics."""
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable
+import time
+
+DEFAULT_TRACE_SIZE = 2048
+
+
+class WinetTrace:
+    """Ring buffer of the last events.
+
+    Recording an event appends a tuple (time, event, args): nothing is
+    formatted until the trace is dumped, so it can stay on, unlike debug logs.
+    """
+
+    def __init__(
+        self,
+        size: int = DEFAULT_TRACE_SIZE,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Keep the last size events, timestamped with clock (wall time)"""
+        self._events: deque[tuple] = deque(maxlen=size)
+        self._clock = clock
+        self.enabled = True
+
+    def record(self, event: str, *args) -> None:
+        """Record an event and its (raw) arguments"""
+        if self.enabled:
+            self._events.append((self._clock(), event, args))
+
+    def dump(self, since: float | None = None) -> list[dict]:
+        """Events (oldest first), from the since time if given"""
+        return [
+            {"time": at, "event": event, "args": list(args)}
+            for at, event, args in self._events
+            if since is None or at >= since
+        ]
+
+    def clear(self) -> None:
+        """Forget the recorded events"""
+        self._events.clear()
+
+    def __len__(self) -> int:
+        return len(self._events)
@@ -0,0 +1,260 @@
+"""Transports: how WinetAPILocal requests reach a module."""
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from urllib.parse import urlencode, urlsplit
+
+import aiohttp
+from aiohttp import ClientConnectorError
+
+from .const import WinetRegisterKey
+from .exceptions import (
+    WinetConnectionError,
+    WinetHostUnreachableError,
+    WinetHTTPStatusError,
+    WinetTimeoutError,
+)
+
+
+# The web ui posts a form labelled as json: the module expects that label
+STREAM_CONTENT_TYPE = "application/json; charset=utf-8"
+# Preformatted requests kept (set_register values vary: bounded)
+MAX_PREFORMATTED_REQUESTS = 256
+
+Address = tuple[str, int]
+
+
+class WinetTransport:
+    """Post a form to a module url, return the raw answer body.
+
+    Failures are raised as the connection errors of the api (WinetError).
+    """
+
+    async def post(self, url: str, data: dict[str, str], timeout: float) -> bytes:
+        """Send the request, timeout in seconds (connect and read)"""
+        raise NotImplementedError
+
+
+class WinetHttpTransport(WinetTransport):
+    """HTTP requests, like the module web ui."""
+
+    def __init__(
+        self, session: aiohttp.ClientSession | None, headers: dict[str, str]
+    ) -> None:
+        """Use the shared session, or a throwaway one per request if None"""
+        self._session = session
+        self._headers = headers
+
+    @asynccontextmanager
+    async def _client_session(self):
+        """Reuse the shared session (keep-alive), or open a throwaway one if none."""
+        if self._session is not None:
+            yield self._session
+            return
+        async with aiohttp.ClientSession() as session:
+            yield session
+
+    async def post(self, url: str, data: dict[str, str], timeout: float) -> bytes:
+        """Post the form, return the body of a 200 answer"""
+        client_timeout = aiohttp.ClientTimeout(sock_connect=timeout, sock_read=timeout)
+        async with self._client_session() as session:
+            try:
+                async with session.post(
+                    url, data=data, headers=self._headers, timeout=client_timeout
+                ) as response:
+                    if response.status != 200:
+                        raise WinetHTTPStatusError(url, response.status)
+                    return await response.read()
+            except ClientConnectorError as exc:
+                raise WinetHostUnreachableError(f"Cannot connect to {url}") from exc
+            except asyncio.TimeoutError as exc:
+                raise WinetTimeoutError(
+                    f"Timeout accessing {url} ({timeout:.2f}s)"
+                ) from exc
+            except aiohttp.ClientError as exc:
+                raise WinetConnectionError(f"Error accessing {url}: {exc!r}") from exc
+
+
+class _StaleConnectionError(Exception):
+    """Nothing received: the connection was closed (by the module, when idle?)"""
+
+
+class WinetStreamTransport(WinetTransport):
+    """Lean HTTP/1.1 over asyncio streams, for modules polled often.
+
+    The request bytes are formatted once per url and form (key, category),
+    with the minimal headers (Host, Content-Type, Content-Length), and sent on
+    a kept-alive connection per module. The answer body is returned as read,
+    json.loads decodes the bytes directly.
+    """
+
+    def __init__(self) -> None:
+        """No connection until the first request"""
+        self._requests: dict[tuple, tuple[Address, bytes, bool]] = {}
+        self._connections: dict[
+            Address, tuple[asyncio.StreamReader, asyncio.StreamWriter]
+        ] = {}
+        self._locks: dict[Address, asyncio.Lock] = {}
+        self.connects = 0
+
+    def _request(self, url: str, data: dict[str, str]) -> tuple[Address, bytes, bool]:
+        """Address, bytes and whether it can be sent again, formatted on first use"""
+        key = (url, *data.items())
+        request = self._requests.get(key)
+        if request is None:
+            parts = urlsplit(url)
+            body = urlencode(data).encode()
+            head = (
+                f"POST {parts.path or '/'} HTTP/1.1\r\n"
+                f"Host: {parts.netloc}\r\n"
+                f"Content-Type: {STREAM_CONTENT_TYPE}\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n"
+            )
+            # polls only: writes and actions (CHANGE_STATUS toggles) are not
+            # sent twice
+            repeatable = (
+                parts.path.endswith("/get-registers")
+                and data.get("key") == WinetRegisterKey.POLL_DATA.value
+            )
+            request = (
+                (parts.hostname, parts.port or 80),
+                head.encode() + body,
+                repeatable,
+            )
+            if len(self._requests) >= MAX_PREFORMATTED_REQUESTS:
+                self._requests.clear()
+            self._requests[key] = request
+        return request
+
+    async def post(self, url: str, data: dict[str, str], timeout: float) -> bytes:
+        """Post the form, return the body of a 200 answer"""
+        address, request, repeatable = self._request(url, data)
+        lock = self._locks.get(address)
+        if lock is None:
+            lock = self._locks[address] = asyncio.Lock()
+        # one request at a time on the connection of a module
+        async with lock:
+            connection = self._connections.pop(address, None)
+            try:
+                if connection is not None:
+                    try:
+                        return await self._exchange(
+                            address, connection, url, request, timeout
+                        )
+                    except _StaleConnectionError:
+                        if not repeatable:
+                            raise
+                        # closed by the module while idle: once more, on a new one
+                connection = await self._connect(address, url, timeout)
+                return await self._exchange(address, connection, url, request, timeout)
+            except _StaleConnectionError as exc:
+                raise WinetConnectionError(
+                    f"Error accessing {url}: {exc.__cause__!r}"
+                ) from exc.__cause__
+
+    async def _connect(
+        self, address: Address, url: str, timeout: float
+    ) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        try:
+            connection = await asyncio.wait_for(
+                asyncio.open_connection(*address), timeout
+            )
+        except asyncio.TimeoutError as exc:
+            raise WinetTimeoutError(
+                f"Timeout connecting to {url} ({timeout:.2f}s)"
+            ) from exc
+        except OSError as exc:
+            raise WinetHostUnreachableError(f"Cannot connect to {url}") from exc
+        self.connects += 1
+        return connection
+
+    async def _exchange(
+        self,
+        address: Address,
+        connection: tuple[asyncio.StreamReader, asyncio.StreamWriter],
+        url: str,
+        request: bytes,
+        timeout: float,
+    ) -> bytes:
+        """Send the request, read the answer, keep the connection if possible"""
+        reader, writer = connection
+        keep_alive = False
+        try:
+            writer.write(request)
+            status, body, keep_alive = await asyncio.wait_for(
+                _read_response(reader), timeout
+            )
+        except asyncio.TimeoutError as exc:
+            raise WinetTimeoutError(
+                f"Timeout accessing {url} ({timeout:.2f}s)"
+            ) from exc
+        except (
+            OSError,
+            ValueError,
+            asyncio.IncompleteReadError,
+            asyncio.LimitOverrunError,
+        ) as exc:
+            raise WinetConnectionError(f"Error accessing {url}: {exc!r}") from exc
+        finally:
+            # closed on any error, cancellation included
+            if keep_alive:
+                self._connections[address] = connection
+            else:
+                writer.close()
+        if status != 200:
+            raise WinetHTTPStatusError(url, status)
+        return body
+
+    async def close(self) -> None:
+        """Close the kept-alive connections"""
+        connections = list(self._connections.values())
+        self._connections.clear()
+        for _, writer in connections:
+            writer.close()
+        for _, writer in connections:
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+
+async def _read_response(reader: asyncio.StreamReader) -> tuple[int, bytes, bool]:
+    """Status, body and whether the connection can be kept, of an answer"""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except (OSError, asyncio.IncompleteReadError) as exc:
+        if isinstance(exc, asyncio.IncompleteReadError) and exc.partial:
+            raise
+        raise _StaleConnectionError() from exc
+    lines = head.split(b"\r\n")
+    version, status = lines[0].split(None, 2)[:2]
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(b":")
+        if name:
+            headers[name.strip().lower()] = value.strip().lower()
+    connection = headers.get(b"connection")
+    if version == b"HTTP/1.1":
+        keep_alive = connection != b"close"
+    else:
+        keep_alive = connection == b"keep-alive"
+
+    length = headers.get(b"content-length")
+    if length is not None:
+        body = await reader.readexactly(int(length))
+    elif headers.get(b"transfer-encoding") == b"chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";", 1)[0], 16)
+            if not size:
+                # no trailers expected: the final empty line
+                await reader.readuntil(b"\r\n")
+                break
+            chunks.append((await reader.readexactly(size + 2))[:-2])
+        body = b"".join(chunks)
+    else:
+        # delimited by the end of the connection
+        body = await reader.read()
+        keep_alive = False
+    return int(status), body, keep_alive
@@ -0,0 +1,197 @@
+"""Streaming watch of the module registers."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Callable, Iterable
+from dataclasses import dataclass, field
+import logging
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Mapping, Union
+
+from .const import WinetRegisterCategory, WinetRegisterKey
+from .exceptions import WinetError, WinetSchemaError
+from .model import WinetGetRegisterResult
+
+if TYPE_CHECKING:
+    from .winet import WinetAPILocal
+
+LOGGER = logging.getLogger(__package__)
+
+DEFAULT_MAX_BACKOFF = 60.0
+DEFAULT_PERMANENT_ERROR_DELAY = 300.0
+
+Categories = Iterable[Union[WinetRegisterCategory, int]]
+
+
+@dataclass
+class WinetDelta:
+    """Registers changed since the previous delta.
+
+    state and received_at are read-only live views of the watcher: they
+    always show the latest values, whatever the delta was.
+    """
+
+    changes: dict[int, int]
+    state: Mapping[int, int]
+    received_at: Mapping[int, float]
+    info: WinetGetRegisterResult
+    timestamp: float
+    # successful polls merged into this delta (> 1: the consumer is slow)
+    polls: int = field(default=1)
+
+
+class WinetWatcher:
+    """Poll categories at a fixed rate, yield the register changes.
+
+    The polling runs in its own task: a slow consumer does not delay it
+    and gets all the changes since its previous delta merged in a single
+    one (no queue). Errors are retried with an exponential backoff, or
+    after a long pause when retrying can't help (permanent errors).
+    """
+
+    def __init__(
+        self,
+        api: WinetAPILocal,
+        categories: Categories | Callable[[], Categories],
+        interval: float = 5.0,
+        key: WinetRegisterKey = WinetRegisterKey.POLL_DATA,
+        heartbeat: bool = False,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+        permanent_error_delay: float = DEFAULT_PERMANENT_ERROR_DELAY,
+        on_answer: Callable[[int, WinetGetRegisterResult], None] | None = None,
+        on_error: Callable[[WinetError], None] | None = None,
+    ) -> None:
+        """heartbeat: also yield (empty) deltas for polls without change"""
+        self._api = api
+        self._categories = categories
+        self.interval = interval
+        self._key = key
+        self._heartbeat = heartbeat
+        self._max_backoff = max_backoff
+        self._permanent_error_delay = permanent_error_delay
+        self._on_answer = on_answer
+        self._on_error = on_error
+
+        self._state: dict[int, int] = {}
+        self._received_at: dict[int, float] = {}
+        self._info = WinetGetRegisterResult()
+        self._pending: dict[int, int] = {}
+        self._pending_polls = 0
+        self._wakeup = asyncio.Event()
+
+        self.failed_polls = 0
+        self.last_error: WinetError | None = None
+        # category of the request that failed (None: the last poll succeeded)
+        self.failed_category: int | None = None
+        self.polls = 0
+        self.errors = 0
+        self.lag = 0.0
+
+    @property
+    def state(self) -> Mapping[int, int]:
+        """Latest value of every register received"""
+        return MappingProxyType(self._state)
+
+    @property
+    def received_at(self) -> Mapping[int, float]:
+        """Loop time each register was last received"""
+        return MappingProxyType(self._received_at)
+
+    def _current_categories(self) -> list[int]:
+        categories = self._categories
+        if callable(categories):
+            categories = categories()
+        return [getattr(category, "value", category) for category in categories]
+
+    async def poll_once(self) -> dict[int, int]:
+        """Poll all the categories, return the changed registers"""
+        changes = {}
+        loop = asyncio.get_running_loop()
+        for category in self._current_categories():
+            self.failed_category = category
+            result = await self._api.get_registers(self._key, category)
+            if result is None:
+                raise WinetSchemaError(f"No registers in the answer for {category}")
+            now = loop.time()
+            for registerid, value in result.params:
+                if self._state.get(registerid) != value:
+                    self._state[registerid] = value
+                    changes[registerid] = value
+                self._received_at[registerid] = now
+            self._info = result
+            if self._on_answer is not None:
+                self._on_answer(category, result)
+        self.failed_category = None
+        return changes
+
+    def _retry_delay(self, error: WinetError) -> float:
+        """Exponential backoff on transient errors, a long pause on permanent ones"""
+        if not error.transient:
+            return self._permanent_error_delay
+        return min(self.interval * 2 ** (self.failed_polls - 1), self._max_backoff)
+
+    async def _run(self) -> None:
+        """Polling task: fixed rate, skipping the missed slots"""
+        loop = asyncio.get_running_loop()
+        scheduled = loop.time()
+        while True:
+            self.lag = loop.time() - scheduled
+            try:
+                changes = await self.poll_once()
+            except WinetError as error:
+                self.errors += 1
+                self.failed_polls += 1
+                self.last_error = error
+                delay = self._retry_delay(error)
+                LOGGER.info(
+                    "Watch: polling error [x%d] %s - retrying in %ds",
+                    self.failed_polls,
+                    error,
+                    delay,
+                )
+                if self._on_error is not None:
+                    self._on_error(error)
+                await asyncio.sleep(delay)
+                scheduled = loop.time()
+                continue
+
+            self.polls += 1
+            self.failed_polls = 0
+            self.last_error = None
+            if changes or self._heartbeat:
+                self._pending.update(changes)
+                self._pending_polls += 1
+                self._wakeup.set()
+
+            scheduled += self.interval
+            now = loop.time()
+            if scheduled < now:
+                # the poll took longer than the interval: skip missed slots
+                scheduled += (now - scheduled) // self.interval * self.interval
+                scheduled += self.interval
+            await asyncio.sleep(scheduled - now)
+
+    async def __aiter__(self) -> AsyncIterator[WinetDelta]:
+        """Start polling, and yield the deltas until the iteration stops"""
+        task = asyncio.create_task(self._run(), name="winet_watch")
+        # wake up on a crash too (not a WinetError: a bug, a callback error...)
+        task.add_done_callback(lambda _: self._wakeup.set())
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                if task.done():
+                    # raise the polling task's exception
+                    task.result()
+                changes, self._pending = self._pending, {}
+                polls, self._pending_polls = self._pending_polls, 0
+                yield WinetDelta(
+                    changes=changes,
+                    state=MappingProxyType(self._state),
+                    received_at=MappingProxyType(self._received_at),
+                    info=self._info,
+                    timestamp=asyncio.get_running_loop().time(),
+                    polls=polls,
+                )
+        finally:
+            task.cancel()
@@ -1,15 +1,13 @@
 """Winet-Control API"""
 from __future__ import annotations
+import asyncio
+import json
 import logging
 
-from json import JSONDecodeError
+from collections.abc import Callable
 
 import aiohttp
-from aiohttp import (
-    ClientConnectorError,
-    ClientOSError,
-    ServerDisconnectedError,
-)
+from pydantic import ValidationError
 
 from .model import WinetGetRegisterResult
 from .const import (
@@ -17,142 +15,259 @@ from .const import (
     WinetRegisterKey,
     WinetRegisterCategory,
 )
+from .blocking import WinetBlockingDetector
+from .capture import WinetRecorder, WinetRecordingTransport
+from .exceptions import (
+    WinetError,
+    WinetMalformedResponseError,
+    WinetResultFalseError,
+    WinetSchemaError,
+    WinetTimeoutError,
+)
+from .transport import WinetHttpTransport, WinetTransport
+from .rtt import DEFAULT_TIMEOUT_CEILING, DEFAULT_TIMEOUT_FLOOR, WinetRttEstimator
+from .trace import WinetTrace
+from .watch import Categories, WinetWatcher
 
 LOGGER = logging.getLogger(__package__)
 
+# Seconds a poll answer is reused by identical polls (0: only while in flight)
+DEFAULT_RESULT_TTL = 0.0
+
+RegistersRequest = tuple[str, int]
+
 
 class WinetAPILocal:
     """Bottom level API. handle http communication with the local winet module"""
 
-    def __init__(self, session: aiohttp.ClientSession, stove_ip: str) -> None:
-        """Initialize Winet local api."""
+    def __init__(
+        self,
+        session: aiohttp.ClientSession | None,
+        stove_ip: str,
+        timeout_floor: float = DEFAULT_TIMEOUT_FLOOR,
+        timeout_ceiling: float = DEFAULT_TIMEOUT_CEILING,
+        transport: WinetTransport | None = None,
+        trace: WinetTrace | None = None,
+        blocking: WinetBlockingDetector | None = None,
+        result_ttl: float = DEFAULT_RESULT_TTL,
+    ) -> None:
+        """Initialize Winet local api (HTTP, unless another transport is given).
+
+        Identical concurrent polls share a single request, and its answer is
+        reused for result_ttl seconds; writes drop it.
+        """
         self._session = session
         self._stove_ip = stove_ip
+        self._timeout_floor = timeout_floor
+        self._timeout_ceiling = timeout_ceiling
+        self.rtt: dict[str, WinetRttEstimator] = {}
+        self._headers = {
+            "Access-Control-Request-Method": "POST",
+            "Host": f"{self._stove_ip}",
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:105.0) Gecko/20100101 Firefox/105.0",
+            "Accept": "application/json, text/javascript, */*; q=0.01",
+            "Accept-Encoding": "gzip, deflate",
+            "Content-Type": "application/json; charset=utf-8",
+            "X-Requested-With": "XMLHttpRequest",
+            "Origin": f"http://{self._stove_ip}",
+            "Referer": f"http://{self._stove_ip}/management.html",
+        }
+        self.transport = transport or WinetHttpTransport(session, self._headers)
+        self.trace = trace if trace is not None else WinetTrace()
+        self.blocking = blocking if blocking is not None else WinetBlockingDetector()
+        self._get_registers_url = f"http://{self._stove_ip}/ajax/get-registers"
+        self._set_register_url = f"http://{self._stove_ip}/ajax/set-register"
+        # the trace records the path: no host in the diagnostics
+        self._paths = {
+            self._get_registers_url: "/ajax/get-registers",
+            self._set_register_url: "/ajax/set-register",
+        }
+        self.result_ttl = result_ttl
+        self._inflight: dict[RegistersRequest, asyncio.Task] = {}
+        # callers waiting for each shared poll
+        self._waiters: dict[asyncio.Task, int] = {}
+        # (loop time, answer) of the recent polls
+        self._results: dict[
+            RegistersRequest, tuple[float, WinetGetRegisterResult | None]
+        ] = {}
+        self._generation = 0
+        self.shared_reads = 0
+
+    def record(self, recorder: WinetRecorder) -> None:
+        """Write every request and answer to recorder, from now on"""
+        self.transport = WinetRecordingTransport(self.transport, recorder)
+
+    def _rtt_estimator(self, url: str) -> WinetRttEstimator:
+        """Round trip time estimator of an endpoint"""
+        if url not in self.rtt:
+            self.rtt[url] = WinetRttEstimator(
+                self._timeout_floor, self._timeout_ceiling
+            )
+        return self.rtt[url]
+
+    async def _post(self, url: str, data: dict[str, str]) -> dict:
+        """Post the form to the module, return the decoded json answer."""
+        estimator = self._rtt_estimator(url)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            body = await self.transport.post(url, data, estimator.timeout)
+        except WinetError as exc:
+            path = self._paths.get(url, url)
+            self.trace.record(
+                "error", path, type(exc).__name__, str(exc).replace(url, path)
+            )
+            if isinstance(exc, WinetTimeoutError):
+                estimator.backoff()
+            raise
+        rtt = loop.time() - start
+        estimator.sample(rtt)
+        self.trace.record("answer", self._paths.get(url, url), round(rtt, 4), len(body))
+
+        try:
+            with self.blocking.timed("winet.json"):
+                json_data = json.loads(body)
+        except ValueError as exc:
+            raise WinetMalformedResponseError(
+                f"Error decoding JSON from {url}: {body[:64]!r}"
+            ) from exc
+        if not isinstance(json_data, dict):
+            raise WinetSchemaError(f"Unexpected answer from {url}: {json_data!r}")
+        return json_data
+
+    def invalidate(self) -> None:
+        """Forget the recent answers, and the polls in flight (a write)"""
+        self._generation += 1
+        self._results.clear()
+        self._inflight.clear()
 
     async def get_registers(
         self,
         key: WinetRegisterKey,
-        category: WinetRegisterCategory = WinetRegisterCategory.NONE,
-    ):
-        """Poll registers"""
-        async with aiohttp.ClientSession() as session:
-
-            url = f"http://{self._stove_ip}/ajax/get-registers"
-            data = {"key": key.value}
-
-            if category != WinetRegisterCategory.NONE:
-                data["category"] = str(category.value)
-
-            headers = {
-                "Access-Control-Request-Method": "POST",
-                "Host": f"{self._stove_ip}",
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:105.0) Gecko/20100101 Firefox/105.0",
-                "Accept": "application/json, text/javascript, */*; q=0.01",
-                "Accept-Encoding": "gzip, deflate",
-                "Content-Type": "application/json; charset=utf-8",
-                "X-Requested-With": "XMLHttpRequest",
-                "Origin": f"http://{self._stove_ip}",
-                "Referer": f"http://{self._stove_ip}/management.html",
-            }
-            LOGGER.debug(f"Querying {url} with data={data}")
+        category: WinetRegisterCategory | int = WinetRegisterCategory.NONE,
+        fresh: bool = False,
+    ) -> WinetGetRegisterResult | None:
+        """Poll registers (None for an action key, like CHANGE_STATUS)
+
+        fresh: not answered from a recent answer (a request in flight is
+        still shared)
+        """
+        if isinstance(category, WinetRegisterCategory):
+            category = category.value
+
+        if key != WinetRegisterKey.POLL_DATA:
+            # actions change the stove: never shared, and like a write
+            self.invalidate()
             try:
-                async with session.post(url, data=data, headers=headers) as response:
-                    try:
-                        if response.status != 200:
-                            LOGGER.warning(f"Error accessing {url} - {response.status}")
-                            raise ConnectionError(
-                                f"Communication error - Response status {response.status}"
-                            )
-                        try:
-                            json_data = await response.json(content_type=None)
-                            LOGGER.debug("Received: %s", json_data)
-
-                            if "result" in json_data:
-                                # handle an action's result
-                                if json_data["result"] is False:
-                                    LOGGER.warning("Api result is False")
-                            else:
-                                try:
-                                    return WinetGetRegisterResult(**json_data)
-                                except Exception:
-                                    LOGGER.warning("Error parsing poll data")
-                                    LOGGER.debug(f"Received: {json_data}")
-                            # TODO: what about model check exceptions ?
-                        except JSONDecodeError:
-                            LOGGER.warning("Error decoding JSON: [%s]", response.text)
-
-                    except ConnectionError as exc:
-                        LOGGER.warning(f"Connection Error accessing {url}")
-                        raise ConnectionError(
-                            "ConnectionError - host not found"
-                        ) from exc
-            except (
-                ServerDisconnectedError,
-                ClientConnectorError,
-                ClientOSError,
-                ConnectionError,
-                UnboundLocalError,
-            ):
-                raise ConnectionError()
-            except Exception as unknown_error:
-                LOGGER.error("Unhandled Exception %s", type(unknown_error))
+                return await self._get_registers(key, category)
+            finally:
+                self.invalidate()
+
+        request = (key.value, category)
+        if self.result_ttl > 0 and not fresh and request in self._results:
+            received_at, result = self._results[request]
+            if asyncio.get_running_loop().time() - received_at <= self.result_ttl:
+                self.shared_reads += 1
+                self.trace.record("shared", key.value, category)
+                return result
+            del self._results[request]
+
+        task = self._inflight.get(request)
+        if task is None:
+            # a task of its own: a cancelled caller doesn't fail the others
+            # (cancelled with the last one)
+            task = asyncio.create_task(
+                self._shared_get_registers(request, key, category)
+            )
+            task.add_done_callback(lambda task: self._forget(request, task))
+            self._inflight[request] = task
+        else:
+            self.shared_reads += 1
+            self.trace.record("shared", key.value, category)
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    # the last caller was cancelled: nobody needs the answer
+                    if self._inflight.get(request) is task:
+                        del self._inflight[request]
+                    task.cancel()
+
+    async def _shared_get_registers(
+        self, request: RegistersRequest, key: WinetRegisterKey, category: int
+    ) -> WinetGetRegisterResult | None:
+        generation = self._generation
+        result = await self._get_registers(key, category)
+        if self.result_ttl > 0 and generation == self._generation:
+            self._results[request] = (asyncio.get_running_loop().time(), result)
+        return result
+
+    def _forget(self, request: RegistersRequest, task: asyncio.Task) -> None:
+        if self._inflight.get(request) is task:
+            del self._inflight[request]
+        if not task.cancelled():
+            # raised to the callers, if any are left
+            task.exception()
+
+    async def _get_registers(
+        self, key: WinetRegisterKey, category: int
+    ) -> WinetGetRegisterResult | None:
+        data = {"key": key.value}
+
+        if category != WinetRegisterCategory.NONE.value:
+            data["category"] = str(category)
+
+        self.trace.record("get_registers", key.value, category)
+        json_data = await self._post(self._get_registers_url, data)
+
+        if "result" in json_data:
+            # handle an action's result
+            if json_data["result"] is False:
+                raise WinetResultFalseError(f"Api result is False for {data}")
+            return None
+        try:
+            with self.blocking.timed("winet.validate"):
+                return WinetGetRegisterResult(**json_data)
+        except ValidationError as exc:
+            raise WinetSchemaError(f"Error parsing poll data: {exc}") from exc
 
     async def set_register(
-        self, registerid: WinetRegister, value: int, key="002", memory=1
-    ):
+        self, registerid: WinetRegister | int, value: int, key="002", memory=1
+    ) -> None:
         """send raw register values !!!"""
         # data exemple: key=002&memory=1&regId=51&value=3
-        async with aiohttp.ClientSession() as session:
-            url = f"http://{self._stove_ip}/ajax/set-register"
-            data = {
-                "key": key,
-                "memory": str(memory),
-                "regId": str(registerid.value),
-                "value": str(value),
-            }
-            headers = {
-                "Access-Control-Request-Method": "POST",
-                "Host": f"{self._stove_ip}",
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:105.0) Gecko/20100101 Firefox/105.0",
-                "Accept": "application/json, text/javascript, */*; q=0.01",
-                "Accept-Encoding": "gzip, deflate",
-                "Content-Type": "application/json; charset=utf-8",
-                "X-Requested-With": "XMLHttpRequest",
-                "Origin": f"http://{self._stove_ip}",
-                "Referer": f"http://{self._stove_ip}/management.html",
-            }
-            LOGGER.debug(f"Posting to {url}, data={data}")
-            try:
-                async with session.post(url, data=data, headers=headers) as response:
-                    try:
-                        # TODO: log others error responses codes
-                        if response.status != 200:
-                            # Valid address - but poll endpoint not found
-                            LOGGER.warning(f"Error accessing {url} - {response.status}")
-                            raise ConnectionError(
-                                f"Error accessing {url} - {response.status}"
-                            )
-                        try:
-                            # returns {'result': False} if failed (or True if success)
-                            json_data = await response.json(content_type=None)
-                            if json_data["result"] is not True:
-                                LOGGER.debug("Received: %s", json_data)
-
-                        except JSONDecodeError:
-                            LOGGER.warning("Error decoding JSON: [%s]", response.text)
-                    except ConnectionError as exc:
-                        LOGGER.warning(f"Connection Error accessing {url}")
-                        raise ConnectionError(
-                            "ConnectionError - host not found"
-                        ) from exc
-
-            except (
-                ServerDisconnectedError,
-                ClientConnectorError,
-                ClientOSError,
-                ConnectionError,
-                UnboundLocalError,
-            ) as exc:
-                raise ConnectionError() from exc
-            except Exception as unknown_error:
-                LOGGER.error("Unhandled Exception %s", type(unknown_error))
+        data = {
+            "key": key,
+            "memory": str(memory),
+            "regId": str(getattr(registerid, "value", registerid)),
+            "value": str(value),
+        }
+        self.trace.record("set_register", data["regId"], value, key, memory)
+        # the answers read before, or during, the write are outdated
+        self.invalidate()
+        try:
+            # returns {'result': False} if failed (or True if success)
+            json_data = await self._post(self._set_register_url, data)
+        finally:
+            self.invalidate()
+        if json_data.get("result") is not True:
+            raise WinetResultFalseError(f"Api result is not True for {data}")
+
+    def watch(
+        self,
+        categories: Categories | Callable[[], Categories],
+        interval: float = 5.0,
+        **kwargs,
+    ) -> WinetWatcher:
+        """Poll the categories every interval seconds, yield what changed.
+
+        async for delta in api.watch([WinetRegisterCategory.POLL_CATEGORY_2], 2):
+            ...
+
+        categories may be a callable, called before each poll.
+        """
+        return WinetWatcher(self, categories, interval, **kwargs)
@@ -0,0 +1,185 @@
+"""Virtual time test harness: an event loop with a fake clock, a fake stove.
+
+The loop never waits: when nothing is ready, its clock jumps to the next
+timer. Hours of polling run in milliseconds, and timings are exact.
+"""
+import asyncio
+from collections import Counter, deque
+import gc
+import json
+import os
+import selectors
+import tracemalloc
+from urllib.parse import urlsplit
+
+from custom_components.invicta.winet.const import WinetRegister
+from custom_components.invicta.winet.exceptions import WinetTimeoutError
+from custom_components.invicta.winet.transport import WinetTransport
+
+VIRTUAL_EPOCH = 1000.0
+
+# Poll cycles of the soak tests (INVICTA_SOAK_CYCLES=2000000 for a real soak)
+SOAK_CYCLES = int(os.environ.get("INVICTA_SOAK_CYCLES", "1000"))
+
+# Memory attributed to the most recent frame of the integration
+COMPONENTS = (
+    ("winet", "custom_components/invicta/winet/"),
+    ("api", "custom_components/invicta/api.py"),
+    ("coordinator", "custom_components/invicta/coordinator.py"),
+    ("entities", "custom_components/invicta/"),
+)
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """Poll the real file descriptors without blocking, advance the clock instead."""
+
+    loop = None
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if not events and timeout:
+            self.loop.advance(timeout)
+        return events
+
+
+class VirtualClockEventLoop(asyncio.SelectorEventLoop):
+    """Event loop whose time() only moves forward when it would wait."""
+
+    def __init__(self) -> None:
+        selector = _VirtualSelector()
+        super().__init__(selector)
+        selector.loop = self
+        self._virtual_time = VIRTUAL_EPOCH
+
+    def time(self) -> float:
+        return self._virtual_time
+
+    def advance(self, seconds: float) -> None:
+        """Move the clock forward"""
+        self._virtual_time += seconds
+
+
+def run_virtual(coro):
+    """Run a coroutine on a virtual clock loop, cancel what it left running."""
+    loop = VirtualClockEventLoop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        tasks = asyncio.all_tasks(loop)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+class SimulatedStove(WinetTransport):
+    """Transport answering like a Winet module, logging every request.
+
+    unreachable: requests time out; fail_next: errors raised by the next
+    requests, in order.
+    """
+
+    CATEGORIES = {
+        2: (
+            WinetRegister.STATUS.value,
+            WinetRegister.ALARMS_BITS.value,
+            WinetRegister.TEMPERATURE_READ.value,
+        ),
+        11: (
+            WinetRegister.TEMPERATURE_SET.value,
+            WinetRegister.POWER_SET.value,
+            WinetRegister.FAN_SPEED.value,
+        ),
+    }
+
+    def __init__(self, rtt: float = 0.05, log_requests: bool = True) -> None:
+        self.rtt = rtt
+        self.registers = {0: 40, 2: 0, 3: 0, 50: 42, 51: 3, 55: 5}
+        self.log_requests = log_requests
+        self.request_count = 0
+        self.requests: list[tuple[float, dict]] = []
+        self.unreachable = False
+        self.fail_next: deque[Exception] = deque()
+
+    async def post(self, url: str, data: dict[str, str], timeout: float) -> bytes:
+        self.request_count += 1
+        if self.log_requests:
+            self.requests.append((asyncio.get_running_loop().time(), dict(data)))
+        if self.unreachable:
+            await asyncio.sleep(timeout)
+            raise WinetTimeoutError(f"Timeout accessing {url}")
+        if self.fail_next:
+            raise self.fail_next.popleft()
+        await asyncio.sleep(self.rtt)
+
+        if urlsplit(url).path == "/ajax/set-register":
+            self.registers[int(data["regId"])] = int(data["value"])
+            return b'{"result":true}'
+        if data["key"] == "022":
+            # CHANGE_STATUS: off -> ignition, anything else -> off
+            status = WinetRegister.STATUS.value
+            self.registers[status] = 1 if self.registers[status] == 0 else 0
+            return b'{"result":true}'
+        category = int(data.get("category", 2))
+        answer = {
+            "params": [
+                [registerid, self.registers[registerid]]
+                for registerid in self.CATEGORIES.get(category, ())
+            ],
+            "cat": category,
+            "signal": -60,
+            "bk": 0,
+            "authLevel": 0,
+            "model": 1,
+            "name": "Stove",
+        }
+        return json.dumps(answer).encode()
+
+
+class MemoryGrowth:
+    """Memory allocated and still alive per component, since a mark."""
+
+    def __init__(self, frames: int = 8) -> None:
+        self._frames = frames
+        self._baseline = None
+
+    def __enter__(self):
+        tracemalloc.start(self._frames)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        tracemalloc.stop()
+
+    def mark(self) -> None:
+        """Start measuring from now"""
+        gc.collect()
+        self._baseline = tracemalloc.take_snapshot()
+
+    @staticmethod
+    def _component(traceback: tracemalloc.Traceback) -> str:
+        # most recent frame first
+        for frame in reversed(traceback):
+            filename = frame.filename.replace(os.sep, "/")
+            for component, path in COMPONENTS:
+                if path in filename:
+                    return component
+        return "other"
+
+    def growth(self) -> Counter:
+        """Bytes allocated since the mark and still alive, by component"""
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot()
+        growth = Counter()
+        for stat in snapshot.compare_to(self._baseline, "traceback"):
+            growth[self._component(stat.traceback)] += stat.size_diff
+        return growth
+
+    @staticmethod
+    def report(growth: Counter, cycles: int) -> str:
+        """Growth table, per component and per cycle"""
+        return "\n".join(
+            f"{component:12} {size:+10d} B  {size / cycles:+8.2f} B/cycle"
+            for component, size in sorted(growth.items())
+        )
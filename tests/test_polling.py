@@ -0,0 +1,305 @@
+"""Test the background polling, in virtual time."""
+from array import array
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from custom_components.invicta.api import (
+    InvictaApiClient,
+    InvictaApiData,
+    InvictaDeviceAlarm,
+    InvictaDeviceStatus,
+    InvictaAlarmTransition,
+    InvictaStatusTransition,
+)
+from custom_components.invicta.longterm import InvictaHourlyStatistics
+from custom_components.invicta.stats import InvictaOperatingStats
+from custom_components.invicta.winet.archive import TIME_COLUMN, WinetArchive
+from custom_components.invicta.winet.const import WinetRegister
+from custom_components.invicta.winet.exceptions import (
+    WinetHostUnreachableError,
+    WinetSchemaError,
+)
+
+from .const import MOCK_CONFIG
+from .harness import SimulatedStove, run_virtual
+
+HOST = MOCK_CONFIG["host"]
+STATUS = (WinetRegister.STATUS,)
+
+
+def make_client(stove: SimulatedStove) -> InvictaApiClient:
+    """Client of the simulated stove, on the virtual clock"""
+    loop = asyncio.get_running_loop()
+    return InvictaApiClient(None, HOST, transport=stove, clock=loop.time)
+
+
+def test_background_poll_schedule():
+    """Test an hour of polling: one poll of each category every 5 seconds."""
+
+    async def scenario():
+        stove = SimulatedStove()
+        client = make_client(stove)
+        start = asyncio.get_running_loop().time()
+
+        await client.start_background_polling(5)
+        await asyncio.sleep(3600 - 1)
+
+        assert len(stove.requests) == 720 * 2
+        assert stove.requests[-1][0] == start + 3595 + stove.rtt
+        assert client.watcher.lag == 0
+        assert client.data.is_fresh(STATUS, 5)
+        client.stop_background_polling()
+
+    run_virtual(scenario())
+
+
+def test_background_poll_skips_slots_of_a_slow_stove():
+    """Test a poll longer than the interval delays the next, without a burst."""
+
+    async def scenario():
+        stove = SimulatedStove(rtt=4)
+        client = make_client(stove)
+        start = asyncio.get_running_loop().time()
+
+        await client.start_background_polling(5)
+        await asyncio.sleep(60 - 1)
+
+        poll_starts = [at - start for at, _ in stove.requests[::2]]
+        assert poll_starts == [0, 10, 20, 30, 40, 50]
+
+    run_virtual(scenario())
+
+
+def test_background_poll_backoff_and_recovery():
+    """Test the retry delays, the offline state and the recovery."""
+
+    async def scenario():
+        stove = SimulatedStove()
+        client = make_client(stove)
+        loop = asyncio.get_running_loop()
+        await client.start_background_polling(5)
+        await asyncio.sleep(1)
+        assert client.data.status == InvictaDeviceStatus.OFF
+
+        start = loop.time()
+        stove.fail_next.extend(WinetHostUnreachableError("down") for _ in range(6))
+        await asyncio.sleep(140)
+
+        # polls at 4, then retries after 5, 10, 20, 30, 30 seconds
+        attempts = [round(at - start) for at, _ in stove.requests[2:8]]
+        assert attempts == [4, 9, 19, 39, 69, 99]
+        assert client.failed_poll_attempts == 0
+        assert client.last_poll_error is None
+        assert client.data.is_fresh(STATUS, 5)
+
+        stove.fail_next.append(WinetSchemaError("not a stove"))
+        await asyncio.sleep(10)
+        assert client.failed_poll_attempts == 1
+        assert isinstance(client.last_poll_error, WinetSchemaError)
+        assert not client.data.is_fresh(STATUS, 5)
+        assert not client.data.error_offline
+        await asyncio.sleep(60)
+        assert client.data.error_offline
+        requests = len(stove.requests)
+        await asyncio.sleep(200)
+        # permanent error: no retry before 300 seconds
+        assert len(stove.requests) == requests
+
+    run_virtual(scenario())
+
+
+def test_turn_on_state_transition():
+    """Test the status change is seen by the next poll."""
+
+    async def scenario():
+        stove = SimulatedStove()
+        client = make_client(stove)
+        await client.start_background_polling(5)
+        await asyncio.sleep(1)
+
+        await client.turn_on()
+        assert client.data.status == InvictaDeviceStatus.OFF
+        await asyncio.sleep(5)
+        assert client.data.status == InvictaDeviceStatus.WAIT_FOR_FLAME
+        assert client.data.is_on
+
+    run_virtual(scenario())
+
+
+def test_transitions():
+    """Test the status and alarm changes are reported once, by the poll seeing them."""
+
+    async def scenario():
+        stove = SimulatedStove()
+        client = make_client(stove)
+        transitions = []
+        client.on_transition = transitions.append
+        await client.start_background_polling(5)
+        await asyncio.sleep(1)
+        assert transitions == []  # first values
+
+        stove.registers[WinetRegister.STATUS.value] = 1
+        stove.registers[WinetRegister.ALARMS_BITS.value] = 0b1000
+        await asyncio.sleep(5)
+        stove.registers[WinetRegister.STATUS.value] = 2  # still waiting for flame
+        await asyncio.sleep(5)
+        stove.registers[WinetRegister.ALARMS_BITS.value] = 0
+        await asyncio.sleep(5)
+
+        assert [
+            (type(t), getattr(t, "status", None), getattr(t, "raised", None))
+            for t in transitions
+        ] == [
+            (InvictaStatusTransition, InvictaDeviceStatus.WAIT_FOR_FLAME, None),
+            (InvictaAlarmTransition, None, True),
+            (InvictaAlarmTransition, None, False),
+        ]
+        assert transitions[0].previous == InvictaDeviceStatus.OFF
+        assert transitions[1].alarm == InvictaDeviceAlarm.FAILED_IGNITION
+        assert transitions[1].timestamp < transitions[2].timestamp
+
+    run_virtual(scenario())
+
+
+def test_operating_stats():
+    """Test the statistics accumulated from the status transitions."""
+    data = InvictaApiData(HOST)
+    stats = InvictaOperatingStats(tank_capacity=10)
+
+    def update(now, status, power=3, fan_speed=5, alarms=()):
+        data.status = status
+        data.power_set = power
+        data.fan_speed = fan_speed
+        data.alarms = list(alarms)
+        stats.update(data, now)
+
+    update(0, InvictaDeviceStatus.OFF)
+    update(10, InvictaDeviceStatus.WAIT_FOR_FLAME)
+    update(20, InvictaDeviceStatus.OFF, alarms=[InvictaDeviceAlarm.FAILED_IGNITION])
+    update(30, InvictaDeviceStatus.POWER_ON)
+    # polled every 5 minutes (longer gaps than MAX_GAP are not accounted)
+    for now in range(40, 40 + 1800, 300):
+        update(now, InvictaDeviceStatus.WORK)
+    for now in range(40 + 1800, 40 + 3600, 300):
+        update(now, InvictaDeviceStatus.WORK, power=5, fan_speed=10)
+    update(40 + 3600, InvictaDeviceStatus.STANDBY)
+    # offline for a day: not accounted
+    update(40 + 3600 + 86400, InvictaDeviceStatus.STANDBY)
+
+    assert stats.ignitions == 2
+    assert stats.failed_ignition_rate == 50
+    assert stats.burn_hours == 1
+    assert stats.power_seconds[3] == stats.power_seconds[5] == 1800
+    assert stats.fan_duty == 75
+    assert round(stats.pellets, 2) == 1.45
+    assert round(stats.tank_level, 2) == 8.55
+    assert stats.tank_hours_left is None
+
+    stats.refill(0.45)
+    restored = InvictaOperatingStats.from_dict(stats.as_dict(), tank_capacity=10)
+    assert restored.power_seconds == stats.power_seconds
+    assert round(restored.tank_level, 2) == 9
+
+
+def test_hourly_statistics():
+    """Test the values are aggregated per hour, rows returned when it closes."""
+    data = InvictaApiData(HOST)
+    stats = InvictaOperatingStats()
+    hourly = InvictaHourlyStatistics("01HQ3ENTRY", "Stove")
+
+    for minute, temperature in ((0, 20.0), (20, 21.0), (40, 22.5)):
+        data.temperature_read = temperature
+        stats.pellets = minute / 60
+        now = datetime(2023, 1, 1, 10, minute, tzinfo=timezone.utc)
+        assert hourly.add(data, stats, now) == []
+
+    rows = dict(
+        (metadata["statistic_id"], (metadata, row))
+        for metadata, row in hourly.add(
+            data, stats, datetime(2023, 1, 1, 11, 0, 5, tzinfo=timezone.utc)
+        )
+    )
+    metadata, row = rows["invicta:01hq3entry_temperature_read"]
+    assert metadata["has_mean"] and not metadata["has_sum"]
+    assert row == {
+        "start": datetime(2023, 1, 1, 10, tzinfo=timezone.utc),
+        "mean": pytest.approx((20.0 + 21.0 + 22.5) / 3),
+        "min": 20.0,
+        "max": 22.5,
+    }
+    metadata, row = rows["invicta:01hq3entry_pellet_consumption"]
+    assert metadata["has_sum"] and metadata["name"] == "Stove Pellet consumption"
+    assert row["sum"] == row["state"] == 40 / 60
+
+
+def test_polling_paused_without_subscribers():
+    """Test the polling pauses once unneeded, and resumes on demand or command."""
+
+    async def scenario():
+        stove = SimulatedStove()
+        client = make_client(stove)
+        client.idle_linger = 30
+        release = client.subscribe()
+        await client.start_background_polling(5)
+        await asyncio.sleep(60 - 1)
+        assert len(stove.requests) == 12 * 2
+
+        release()
+        release()  # released once only
+        assert client.subscribers == 0
+        release = client.require_registers(STATUS)
+        release()
+        release()
+        assert client.subscribers == 0
+        await asyncio.sleep(31)
+        assert client.suspended
+        assert not client.is_polling_in_background
+        requests = len(stove.requests)
+        await asyncio.sleep(600)
+        assert len(stove.requests) == requests
+
+        # a subscriber resumes the polling at once
+        release = client.subscribe()
+        await asyncio.sleep(1)
+        assert not client.suspended
+        assert len(stove.requests) == requests + 2
+        release()
+        await asyncio.sleep(60)
+        assert client.suspended
+
+        # a command is followed by polls of its outcome, then a new pause
+        await client.turn_on()
+        await asyncio.sleep(6)
+        assert client.data.status == InvictaDeviceStatus.WAIT_FOR_FLAME
+        await asyncio.sleep(25)
+        assert client.suspended
+
+    run_virtual(scenario())
+
+
+def test_archive_writes(tmp_path, caplog):
+    """Test the archive keeps the polling, its writes run in order."""
+
+    async def scenario():
+        client = make_client(SimulatedStove())
+        archive = client.archive = WinetArchive(str(tmp_path / "stove"), (2,))
+        assert client.subscribers == 1
+        for second in range(100):
+            archive.append(float(second), {2: second})
+            if second % 10 == 9:
+                client.flush_archive()
+        await client.flush_archive()
+        assert archive.rows == 100
+        with open(tmp_path / "stove" / TIME_COLUMN, "rb") as times:
+            assert times.read() == array("d", map(float, range(100))).tobytes()
+
+        (tmp_path / "stove").rename(tmp_path / "moved")
+        archive.append(100.0, {2: 100})
+        await client.flush_archive()
+        assert "Cannot write the archive" in caplog.text
+        client.archive = None
+        assert client.subscribers == 0
+
+    run_virtual(scenario())
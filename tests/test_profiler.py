@@ -0,0 +1,28 @@
+"""Test the sampling profiler."""
+import os
+import time
+
+from custom_components.invicta.profiler import InvictaProfiler
+
+
+def _busy(seconds: float) -> None:
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        sum(range(100))
+
+
+def test_profiler():
+    """Test the samples of the profiled code are aggregated."""
+    profiler = InvictaProfiler(interval=0.001, root=os.path.dirname(__file__))
+    profiler.start()
+    _busy(0.3)
+    profiler.stop()
+    time.sleep(0.01)
+
+    report = profiler.as_dict()
+    assert report["samples"] >= report["integration_samples"] > 0
+    functions = {row["function"]: row for row in report["top"]}
+    assert functions["test_profiler:test_profiler"]["total"] > 0
+    assert functions["test_profiler:_busy"]["self"] > 0
+    node = report["tree"]["test_profiler:test_profiler"]
+    assert "test_profiler:_busy" in node["calls"]
@@ -0,0 +1,108 @@
+"""Soak tests: memory must stay bounded over many poll cycles.
+
+INVICTA_SOAK_CYCLES sets the number of cycles (a few thousands by default,
+run millions before a release).
+"""
+import asyncio
+
+from custom_components.invicta.api import InvictaApiClient
+from custom_components.invicta.binary_sensor import (
+    INVICTA_BINARY_SENSORS,
+    InvictaBinarySensor,
+)
+from custom_components.invicta.coordinator import InvictaDataUpdateCoordinator
+from custom_components.invicta.sensor import Invicta_SENSORS, InvictaSensor
+from custom_components.invicta.winet.const import WinetRegister
+
+from .const import MOCK_CONFIG
+from .harness import SOAK_CYCLES, MemoryGrowth, SimulatedStove, run_virtual
+
+HOST = MOCK_CONFIG["host"]
+# Long enough to fill the trace ring buffer (about 5 events per cycle)
+WARMUP_CYCLES = 500
+# Bytes a component may keep after the warmup, whatever the number of cycles
+GROWTH_BUDGET = 4 * 1024
+
+
+def _vary(stove: SimulatedStove, cycle: int) -> None:
+    """Change the stove registers like a heating stove with an alarm"""
+    stove.registers[WinetRegister.TEMPERATURE_READ.value] = 36 + cycle % 8
+    stove.registers[WinetRegister.STATUS.value] = 4 if cycle % 50 else 7
+    stove.registers[WinetRegister.ALARMS_BITS.value] = 0b10000
+
+
+def _assert_bounded(growth, cycles: int) -> None:
+    report = MemoryGrowth.report(growth, cycles)
+    message = f"Memory growth over {cycles} cycles:\n{report}"
+    for component in ("winet", "api", "coordinator", "entities"):
+        assert growth[component] < GROWTH_BUDGET, message
+
+
+def test_soak_background_polling():
+    """Test the client background polling memory, in virtual time."""
+
+    async def scenario():
+        stove = SimulatedStove(log_requests=False)
+        client = InvictaApiClient(
+            None, HOST, transport=stove, clock=asyncio.get_running_loop().time
+        )
+
+        async def vary() -> None:
+            cycle = 0
+            while True:
+                cycle += 1
+                _vary(stove, cycle)
+                await asyncio.sleep(5)
+
+        variations = asyncio.create_task(vary())
+        with MemoryGrowth() as memory:
+            await client.start_background_polling(5)
+            await asyncio.sleep(WARMUP_CYCLES * 5)
+            memory.mark()
+            await asyncio.sleep(SOAK_CYCLES * 5)
+            growth = memory.growth()
+        client.stop_background_polling()
+        variations.cancel()
+
+        assert client.watcher.polls >= WARMUP_CYCLES + SOAK_CYCLES
+        _assert_bounded(growth, SOAK_CYCLES)
+
+    run_virtual(scenario())
+
+
+async def test_soak_coordinator_and_entities(hass):
+    """Test the coordinator and entities memory, over many updates."""
+    stove = SimulatedStove(rtt=0, log_requests=False)
+    client = InvictaApiClient(None, HOST, transport=stove)
+    coordinator = InvictaDataUpdateCoordinator(hass, api=client)
+    entities = [
+        InvictaSensor(coordinator, description) for description in Invicta_SENSORS
+    ] + [
+        InvictaBinarySensor(coordinator, description)
+        for description in INVICTA_BINARY_SENSORS
+    ]
+    removers = []
+    for entity in entities:
+        entity.hass = hass
+        entity.entity_id = f"sensor.stove_{entity.entity_description.key}"
+        removers.append(
+            coordinator.async_add_listener(entity._handle_coordinator_update)
+        )
+
+    async def cycle(number: int) -> None:
+        _vary(stove, number)
+        await client.poll()
+        coordinator.async_set_updated_data(client.data)
+
+    with MemoryGrowth() as memory:
+        for number in range(WARMUP_CYCLES):
+            await cycle(number)
+        memory.mark()
+        for number in range(SOAK_CYCLES):
+            await cycle(number)
+        growth = memory.growth()
+    for remove in removers:
+        remove()
+
+    assert hass.states.get("sensor.stove_temperature_read") is not None
+    _assert_bounded(growth, SOAK_CYCLES)
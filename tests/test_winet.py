@@ -0,0 +1,673 @@
+"""Test the Winet-Control local api."""
+from array import array
+import asyncio
+import io
+import json
+import os
+import time
+
+import aiohttp
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+import pytest
+
+from custom_components.invicta.api import InvictaApiClient
+from custom_components.invicta.winet.archive import (
+    MISSING,
+    TIME_COLUMN,
+    WinetArchive,
+)
+from custom_components.invicta.winet.blocking import WinetBlockingDetector
+from custom_components.invicta.winet.capture import (
+    WinetRecorder,
+    WinetReplayTransport,
+)
+from custom_components.invicta.winet.cli import NdjsonWriter, poll_once
+from custom_components.invicta.winet.const import (
+    WinetRegister,
+    WinetRegisterCategory,
+    WinetRegisterKey,
+)
+from custom_components.invicta.winet.discovery import discover_modules
+from custom_components.invicta.winet.exceptions import (
+    WinetConnectionError,
+    WinetHostUnreachableError,
+    WinetHTTPStatusError,
+    WinetMalformedResponseError,
+    WinetReplayExhaustedError,
+    WinetResultFalseError,
+    WinetSchemaError,
+    WinetTimeoutError,
+)
+from custom_components.invicta.winet.exporter import WinetExporter
+from custom_components.invicta.winet.history import WinetHistory
+from custom_components.invicta.winet.model import WinetGetRegisterResult
+from custom_components.invicta.winet.proxy import WinetStoveProxy
+from custom_components.invicta.winet.rtt import WinetRttEstimator
+from custom_components.invicta.winet.trace import WinetTrace
+from custom_components.invicta.winet.transport import (
+    WinetHttpTransport,
+    WinetStreamTransport,
+)
+from custom_components.invicta.winet.watch import WinetWatcher
+from custom_components.invicta.winet.winet import WinetAPILocal
+
+from .const import MOCK_CONFIG
+from .harness import VIRTUAL_EPOCH, SimulatedStove, run_virtual
+
+HOST = MOCK_CONFIG["host"]
+GET_REGISTERS_URL = f"http://{HOST}/ajax/get-registers"
+SET_REGISTER_URL = f"http://{HOST}/ajax/set-register"
+
+POLL_ANSWER = {
+    "params": [[2, 4], [3, 0], [0, 41]],
+    "cat": 2,
+    "signal": -60,
+    "bk": 0,
+    "authLevel": 0,
+    "model": 1,
+    "name": "Stove",
+}
+
+
+async def test_get_registers(hass, aioclient_mock):
+    """Test a successful poll."""
+    aioclient_mock.post(GET_REGISTERS_URL, json=POLL_ANSWER)
+    api = WinetAPILocal(async_get_clientsession(hass), HOST)
+
+    result = await api.get_registers(
+        WinetRegisterKey.POLL_DATA, WinetRegisterCategory.POLL_CATEGORY_2
+    )
+
+    assert result.params == [[2, 4], [3, 0], [0, 41]]
+    assert result.name == "Stove"
+    assert aioclient_mock.mock_calls[0][2] == {"key": "020", "category": "2"}
+
+
+@pytest.mark.parametrize(
+    "mock_kwargs,error,transient",
+    [
+        ({"exc": asyncio.TimeoutError}, WinetTimeoutError, True),
+        ({"exc": aiohttp.ServerDisconnectedError()}, WinetConnectionError, True),
+        ({"status": 503}, WinetHTTPStatusError, True),
+        ({"status": 404}, WinetHTTPStatusError, False),
+        ({"text": "<html></html>"}, WinetMalformedResponseError, False),
+        ({"json": {"result": False}}, WinetResultFalseError, False),
+        ({"json": {"params": "nope"}}, WinetSchemaError, False),
+        ({"json": [1, 2]}, WinetSchemaError, False),
+    ],
+)
+async def test_get_registers_errors(
+    hass, aioclient_mock, mock_kwargs, error, transient
+):
+    """Test every failure is raised as a typed, classified error."""
+    aioclient_mock.post(GET_REGISTERS_URL, **mock_kwargs)
+    api = WinetAPILocal(async_get_clientsession(hass), HOST)
+
+    with pytest.raises(error) as exc_info:
+        await api.get_registers(WinetRegisterKey.POLL_DATA)
+
+    assert exc_info.value.transient is transient
+
+
+async def test_connection_errors_are_connection_errors(hass, aioclient_mock):
+    """Test callers catching ConnectionError keep working."""
+    aioclient_mock.post(
+        GET_REGISTERS_URL,
+        exc=aiohttp.ClientConnectorError(None, OSError(113, "No route to host")),
+    )
+    api = WinetAPILocal(async_get_clientsession(hass), HOST)
+
+    with pytest.raises(ConnectionError) as exc_info:
+        await api.get_registers(WinetRegisterKey.POLL_DATA)
+
+    assert isinstance(exc_info.value, WinetHostUnreachableError)
+
+
+async def test_set_register(hass, aioclient_mock):
+    """Test set-register, and a refused value."""
+    aioclient_mock.post(SET_REGISTER_URL, json={"result": True})
+    api = WinetAPILocal(async_get_clientsession(hass), HOST)
+
+    await api.set_register(WinetRegister.POWER_SET, 3)
+    assert aioclient_mock.mock_calls[0][2] == {
+        "key": "002",
+        "memory": "1",
+        "regId": "51",
+        "value": "3",
+    }
+
+    aioclient_mock.clear_requests()
+    aioclient_mock.post(SET_REGISTER_URL, json={"result": False})
+    with pytest.raises(WinetResultFalseError):
+        await api.set_register(WinetRegister.POWER_SET, 9)
+
+
+async def test_trace(hass, aioclient_mock):
+    """Test the wire activity is traced, in a bounded buffer."""
+    aioclient_mock.post(GET_REGISTERS_URL, json=POLL_ANSWER)
+    aioclient_mock.post(SET_REGISTER_URL, status=503)
+    trace = WinetTrace(size=3)
+    api = WinetAPILocal(async_get_clientsession(hass), HOST, trace=trace)
+
+    await api.get_registers(WinetRegisterKey.POLL_DATA, 2)
+    assert [event["event"] for event in trace.dump()] == ["get_registers", "answer"]
+    with pytest.raises(WinetHTTPStatusError):
+        await api.set_register(WinetRegister.POWER_SET, 3)
+
+    events = trace.dump()
+    assert [event["event"] for event in events] == [
+        "answer",
+        "set_register",
+        "error",
+    ]
+    assert events[1]["args"] == ["51", 3, "002", 1]
+    assert events[2]["args"][:2] == ["/ajax/set-register", "WinetHTTPStatusError"]
+    assert HOST not in json.dumps(events)
+    assert trace.dump(since=events[2]["time"]) == events[2:]
+
+
+def test_blocking_detector():
+    """Test the sections blocking past the threshold are reported with a stack."""
+    detector = WinetBlockingDetector(threshold=0.02)
+    with detector.timed("off"):
+        time.sleep(0.05)
+    assert detector.report()["offenders"] == {}
+
+    detector.start()
+    try:
+        with detector.timed("fast"):
+            pass
+        for _ in range(2):
+            with detector.timed("slow"):
+                time.sleep(0.1)
+    finally:
+        detector.stop()
+
+    offenders = detector.report()["offenders"]
+    assert list(offenders) == ["slow"]
+    assert offenders["slow"]["count"] == 2
+    assert offenders["slow"]["max"] >= 0.1
+    stacks = offenders["slow"]["stacks"]
+    assert sum(sample["count"] for sample in stacks) == 2
+    assert any("time.sleep(0.1)" in frame for frame in stacks[0]["stack"])
+
+
+def test_history():
+    """Test the samples are kept in fixed-size tiers, downsampled."""
+    history = WinetHistory(tiers=((1, 10), (5, 4)), clock=lambda: 100.0)
+    for second in range(30):
+        history.record({0: second % 5, 2: 4}, timestamp=second + 0.5)
+
+    assert sorted(history.registers) == [0, 2]
+    # last 10 seconds, by the second (the last one still being filled)
+    assert history.window(0, 20) == [
+        (float(second), second % 5, second % 5, second % 5) for second in range(20, 30)
+    ]
+    # older: from the coarser tier, 4 buckets of 5 seconds and the current one
+    assert history.window(0, 0) == [
+        (5.0, 2.0, 0.0, 4.0),
+        (10.0, 2.0, 0.0, 4.0),
+        (15.0, 2.0, 0.0, 4.0),
+        (20.0, 2.0, 0.0, 4.0),
+        (25.0, 1.5, 0.0, 3.0),
+    ]
+    assert history.window(2, 0, resolution=5)[-1] == (25.0, 4.0, 4.0, 4.0)
+    assert history.window(3, 0) == []
+
+
+def test_archive_and_analytics(tmp_path):
+    """Test the archive columns, reopened after a crash, and their analytics."""
+    analytics = pytest.importorskip("custom_components.invicta.winet.analytics")
+    path = str(tmp_path / "stove")
+    status, power, temperature = 2, 51, 0
+    archive = WinetArchive(path, registers=(0, 2, 3, 51, 55), flush_rows=50)
+    # an hour: off, ignition, working at power 3 then 5, then standby
+    for second in range(0, 3600, 10):
+        values = {status: 0 if second < 60 else 1, 3: 0, power: 3, 55: 5}
+        if 600 <= second < 3000:
+            values[status] = 4
+            values[power] = 3 if second < 1800 else 5
+            values[temperature] = 40 + (second - 600) // 60
+        elif second >= 3000:
+            values[status] = 7
+        if archive.append(1_700_000_000 + second, values):
+            archive.flush()
+    archive.flush()
+    assert archive.rows == 360
+
+    # a crash while writing a row: the partial row is dropped
+    with open(tmp_path / "stove" / "r0.i4", "ab") as column:
+        column.write(b"\x01\x00")
+    archive = WinetArchive(path)
+    assert archive.rows == 360 and archive.registers == [0, 2, 3, 51, 55]
+
+    columns = analytics.load_archive(path)
+    assert len(columns["time"]) == 360
+    assert columns[temperature][0] == MISSING
+
+    summary = analytics.summarize(columns)
+    # the temperature register rises by 1 (0.5°C) per minute, in steps
+    assert summary["heating_rates"] == pytest.approx({3: 30.0, 5: 30.0}, rel=0.05)
+    assert summary["ignitions"] == {
+        "ignitions": 1,
+        "succeeded": 1,
+        "failed": 0,
+        "success_rate": 1.0,
+    }
+    assert summary["duty_cycles"]["work_hours"] == pytest.approx(2400 / 3600)
+    assert summary["duty_cycles"]["fan_duty"] == pytest.approx(50)
+    assert summary["pellets"]["power_3"] == pytest.approx(1.1 * 1200 / 3600)
+    assert summary["pellets"]["total"] == pytest.approx(
+        (1.1 * 1200 + 1.8 * 1200) / 3600
+    )
+
+
+def test_archive_write_error_keeps_the_columns_aligned(tmp_path, monkeypatch):
+    """Test the columns written before a failure are cut back."""
+    path = str(tmp_path / "stove")
+    archive = WinetArchive(path, registers=(0, 2))
+    archive.append(1.0, {0: 40, 2: 4})
+    archive.flush()
+
+    failing = True
+
+    def failing_open(name, mode="r", *args, **kwargs):
+        if failing and mode == "ab" and name.endswith(TIME_COLUMN):
+            raise OSError("No space left on device")
+        return open(name, mode, *args, **kwargs)
+
+    monkeypatch.setattr(
+        "custom_components.invicta.winet.archive.open", failing_open, raising=False
+    )
+    archive.append(2.0, {0: 41, 2: 4})
+    with pytest.raises(OSError):
+        archive.flush()
+    # not cut back yet (the time column can't be opened): before the next write
+    failing = False
+    archive.append(3.0, {0: 42, 2: 4})
+    archive.flush()
+    assert archive.rows == 2
+
+    archive = WinetArchive(path)
+    assert archive.rows == 2
+    with open(os.path.join(path, "r0.i4"), "rb") as column:
+        assert array("i", column.read()).tolist() == [40, 42]
+
+
+def test_rtt_estimator():
+    """Test the timeout follows the round trip times, within floor/ceiling."""
+    estimator = WinetRttEstimator(floor=0.3, ceiling=8.0, initial=1.0)
+    assert estimator.timeout == 1.0
+
+    for _ in range(50):
+        estimator.sample(0.05)
+    assert estimator.srtt == pytest.approx(0.05)
+    assert estimator.timeout == 0.3
+
+    for _ in range(50):
+        estimator.sample(2.0)
+    assert 2.0 < estimator.timeout < 8.0
+
+    for _ in range(10):
+        estimator.backoff()
+    assert estimator.timeout == 8.0
+
+    # by default, a dead module is seen in about a second
+    estimator = WinetRttEstimator()
+    assert estimator.timeout == 1.0
+    for _ in range(50):
+        estimator.sample(0.05)
+    assert estimator.timeout == 1.0
+
+
+async def test_stream_transport(socket_enabled):
+    """Test the lean transport: kept-alive connection, framing, errors."""
+    ok = b"HTTP/1.1 200 OK\r\nContent-Length: 15\r\n\r\n"
+    polled = b"HTTP/1.1 200 OK\r\nContent-Length: 9\r\n\r\n" b'{"cat":2}'
+    # (answer, close the connection after it), None: never answer
+    answers = [
+        (ok + b'{"result":true}', False),
+        (
+            b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n"
+            b'a\r\n{"result":\r\n5\r\ntrue}\r\n0\r\n\r\n',
+            False,
+        ),
+        (b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n", False),
+        # closed while the client keeps it
+        (ok + b'{"result":true}', True),
+        (polled, True),
+        (b"HTTP/1.0 200 OK\r\n\r\n" b'{"result":true}', True),
+        (ok, True),
+        None,
+    ]
+    requests = []
+    closed = asyncio.Event()
+
+    async def module(reader, writer):
+        while answers:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = int(head.lower().split(b"content-length: ")[1].split(b"\r")[0])
+            requests.append(head + await reader.readexactly(length))
+            answer = answers.pop(0)
+            if answer is None:
+                await reader.read()
+                closed.set()
+                break
+            writer.write(answer[0])
+            if answer[1]:
+                break
+        writer.close()
+
+    server = await asyncio.start_server(module, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    api = WinetAPILocal(None, f"127.0.0.1:{port}", transport=WinetStreamTransport())
+    try:
+        assert await api.get_registers(WinetRegisterKey.CHANGE_STATUS) is None
+        await api.set_register(WinetRegister.POWER_SET, 3)
+        with pytest.raises(WinetHTTPStatusError):
+            await api.set_register(WinetRegister.POWER_SET, 3)
+        await api.set_register(WinetRegister.POWER_SET, 3)
+        assert api.transport.connects == 1
+        assert requests[0] == (
+            b"POST /ajax/get-registers HTTP/1.1\r\n"
+            + f"Host: 127.0.0.1:{port}\r\n".encode()
+            + b"Content-Type: application/json; charset=utf-8\r\n"
+            b"Content-Length: 7\r\n\r\nkey=022"
+        )
+        assert requests[1].endswith(b"\r\n\r\nkey=002&memory=1&regId=51&value=3")
+        assert requests[1] == requests[2] == requests[3]
+
+        # a poll on the connection closed by the module is sent again
+        assert (await api.get_registers(WinetRegisterKey.POLL_DATA, 2)).cat == 2
+        assert api.transport.connects == 2
+        # a write never is: it may have been applied
+        with pytest.raises(WinetConnectionError):
+            await api.set_register(WinetRegister.POWER_SET, 3)
+        assert api.transport.connects == 2
+        await api.set_register(WinetRegister.POWER_SET, 3)
+        assert api.transport.connects == 3
+        # a truncated answer on a new connection is an error
+        with pytest.raises(WinetConnectionError):
+            await api.set_register(WinetRegister.POWER_SET, 3)
+        assert api.transport.connects == 4
+
+        # a cancelled request closes its connection
+        task = asyncio.create_task(api.set_register(WinetRegister.POWER_SET, 3))
+        while len(requests) < 8:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.wait_for(closed.wait(), 1)
+        assert not api.transport._connections
+    finally:
+        await api.transport.close()
+        server.close()
+        await server.wait_closed()
+
+    with pytest.raises(WinetHostUnreachableError):
+        await api.set_register(WinetRegister.POWER_SET, 3)
+
+
+def test_discovery_bounds_the_requests_in_flight(monkeypatch):
+    """Test a sweep of stalling hosts keeps the concurrency bound."""
+    in_flight = peak = 0
+
+    async def stall(self, url, data, timeout):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            await asyncio.sleep(timeout)
+            raise WinetTimeoutError(f"Timeout accessing {url}")
+        finally:
+            in_flight -= 1
+
+    monkeypatch.setattr(WinetHttpTransport, "post", stall)
+
+    async def scenario():
+        hosts = [f"192.168.1.{host}" for host in range(1, 255)]
+        assert await discover_modules(None, hosts, concurrency=8, timeout=1) == {}
+        assert asyncio.get_running_loop().time() - VIRTUAL_EPOCH == 32
+
+    run_virtual(scenario())
+    assert peak == 8 and in_flight == 0
+
+
+def test_single_flight_reads():
+    """Test identical polls share a request and its answer, writes drop it."""
+    poll = WinetRegisterKey.POLL_DATA
+
+    async def scenario():
+        stove = SimulatedStove()
+        api = WinetAPILocal(None, HOST, transport=stove, result_ttl=1)
+
+        results = await asyncio.gather(*(api.get_registers(poll, 2) for _ in range(5)))
+        assert len(stove.requests) == 1
+        assert all(result is results[0] for result in results)
+        assert api.shared_reads == 4
+        await api.get_registers(poll, 11)
+        assert len(stove.requests) == 2
+
+        await asyncio.sleep(0.5)
+        assert await api.get_registers(poll, 2) is results[0]
+        assert len(stove.requests) == 2
+        assert await api.get_registers(poll, 2, fresh=True) is not results[0]
+        assert len(stove.requests) == 3
+        await api.set_register(WinetRegister.POWER_SET, 4)
+        assert (await api.get_registers(poll, 11)).params[1] == [51, 4]
+        assert len(stove.requests) == 5
+        await asyncio.sleep(1.1)
+        await api.get_registers(poll, 2)
+        assert len(stove.requests) == 6
+
+        # a cancelled caller doesn't cancel the request of the others
+        first = asyncio.create_task(api.get_registers(poll, 6))
+        second = asyncio.create_task(api.get_registers(poll, 6))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert (await second).cat == 6
+
+        # the error is shared too, and not kept
+        await asyncio.sleep(2)
+        stove.fail_next.append(WinetHostUnreachableError("down"))
+        errors = await asyncio.gather(
+            api.get_registers(poll, 2),
+            api.get_registers(poll, 2),
+            return_exceptions=True,
+        )
+        assert [type(error) for error in errors] == [WinetHostUnreachableError] * 2
+        assert (await api.get_registers(poll, 2)).cat == 2
+
+    run_virtual(scenario())
+
+
+class FakeWinetAPI:
+    """Answer polls from a list of params, then keep the last one."""
+
+    rtt = {}
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+
+    async def get_registers(self, key, category):
+        params = self.answers.pop(0) if len(self.answers) > 1 else self.answers[0]
+        if isinstance(params, Exception):
+            raise params
+        return WinetGetRegisterResult(params=params, cat=category)
+
+
+async def test_watch_yields_changes_only():
+    """Test the first delta has every register, then only the changes."""
+    api = FakeWinetAPI([[[2, 0], [0, 40]], [[2, 0], [0, 40]], [[2, 4], [0, 40]]])
+    watcher = WinetWatcher(api, [WinetRegisterCategory.POLL_CATEGORY_2], 0.01)
+
+    deltas = []
+    async for delta in watcher:
+        deltas.append(delta)
+        if len(deltas) == 2:
+            break
+
+    assert deltas[0].changes == {2: 0, 0: 40}
+    assert deltas[1].changes == {2: 4}
+    assert deltas[1].state == {2: 4, 0: 40}
+
+
+async def test_watch_coalesces_for_slow_consumers():
+    """Test a slow consumer gets the merged changes, and errors are retried."""
+    api = FakeWinetAPI(
+        [[[2, 0]], WinetTimeoutError("timeout"), [[2, 1]], [[2, 3], [3, 1]], [[2, 4]]]
+    )
+    watcher = WinetWatcher(api, [2], 0.01, max_backoff=0.01)
+
+    async for delta in watcher:
+        await asyncio.sleep(0.2)
+        break
+    async for delta in watcher:
+        break
+
+    assert delta.changes == {2: 4, 3: 1}
+    assert delta.polls > 1
+    assert watcher.failed_polls == 0
+
+
+async def test_watch_raises_polling_task_crash():
+    """Test an unexpected error of the polling task ends the iteration."""
+    api = FakeWinetAPI([[[2, 1]], KeyError("boom")])
+    watcher = WinetWatcher(api, [WinetRegisterCategory.POLL_CATEGORY_2], 0.01)
+    deltas = []
+
+    async def consume():
+        async for delta in watcher:
+            deltas.append(dict(delta.changes))
+
+    with pytest.raises(KeyError):
+        await asyncio.wait_for(consume(), 1)
+    assert deltas == [{2: 1}]
+
+
+async def test_cli_poll_once_writes_ndjson():
+    """Test the fleet poller writes a decoded record per host."""
+    output = io.StringIO()
+    api = FakeWinetAPI([[[2, 4], [0, 41], [7, 1]]])
+
+    assert await poll_once(api, "stove1", [2], NdjsonWriter(output))
+    await asyncio.sleep(0)
+
+    record = json.loads(output.getvalue())
+    assert record["host"] == "stove1"
+    assert record["registers"] == {"status": 4, "temperature_read": 41, "7": 1}
+
+
+async def test_proxy_serves_cached_reads():
+    """Test reads share one upstream poll, and writes drop the cache."""
+    api = FakeWinetAPI([[[2, 4]], [[2, 0]]])
+    proxy = WinetStoveProxy(api, interval=60)
+
+    bodies = await asyncio.gather(*(proxy.read(2) for _ in range(5)))
+    assert json.loads(bodies[-1])["params"] == [[2, 4]]
+    assert proxy.stats.upstream_requests == 1
+
+    assert await proxy.write(lambda: asyncio.sleep(0)) == b'{"result":true}'
+    assert json.loads(await proxy.read(2))["params"] == [[2, 0]]
+    assert proxy.stats.as_dict()["saved_requests"] == 4
+
+
+def test_proxy_isolates_categories():
+    """Test a failing category is rejected, the unread ones are forgotten."""
+
+    class Module:
+        rtt = {}
+
+        def __init__(self):
+            self.requests = []
+            self.unknown = {99}
+
+        async def get_registers(self, key, category):
+            self.requests.append(category)
+            if category in self.unknown:
+                raise WinetHTTPStatusError("/ajax/get-registers", 404)
+            return WinetGetRegisterResult(params=[[2, 4]], cat=category)
+
+    async def scenario():
+        module = Module()
+        proxy = WinetStoveProxy(module, interval=5, reject_delay=300)
+        proxy.start()
+        await proxy.read(2)
+        await proxy.read(6)
+        with pytest.raises(WinetHTTPStatusError):
+            await proxy.read(99)
+        with pytest.raises(WinetHTTPStatusError):
+            await proxy.read(99)
+        assert module.requests == [2, 6, 99]
+
+        # failing while polled: rejected, the others are polled at the same rate
+        module.unknown.add(6)
+        await asyncio.sleep(30)
+        assert module.requests.count(6) == 2 and module.requests.count(99) == 1
+        assert module.requests.count(2) == 7
+        with pytest.raises(WinetHTTPStatusError):
+            await proxy.read(6)
+
+        # polled until no client reads it anymore
+        await asyncio.sleep(60)
+        polls = len(module.requests)
+        await asyncio.sleep(60)
+        assert len(module.requests) == polls
+
+        # tried again once the rejection is over
+        await asyncio.sleep(300)
+        with pytest.raises(WinetHTTPStatusError):
+            await proxy.read(99)
+        assert module.requests.count(99) == 2
+        await proxy.stop()
+
+    run_virtual(scenario())
+
+
+async def test_exporter_renders_watched_registers():
+    """Test the OpenMetrics text, from the watcher state only."""
+    api = FakeWinetAPI([[[2, 4], [0, 41], [3, 0b10000]]])
+    watcher = WinetWatcher(api, [2])
+    await watcher.poll_once()
+    exporter = WinetExporter()
+    exporter.add_target("stove1", api, watcher)
+
+    text = exporter.render(0.0)
+
+    assert 'winet_temperature_read_celsius{host="stove1"} 20.5\n' in text
+    assert 'winet_status{host="stove1"} 4\n' in text
+    assert 'winet_alarm{host="stove1",alarm="no_pellets"} 1\n' in text
+    assert 'winet_alarm{host="stove1",alarm="failed_ignition"} 0\n' in text
+    assert 'winet_register{host="stove1",register="3"} 16\n' in text
+    assert text.endswith("# EOF\n")
+    assert exporter.render(0.0) == text
+
+
+async def test_record_and_replay(hass, aioclient_mock, tmp_path, caplog):
+    """Test a recorded session replays through the integration client."""
+    aioclient_mock.post(GET_REGISTERS_URL, json=POLL_ANSWER)
+    path = str(tmp_path / "stove.ndjson.gz")
+    recorder = WinetRecorder(path)
+    api = WinetAPILocal(async_get_clientsession(hass), HOST)
+    api.record(recorder)
+    await api.get_registers(WinetRegisterKey.POLL_DATA, 2)
+    await api.get_registers(WinetRegisterKey.POLL_DATA, 11)
+    await recorder.flush()
+    recorder.close()
+
+    # a recording that can't be written doesn't fail the requests
+    broken = WinetRecorder(str(tmp_path / "missing" / "stove.ndjson.gz"))
+    api.record(broken)
+    await api.get_registers(WinetRegisterKey.POLL_DATA, 2)
+    await broken.flush()
+    assert "Cannot write the recording" in caplog.text
+
+    transport = WinetReplayTransport.from_files(path)
+    client = InvictaApiClient(None, HOST, transport=transport)
+    await client.poll()
+
+    assert transport.replayed == 2
+    assert client.data.temperature_read == 20.5
+    with pytest.raises(WinetReplayExhaustedError):
+        await client.poll()